@@ -0,0 +1,57 @@
+"""Time nf-core ChIP-seq export with ``--control-strategy best`` on synthetic manifests.
+
+    python benchmarks/bench_best_control.py [--sizes 1000 10000 100000]
+
+Each case experiment lists four candidate controls; time per row should stay flat.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from encodefetch.exporters.nfcore_chipseq import NFCoreChipseq
+
+
+def synthetic_manifest(n_rows: int, controls_per_case: int = 4) -> pd.DataFrame:
+    n_controls = max(controls_per_case, n_rows // 10)
+    rows = []
+    for i in range(n_rows):
+        is_control = i < n_controls
+        exp = f"ENCSR{i:06d}" if is_control else f"ENCSR{n_controls + i // 2:06d}"
+        ctrls = [f"ENCSR{(i + k) % n_controls:06d}" for k in range(controls_per_case)]
+        rows.append({
+            "experiment_accession": exp,
+            "is_control": is_control,
+            "matched_control_experiments": "" if is_control else ",".join(ctrls),
+            "controlled_by_files": "",
+            "file_accession": f"ENCFF{i:07d}",
+            "file_format": "fastq",
+            "file_status": "released",
+            "fastq_1": f"ENCFF{i:07d}.fastq.gz",
+            "biosample_term_name": ("K562", "HepG2", "GM12878")[i % 3],
+            "lab": ("lab-a", "lab-b")[i % 2],
+            "organism": "Homo sapiens",
+            "biological_replicates": str(i % 2 + 1),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = ap.parse_args()
+
+    print(f"{'rows':>10}  {'seconds':>8}  {'us/row':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            df = synthetic_manifest(n)
+            start = time.perf_counter()
+            NFCoreChipseq().write(df, os.path.join(tmp, f"{n}.csv"), control_strategy="best")
+            elapsed = time.perf_counter() - start
+            print(f"{n:>10}  {elapsed:>8.2f}  {elapsed / n * 1e6:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Time ``collapse_fastq_pairs`` on synthetic paired-end manifests of growing size.
+
+    python benchmarks/bench_collapse_fastq_pairs.py [--sizes 10000 100000 1000000]
+
+A quarter of the R1 rows carry no ``paired_accession`` so the replicate-key
+fallback is exercised as well. Time per row should stay flat as size grows.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from encodefetch.postprocess import collapse_fastq_pairs
+
+
+def synthetic_manifest(n_rows: int, files_per_experiment: int = 8) -> pd.DataFrame:
+    rows = []
+    for i in range(n_rows // 2):
+        exp = f"ENCSR{i * 2 // files_per_experiment:06d}"
+        rep = str(i % (files_per_experiment // 2) + 1)
+        r1, r2 = f"ENCFF{2 * i:07d}", f"ENCFF{2 * i + 1:07d}"
+        for acc, end, mate in ((r1, "1", r2 if i % 4 else ""), (r2, "2", r1)):
+            rows.append({
+                "experiment_accession": exp,
+                "is_control": i % 5 == 0,
+                "file_accession": acc,
+                "file_format": "fastq",
+                "run_type": "paired-ended",
+                "paired_end": end,
+                "paired_accession": mate,
+                "file_status": "released",
+                "url": f"https://www.encodeproject.org/files/{acc}/@@download/{acc}.fastq.gz",
+                "md5sum": f"{i:032x}",
+                "file_size": 1000 + i,
+                "biological_replicates": rep,
+                "technical_replicates": f"{rep}_1",
+            })
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 250_000, 1_000_000])
+    args = ap.parse_args()
+
+    print(f"{'rows':>10}  {'seconds':>8}  {'us/row':>7}")
+    for n in args.sizes:
+        df = synthetic_manifest(n)
+        start = time.perf_counter()
+        out = collapse_fastq_pairs(df)
+        elapsed = time.perf_counter() - start
+        assert len(out) == len(df) // 2 and (out["single_end"] == "false").all()
+        print(f"{len(df):>10}  {elapsed:>8.2f}  {elapsed / len(df) * 1e6:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
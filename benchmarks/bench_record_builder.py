@@ -0,0 +1,77 @@
+"""Compare memory held by file records as a list of dicts and as a ``RecordBuilder``.
+
+    python benchmarks/bench_record_builder.py [--files 200000]
+
+Reports the Python heap held by the accumulated records (tracemalloc) and by the
+resulting manifest DataFrame.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import pandas as pd
+
+from encodefetch.core import build_file_record
+from encodefetch.records import RecordBuilder
+
+
+def synthetic_records(n_files: int, files_per_experiment: int = 10):
+    labs = [f"Lab {i}" for i in range(40)]
+    for i in range(n_files):
+        e = i // files_per_experiment
+        exp = {
+            "accession": f"ENCSR{e:06d}",
+            "assay_title": ("TF ChIP-seq", "Histone ChIP-seq", "total RNA-seq")[e % 3],
+            "lab": {"title": labs[e % len(labs)]},
+            "award": {"rfa": "ENCODE4"},
+            "status": "released",
+            "biosample_ontology": {"term_name": ("K562", "HepG2", "GM12878")[e % 3], "classification": "cell line"},
+        }
+        file_json = {
+            "accession": f"ENCFF{i:07d}",
+            "file_format": "fastq",
+            "output_type": "reads",
+            "run_type": "paired-ended",
+            "paired_end": str(i % 2 + 1),
+            "status": "released",
+            "file_size": 1000 + i,
+            "md5sum": f"{i:032x}",
+            "href": f"/files/ENCFF{i:07d}/@@download/ENCFF{i:07d}.fastq.gz",
+        }
+        yield file_json, exp
+
+
+def measure(label, build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = build()
+    held = tracemalloc.get_traced_memory()[0]
+    df = records.to_frame() if isinstance(records, RecordBuilder) else pd.DataFrame(records)
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    print(f"{label:>14}  {held / 2**20:>9.1f}  {df.memory_usage(deep=True).sum() / 2**20:>9.1f}  {elapsed:>7.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=200_000)
+    args = ap.parse_args()
+
+    def as_dicts():
+        return [build_file_record(f, exp_json=e, is_control=False) for f, e in synthetic_records(args.files)]
+
+    def as_columns():
+        builder = RecordBuilder()
+        for f, e in synthetic_records(args.files):
+            build_file_record(f, exp_json=e, is_control=False, into=builder)
+        return builder
+
+    print(f"{'':>14}  {'records MiB':>9}  {'frame MiB':>9}  {'seconds':>7}")
+    measure("list of dicts", as_dicts)
+    measure("RecordBuilder", as_columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@ from .core import (
     write_nfcore_sheet,
     write_snakemake_sheet,
 )
+from .exporters import ExportContext, write_samplesheets
+from .manifest import read_manifest, write_manifest
+from .store import MetadataStore
+from .sync import sync_experiments
 from .postprocess import collapse_fastq_pairs
+from .transport import Transport, get_transport, set_transport
 
 __version__ = "0.5.0"
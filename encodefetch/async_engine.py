@@ -0,0 +1,303 @@
+"""Asyncio metadata engine.
+
+The threaded engine nests a control pool inside every experiment worker, so the
+number of in-flight requests can reach ``threads * threads``. This engine drives
+searches, experiment fetches and control fetches from one event loop, with a
+single semaphore bounding every in-flight request. Output matches
+``experiments_to_df``. Requires the optional ``aiohttp`` dependency.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+from rich.progress import (
+    Progress, SpinnerColumn, TextColumn, BarColumn,
+    MofNCompleteColumn, TimeElapsedColumn, TimeRemainingColumn
+)
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:  # optional dependency
+    aiohttp = None
+
+from .cache import ResponseCache
+from .core import (
+    build_file_record,
+    collect_files_from_experiment,
+    console,
+    expand_possible_controls,
+    is_embedded_experiment,
+    rows_to_df,
+)
+from .encode_client import HEADERS, batch_accessions, build_url, is_empty_search
+from .records import RecordBuilder
+from .ratelimit import (
+    RETRY_STATUSES,
+    THROTTLE_STATUSES,
+    RequestStats,
+    RetryPolicy,
+    TokenBucket,
+    parse_retry_after,
+)
+
+DEFAULT_CONCURRENCY = 64
+
+
+class AsyncEncodeClient:
+    """aiohttp client whose requests all share one concurrency semaphore.
+
+    Requests are paced and retried like ``Transport`` (token bucket, jittered
+    backoff, ``Retry-After``).
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, auth_token: Optional[str] = None,
+                 timeout: int = 120, cache: Optional[ResponseCache] = None,
+                 max_rps: float = 0.0, retry: Optional[RetryPolicy] = None):
+        if aiohttp is None:
+            raise ImportError("The async engine requires aiohttp: pip install 'encodefetch[async]'")
+        self.concurrency = max(1, int(concurrency))
+        self.auth = (auth_token, "") if auth_token else None
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = TokenBucket(max_rps)
+        self.retry = retry or RetryPolicy()
+        self.stats = RequestStats()
+        self._sem = None
+        self._session = None
+
+    async def __aenter__(self):
+        self._sem = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            auth=aiohttp.BasicAuth(*self.auth) if self.auth else None,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def get_json(self, path_or_url: str, params=None, raw_query: Optional[str] = None,
+                       cached: bool = True):
+        url = build_url(path_or_url, params, raw_query)
+        cache, entry, headers = self.cache if cached else None, None, {}
+        if cache is not None:
+            key = cache.key(url, self.auth)
+            entry = cache.get(key)
+            if entry is not None and cache.is_fresh(entry):
+                cache.record("hits")
+                return entry.payload
+            if entry is not None:
+                headers = entry.validators()
+
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.rate_limiter.reserve())
+            retry_after = None
+            try:
+                async with self._sem:
+                    async with self._session.get(URL(url, encoded=True), headers=headers) as r:
+                        self.stats.record(requests=1)
+                        if entry is not None and r.status == 304:
+                            cache.record("revalidated")
+                            cache.refresh(key, entry)
+                            return entry.payload
+                        if r.status in RETRY_STATUSES and attempt < self.retry.retries:
+                            if r.status in THROTTLE_STATUSES:
+                                self.stats.record(throttled=1)
+                            retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                        else:
+                            if r.status in RETRY_STATUSES:
+                                self.stats.record(failures=1)
+                            r.raise_for_status()
+                            data = await r.json(content_type=None)
+                            etag = r.headers.get("ETag", "")
+                            last_modified = r.headers.get("Last-Modified", "")
+                            break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retry.retries:
+                    self.stats.record(failures=1)
+                    raise
+            delay = self.retry.delay(attempt, retry_after)
+            self.stats.record(retries=1, waited=delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+        if cache is not None:
+            cache.record("misses")
+            cache.put(key, url, data, etag=etag, last_modified=last_modified)
+        return data
+
+    async def search(self, params, raw_query: Optional[str] = None, cached: bool = True) -> List[dict]:
+        try:
+            res = await self.get_json("/search/", params=params, raw_query=raw_query, cached=cached)
+        except aiohttp.ClientResponseError as e:
+            if is_empty_search(e.status):
+                return []
+            raise
+        return res.get("@graph", [])
+
+    async def iter_search(self, params, page_size: int = 500, raw_query: Optional[str] = None,
+                          cached: bool = True):
+        """Async counterpart of ``encode_client.iter_search``."""
+        params = [(k, v) for k, v in params if k not in ("limit", "from")]
+        start = 0
+        while True:
+            page = params + [("from", str(start)), ("limit", str(page_size))]
+            graph = await self.search(page, raw_query=raw_query, cached=cached)
+            for exp in graph:
+                yield exp
+            start += len(graph)
+            if len(graph) < page_size:
+                return
+
+    async def fetch_experiments_batch(self, accessions: List[str],
+                                      fields: Optional[Sequence[str]] = None) -> Dict[str, dict]:
+        params = [("type", "Experiment")] + [("accession", a) for a in accessions]
+        if fields:
+            params.extend(("field", f) for f in fields)
+        else:
+            params.append(("frame", "embedded"))
+        params.append(("limit", "all"))
+        return {e["accession"]: e for e in await self.search(params) if e.get("accession")}
+
+    async def fetch_experiment(self, accession: str, fields: Optional[Sequence[str]] = None) -> dict:
+        if fields:
+            found = await self.fetch_experiments_batch([accession], fields=fields)
+            if accession in found:
+                return found[accession]
+        return await self.get_json(f"/experiments/{accession}/", params={"format": "json", "frame": "embedded"})
+
+
+async def experiments_to_df_async(experiments,
+                                  client: AsyncEncodeClient,
+                                  file_types: Optional[Set[str]] = None,
+                                  assembly: Optional[str] = None,
+                                  status: str = "released",
+                                  progress: bool = False,
+                                  fields: Optional[Sequence[str]] = None,
+                                  extra_fields: Optional[Sequence[str]] = None,
+                                  ) -> Tuple[pd.DataFrame, RecordBuilder]:
+    extra_fields = list(extra_fields or [])
+
+    # One task per control accession; concurrent cases await the same task.
+    control_tasks: Dict[str, asyncio.Task] = {}
+    counts = {"hits": 0, "misses": 0}
+
+    async def build_control_rows(cacc: str) -> List[dict]:
+        ctrl_exp = await client.fetch_experiment(cacc, fields=fields)
+        records.mark_fetched(cacc, is_control=True)
+        return [
+            build_file_record(f, exp_json=ctrl_exp, is_control=True, matched_controls="",
+                              extra_fields=extra_fields)
+            for f in collect_files_from_experiment(ctrl_exp, file_types=file_types, assembly=assembly, status=status)
+        ]
+
+    async def fetch_control_rows(cacc: str) -> List[dict]:
+        task = control_tasks.get(cacc)
+        if task is None:
+            counts["misses"] += 1
+            task = control_tasks[cacc] = asyncio.ensure_future(build_control_rows(cacc))
+        else:
+            counts["hits"] += 1
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            if control_tasks.get(cacc) is task:
+                del control_tasks[cacc]
+            console.log(f"Failed to fetch control {cacc}: {e}")
+            return []
+
+    async def process_experiment(exp):
+        if is_embedded_experiment(exp):
+            exp_full = exp
+        else:
+            exp_full = await client.fetch_experiment(exp.get("accession"), fields=fields)
+        records.mark_fetched(exp.get("accession"))
+        ctrl_list = expand_possible_controls(exp_full)
+        ctrls_csv = ",".join(ctrl_list)
+        for f in collect_files_from_experiment(exp_full, file_types=file_types, assembly=assembly, status=status):
+            build_file_record(f, exp_json=exp_full, is_control=False, matched_controls=ctrls_csv,
+                              extra_fields=extra_fields, into=records)
+        for control_rows in await asyncio.gather(*(fetch_control_rows(c) for c in ctrl_list)):
+            records.extend(control_rows)
+
+    records = RecordBuilder()
+    pending: List[asyncio.Future] = []
+    seen = set()
+    # Accepts plain and async iterables so paginated searches start fetching on the first page.
+    if hasattr(experiments, "__aiter__"):
+        cases = [exp async for exp in _schedule(experiments, seen, pending, process_experiment)]
+    else:
+        cases = [exp for exp in experiments if _accept(exp, seen, pending, process_experiment)]
+    if progress:
+        columns = [
+            SpinnerColumn(),
+            TextColumn("[bold cyan]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TextColumn("•"),
+            TimeElapsedColumn(),
+            TimeRemainingColumn(),
+        ]
+        with Progress(*columns) as prog:
+            task = prog.add_task("Experiments", total=len(cases))
+            for fut in asyncio.as_completed(pending):
+                await fut
+                prog.update(task, advance=1)
+    else:
+        for fut in asyncio.as_completed(pending):
+            await fut
+
+    if counts["hits"] or counts["misses"]:
+        console.log(f"Control cache: {counts['hits']} hit(s), {counts['misses']} miss(es).")
+    return rows_to_df(records)
+
+
+def _accept(exp, seen, pending, process) -> bool:
+    acc = exp.get("accession")
+    if not acc or acc in seen:
+        return False
+    seen.add(acc)
+    pending.append(asyncio.ensure_future(process(exp)))
+    return True
+
+
+async def _schedule(experiments, seen, pending, process):
+    async for exp in experiments:
+        if _accept(exp, seen, pending, process):
+            yield exp
+
+
+async def search_experiments_async(params_list, client: AsyncEncodeClient,
+                                   page_size: Optional[int] = None, **kwargs):
+    """Run an Experiment search and build the manifest from its results."""
+    # Like the threaded engine, the listing bypasses the response cache.
+    if page_size:
+        experiments = client.iter_search(params_list, page_size=page_size, raw_query="control_type!=*",
+                                         cached=False)
+        console.log(f"Streaming search results in pages of {page_size}.")
+    else:
+        experiments = await client.search(params_list, raw_query="control_type!=*", cached=False)
+        console.log(f"Found {len(experiments)} experiment(s) to fetch.")
+    return await experiments_to_df_async(experiments, client, **kwargs)
+
+
+async def search_accessions_async(accessions: List[str], client: AsyncEncodeClient,
+                                  batch_size: int = 0, **kwargs):
+    """Fetch known accessions (optionally in search batches) and build the manifest."""
+    fields = kwargs.get("fields")
+    unique = list(dict.fromkeys(accessions))
+    found: Dict[str, dict] = {}
+    if batch_size and batch_size > 1:
+        batches = list(batch_accessions(unique, batch_size, fields=fields))
+        for res in await asyncio.gather(*(client.fetch_experiments_batch(b, fields=fields) for b in batches)):
+            found.update(res)
+    missing = [a for a in unique if a not in found]
+    for acc, exp in zip(missing, await asyncio.gather(*(client.fetch_experiment(a, fields=fields) for a in missing))):
+        found[acc] = exp
+    return await experiments_to_df_async([found[a] for a in accessions], client, **kwargs)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    payload: Any
+    stored_at: float
+    etag: str = ""
+    last_modified: str = ""
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """On-disk cache of ENCODE JSON responses keyed by request URL (including params).
+
+    Entries younger than ``ttl`` seconds are served without touching the network;
+    older entries are revalidated with ETag/Last-Modified when the server sent
+    them. The directory is kept under ``max_bytes`` by evicting least recently
+    used entries (access time is tracked through the file mtime).
+    """
+
+    def __init__(self, directory, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._sizes: Dict[Path, int] = {
+            p: p.stat().st_size for p in self.directory.glob("*.json")
+        }
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str, auth=None) -> str:
+        ident = url if not auth else f"{url}\0{auth[0]}"
+        return hashlib.sha256(ident.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(
+            url=data.get("url", ""),
+            payload=data.get("payload"),
+            stored_at=float(data.get("stored_at", 0)),
+            etag=data.get("etag", ""),
+            last_modified=data.get("last_modified", ""),
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return (time.time() - entry.stored_at) < self.ttl
+
+    def put(self, key: str, url: str, payload, etag: str = "", last_modified: str = ""):
+        entry = CacheEntry(url=url, payload=payload, stored_at=time.time(),
+                           etag=etag or "", last_modified=last_modified or "")
+        self._write(key, entry)
+
+    def refresh(self, key: str, entry: CacheEntry):
+        """Mark a revalidated (304) entry as fresh again."""
+        entry.stored_at = time.time()
+        self._write(key, entry)
+
+    def _write(self, key: str, entry: CacheEntry):
+        path = self._path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump({
+                "url": entry.url,
+                "stored_at": entry.stored_at,
+                "etag": entry.etag,
+                "last_modified": entry.last_modified,
+                "payload": entry.payload,
+            }, fh)
+        os.replace(tmp, path)
+        with self._lock:
+            self._sizes[path] = path.stat().st_size
+            self._evict()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for p in list(self._sizes):
+            try:
+                by_age.append((p.stat().st_mtime, p))
+            except OSError:
+                self._sizes.pop(p, None)
+        for _, p in sorted(by_age):
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes.pop(p, 0)
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for p in list(self._sizes):
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            self._sizes.clear()
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
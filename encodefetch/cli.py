@@ -1,6 +1,4 @@
-import json
 from pathlib import Path
-import concurrent.futures as cf
 
 import rich_click as click
 from rich.progress import Progress
@@ -9,10 +7,29 @@ from .core import (
     search_experiments,
     search_accessions,
     collapse_fastq_pairs,
-    download_file,
-    write_nfcore_sheet,
-    write_snakemake_sheet,
+    assay_exporters,
 )
+from .downloads import (
+    SCHEDULES,
+    SEGMENT_THRESHOLD,
+    SEGMENTS,
+    DownloadPipeline,
+    add_local_paths,
+    download_all,
+    download_items,
+    manifest_files,
+    parse_rate,
+)
+from .exporters import EXPORTER_REGISTRY, write_samplesheets
+from .cache import ResponseCache, DEFAULT_TTL
+from .manifest import MANIFEST_FORMATS, find_manifest, manifest_path, read_manifest, require_pyarrow, write_manifest
+from .ratelimit import RetryPolicy, TokenBucket
+from .journal import RunJournal
+from .store import MetadataStore
+from .streaming import COMPRESSIONS, RecordSpool, require_zstandard
+from .sync import save_sync_state, sync_experiments
+from .transport import Transport, set_transport
+from .verify import VERIFY_POLICIES, VerificationIndex, verify_files
 
 from . import __version__
 
@@ -24,7 +41,7 @@ click.rich_click.OPTION_GROUPS = {
     "encodefetch": [
         {
             "name": "Input selection",
-            "options": ["--accessions"],
+            "options": ["--accessions", "--batch-size"],
         },
         {
             "name": "Search filters",
@@ -39,15 +56,23 @@ click.rich_click.OPTION_GROUPS = {
         },
         {
             "name": "Output options",
-            "options": ["--outdir", "--nfcore", "--snakemake", "--control-strategy"],
+            "options": ["--outdir", "--sync", "--manifest-format", "--compress", "--nfcore", "--snakemake", "--samplesheet", "--control-strategy", "--extra-field"],
+        },
+        {
+            "name": "Metadata store",
+            "options": ["--store", "--from-store"],
         },
         {
             "name": "Download options",
-            "options": ["--metadata-only", "--max-retries", "--chunk-size"],
+            "options": ["--metadata-only", "--journal", "--resume", "--pipeline", "--queue-size", "--segments",
+                        "--segment-threshold", "--verify", "--schedule", "--max-bandwidth", "--max-retries", "--chunk-size"],
         },
         {
             "name": "Performance & UX",
-            "options": ["--threads", "--progress"],
+            "options": ["--threads", "--metadata-threads", "--download-threads", "--adaptive-downloads",
+                        "--min-download-threads", "--max-download-threads", "--progress", "--cache-dir",
+                        "--cache-ttl", "--projection", "--engine", "--concurrency", "--max-rps", "--http-retries",
+                        "--page-size"],
         },
         {
             "name": "Miscellaneous",
@@ -72,13 +97,17 @@ def parse_accessions_input(accessions: str) -> tuple[list[str], str]:
     return parsed, "string"
 
 
-@click.command(name="encodefetch", help="ENCODEfetch: a command-line tool for retrieving matched case-control data and standardized metadata from ENCODE.\n\n"
-                    "Author: Aziz Khan <aziz.khan@mbzuai.ac.ae>\n"
-                    "https://github.com/khan-lab/ENCODEfetch")
+@click.group(name="encodefetch", invoke_without_command=True,
+             help="ENCODEfetch: a command-line tool for retrieving matched case-control data and standardized metadata from ENCODE.\n\n"
+                  "Author: Aziz Khan <aziz.khan@mbzuai.ac.ae>\n"
+                  "https://github.com/khan-lab/ENCODEfetch")
 
 @click.option("--accessions", default=None, 
               help="Comma-separated experiment accessions, or a text file with one accession per line.")
 
+@click.option("--batch-size", default=0, show_default=True, type=int,
+              help="Fetch --accessions in batches of this size through the search endpoint (0 = one request each).")
+
 @click.option("--assay-title", default="Histone ChIP-seq", 
               show_default=True, help="Assay title.")
 
@@ -117,6 +146,22 @@ def parse_accessions_input(accessions: str) -> tuple[list[str], str]:
 @click.option("--threads", default=6, show_default=True, 
               help="Workers for metadata fetching, control fetching, and downloads.")
 
+@click.option("--metadata-threads", default=0, show_default=True, type=int,
+              help="Workers for metadata and control fetching (0 = --threads).")
+
+@click.option("--download-threads", default=0, show_default=True, type=int,
+              help="Concurrent file downloads (0 = --threads).")
+
+@click.option("--adaptive-downloads", is_flag=True, default=False,
+              help="Grow or shrink the number of active downloads at runtime from measured throughput and "
+                   "errors, starting at --download-threads.")
+
+@click.option("--min-download-threads", default=1, show_default=True, type=int,
+              help="Lower bound for --adaptive-downloads.")
+
+@click.option("--max-download-threads", default=0, show_default=True, type=int,
+              help="Upper bound for --adaptive-downloads (0 = 4 x --download-threads).")
+
 @click.option("--max-retries", default=3, show_default=True, type=int,
               help="Max HTTP retries per file during download.")
 
@@ -132,12 +177,99 @@ def parse_accessions_input(accessions: str) -> tuple[list[str], str]:
 @click.option("--progress/--no-progress", default=True, 
               help="Show progress bars.")
 
+@click.option("--cache-dir", default=None,
+              help="Directory for an on-disk cache of ENCODE metadata responses.")
+
+@click.option("--engine", type=click.Choice(["threads", "files", "async"], case_sensitive=False),
+              default="threads", show_default=True,
+              help="Metadata engine: 'threads' fetches whole experiments; 'files' searches File objects "
+                   "with file filters applied server-side; 'async' uses asyncio (requires aiohttp).")
+
+@click.option("--concurrency", default=64, show_default=True, type=int,
+              help="Maximum in-flight metadata requests for --engine async.")
+
+@click.option("--page-size", default=0, show_default=True, type=int,
+              help="Stream search results in pages of this size instead of limit=all (0 = single request).")
+
+@click.option("--max-rps", default=0.0, show_default=True, type=float,
+              help="Maximum HTTP requests per second to ENCODE (0 = unlimited).")
+
+@click.option("--http-retries", default=4, show_default=True, type=int,
+              help="Retries for throttled (429/503), failed (5xx) or dropped requests, with backoff.")
+
+@click.option("--projection/--no-projection", default=False,
+              help="Request only the experiment fields needed for the manifest instead of full embedded frames.")
+
+@click.option("--extra-field", "extra_field", multiple=True,
+              help="Extra dotted experiment field to add as a manifest column, e.g. "
+                   "'replicates.library.biosample.summary' or 'files.read_length'.")
+
+@click.option("--cache-ttl", default=DEFAULT_TTL, show_default=True, type=float,
+              help="Seconds a cached response is reused before it is revalidated.")
+
+@click.option("--manifest-format", type=click.Choice(MANIFEST_FORMATS, case_sensitive=False),
+              default="tsv", show_default=True,
+              help="Manifest file format. parquet and feather keep typed columns and need pyarrow.")
+
+@click.option("--journal", "use_journal", is_flag=True, default=False,
+              help="Keep a crash-safe run journal in --outdir so that an interrupted run can be continued "
+                   "with --resume.")
+
+@click.option("--resume", is_flag=True, default=False,
+              help="Continue an interrupted --journal run in --outdir from its journal: completed experiments "
+                   "and downloads are not repeated. The resumed run keeps journaling.")
+
+@click.option("--pipeline", "pipeline_downloads", is_flag=True, default=False,
+              help="Start downloading each experiment's files as soon as its metadata and controls are "
+                   "resolved instead of after the whole metadata phase.")
+
+@click.option("--queue-size", default=64, show_default=True, type=int,
+              help="Files that --pipeline lets metadata fetching run ahead of the downloads.")
+
+@click.option("--segments", default=SEGMENTS, show_default=True, type=int,
+              help="Concurrent byte ranges per large file (1 = always a single stream).")
+
+@click.option("--segment-threshold", default=SEGMENT_THRESHOLD, show_default=True, type=int,
+              help="Files of at least this many bytes (from the manifest file_size) are downloaded in segments.")
+
+@click.option("--verify", type=click.Choice(VERIFY_POLICIES, case_sensitive=False),
+              default="md5", show_default=True,
+              help="Check downloads against the manifest: 'md5' hashes files while they are written, "
+                   "'size' compares byte counts only. Files failing a check are downloaded again.")
+
+@click.option("--schedule", type=click.Choice(SCHEDULES, case_sensitive=False), default="largest",
+              show_default=True,
+              help="Download order: 'largest' file first, so big files do not form a long tail, or 'manifest' order.")
+
+@click.option("--max-bandwidth", default="0", show_default=True,
+              help="Total download rate limit shared by all workers, in bytes per second "
+                   "with an optional K, M or G suffix (e.g. 200M). 0 = unlimited.")
+
+@click.option("--sync", is_flag=True, default=False,
+              help="Incremental run: fetch only experiments modified since the last --sync into --outdir "
+                   "and merge them into the existing manifest, metadata and samplesheets.")
+
+@click.option("--store", "store_path", default=None,
+              help="SQLite metadata store: records from this run are upserted into it.")
+
+@click.option("--from-store", is_flag=True, default=False,
+              help="Build the manifest from --store using the search filters instead of querying ENCODE.")
+
+@click.option("--compress", type=click.Choice(COMPRESSIONS, case_sensitive=False),
+              default="none", show_default=True,
+              help="Compress manifest.tsv and metadata.jsonl with gzip or zstd (zstd needs zstandard).")
+
 @click.option("--nfcore", is_flag=True, default=False, 
               help="Write nf-core chipseq samplesheet.")
 
 @click.option("--snakemake", is_flag=True, default=False, 
               help="Write Snakemake samplesheet.")
 
+@click.option("--samplesheet", "samplesheet", multiple=True,
+              type=click.Choice(sorted(EXPORTER_REGISTRY), case_sensitive=False),
+              help="Also write this exporter's samplesheet; repeat for several formats. "
+                   "All samplesheets are written in one pass over the manifest.")
+
 @click.option("--control-strategy",
               type=click.Choice(["all", "pool", "best", "first"], case_sensitive=False),
               default="all",
@@ -146,9 +278,11 @@ def parse_accessions_input(accessions: str) -> tuple[list[str], str]:
 
 @click.version_option(version=__version__, prog_name="ENCODEfetch",
                       message="%(prog)s, version %(version)s")
+@click.pass_context
 
 # The main function
-def main(accessions, 
+def main(ctx,
+         accessions, 
          assay_title, 
          target_label, 
          organism,
@@ -166,16 +300,138 @@ def main(accessions,
          progress, 
          nfcore, 
          snakemake, 
+         samplesheet,
          control_strategy,
          max_retries, 
-         chunk_size
+         chunk_size,
+         cache_dir,
+         cache_ttl,
+         batch_size,
+         projection,
+         extra_field,
+         engine,
+         concurrency,
+         max_rps,
+         http_retries,
+         page_size,
+         manifest_format,
+         store_path,
+         from_store,
+         sync,
+         use_journal,
+         resume,
+         pipeline_downloads,
+         queue_size,
+         compress,
+         segments,
+         segment_threshold,
+         verify,
+         metadata_threads,
+         download_threads,
+         schedule,
+         max_bandwidth,
+         adaptive_downloads,
+         min_download_threads,
+         max_download_threads,
          ):
-    
+    if ctx.invoked_subcommand is not None:
+        return
+
     file_types = set([ft.lower() for ft in file_type]) if file_type else None
+    manifest_format = manifest_format.lower()
+    if manifest_format != "tsv":
+        try:
+            require_pyarrow()
+        except ImportError as e:
+            raise click.UsageError(str(e))
+    compress = compress.lower()
+    if compress == "zstd":
+        try:
+            require_zstandard()
+        except ImportError as e:
+            raise click.UsageError(str(e))
+    if from_store and not store_path:
+        raise click.UsageError("--from-store requires --store PATH.")
+    if sync and (accessions or from_store):
+        raise click.UsageError("--sync works with search filters; it cannot be combined with --accessions or --from-store.")
+    use_journal = use_journal or resume
+    if use_journal and (sync or from_store or engine.lower() != "threads"):
+        raise click.UsageError("--journal and --resume need --engine threads and cannot be combined with --sync "
+                               "or --from-store.")
+    if pipeline_downloads and (sync or from_store or engine.lower() != "threads"):
+        raise click.UsageError("--pipeline needs --engine threads and cannot be combined with --sync or --from-store.")
+    verify = verify.lower()
+    schedule = schedule.lower()
+    try:
+        rate = parse_rate(max_bandwidth)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    # One bucket for all download workers; it holds at most one chunk, so bursts stay short.
+    bandwidth = TokenBucket(rate, burst=chunk_size) if rate else None
+    metadata_threads = metadata_threads or threads
+    download_threads = download_threads or threads
+    if adaptive_downloads:
+        max_download_threads = max_download_threads or 4 * download_threads
+        if not 1 <= min_download_threads <= download_threads <= max_download_threads:
+            raise click.UsageError("--adaptive-downloads needs --min-download-threads <= --download-threads "
+                                   "<= --max-download-threads.")
     outdir = Path(outdir); outdir.mkdir(parents=True, exist_ok=True)
+    transport = Transport(pool_size=max(metadata_threads, download_threads,
+                                        max_download_threads if adaptive_downloads else 0), max_rps=max_rps,
+                          retry=RetryPolicy(retries=http_retries))
+    set_transport(transport)
+    cache = ResponseCache(cache_dir, ttl=cache_ttl) if cache_dir else None
+    journal = None
+    if use_journal:
+        run_query = {
+            "accessions": accessions, "assay_title": assay_title, "target_label": list(target_label),
+            "organism": organism, "biosample": biosample, "file_types": sorted(file_types or []),
+            "assembly": assembly, "status": status, "perturbed": perturbed, "series": series,
+            "extra_field": list(extra_field),
+        }
+        journal = RunJournal(outdir, run_query, resume=resume)
 
-    
-    if accessions:
+    skip_downloads = metadata_only or dry_run
+    files_dir = outdir / "files"
+    pipeline = None
+    if pipeline_downloads and not skip_downloads:
+        pipeline = DownloadPipeline(files_dir, threads=download_threads, queue_size=queue_size,
+                                    auth=(auth_token, "") if auth_token else None, chunk_size=chunk_size,
+                                    max_retries=max_retries, transport=transport, journal=journal,
+                                    segments=segments, segment_threshold=segment_threshold,
+                                    verify=verify, schedule=schedule, bandwidth=bandwidth,
+                                    adaptive=adaptive_downloads, min_threads=min_download_threads,
+                                    max_threads=max_download_threads)
+        # The download bars take over the live display.
+        progress = False
+    # metadata.jsonl is written as experiments complete when the engine reports them.
+    streamed = engine.lower() == "threads" and not (sync or from_store)
+    spool = RecordSpool(outdir / "metadata.jsonl", compression=compress)
+    sinks = [spool.write] if streamed else []
+    if pipeline is not None:
+        sinks.append(pipeline.submit)
+
+    def on_experiment(rows):
+        for sink in sinks:
+            sink(rows)
+
+    if from_store:
+        acc_list = parse_accessions_input(accessions)[0] if accessions else None
+        if series:
+            click.echo("--series is not recorded in the store and is ignored with --from-store.", err=True)
+        if acc_list:
+            filters = dict(accessions=acc_list)
+        else:
+            filters = dict(assay_title=assay_title,
+                           target_labels=list(target_label) if target_label else None,
+                           organism=organism,
+                           biosample=biosample,
+                           perturbed=perturbed)
+        with MetadataStore(store_path) as store:
+            df, records = store.query(file_types=file_types, assembly=assembly, status=status, **filters)
+        click.echo(f"Loaded {len(records)} file record(s) from {store_path}.")
+
+    elif accessions:
         acc_list, accession_source = parse_accessions_input(accessions)
         source_label = f"file: {accessions}" if accession_source == "file" else "string"
         click.echo(f"Parsed {len(acc_list)} accession(s) from {source_label}.")
@@ -187,9 +443,40 @@ def main(accessions,
             status=status,
             auth_token=auth_token,
             progress=progress,
-            threads=threads,
+            threads=metadata_threads,
+            transport=transport,
+            cache=cache,
+            batch_size=batch_size,
+            projection=projection,
+            extra_fields=list(extra_field),
+            engine=engine.lower(),
+            concurrency=concurrency,
+            journal=journal,
+            on_experiment=on_experiment,
         )
 
+    elif sync:
+        df, records, sync_plan = sync_experiments(outdir,
+                                                  assay_title=assay_title,
+                                                  target_labels=list(target_label) if target_label else None,
+                                                  organism=organism,
+                                                  biosample=biosample,
+                                                  file_types=file_types,
+                                                  assembly=assembly,
+                                                  status=status,
+                                                  auth_token=auth_token,
+                                                  progress=progress,
+                                                  perturbed=perturbed,
+                                                  series=series,
+                                                  threads=metadata_threads,
+                                                  transport=transport,
+                                                  batch_size=batch_size,
+                                                  projection=projection,
+                                                  extra_fields=list(extra_field),
+                                                  engine=engine.lower(),
+                                                  concurrency=concurrency)
+        click.echo(f"Sync: {sync_plan.summary()}.")
+
     else:
         df, records = search_experiments(assay_title=assay_title,
                                          target_labels=list(target_label) if target_label else None,
@@ -202,175 +489,167 @@ def main(accessions,
                                          progress=progress,
                                          perturbed=perturbed,
                                          series=series,
-                                         threads=threads)
+                                         threads=metadata_threads,
+                                         transport=transport,
+                                         cache=cache,
+                                         projection=projection,
+                                         extra_fields=list(extra_field),
+                                         engine=engine.lower(),
+                                         concurrency=concurrency,
+                                         page_size=page_size or None,
+                                         journal=journal,
+                                         on_experiment=on_experiment)
+
+    if pipeline is not None:
+        failed = pipeline.close()
+        click.echo(f"Pipelined downloads: {pipeline.queued} file(s), {failed} failed.")
+
+    if not from_store and engine.lower() != "async":
+        # Pipelined downloads share the transport, so its counters are not metadata-only then.
+        label = "HTTP so far (metadata and pipelined downloads)" if pipeline is not None else "Metadata HTTP"
+        click.echo(f"{label}: {transport.stats.summary()}; "
+                   f"concurrency limit {transport.limiter.limit}.")
+
+    if cache is not None:
+        stats = cache.stats()
+        click.echo(f"Metadata cache: {stats['hits']} hit(s), {stats['revalidated']} revalidated, "
+                   f"{stats['misses']} miss(es).")
+
+    if store_path and not from_store:
+        with MetadataStore(store_path) as store:
+            n = store.upsert(records, file_types=file_types, assembly=assembly, status=status)
+        click.echo(f"Stored {n} file record(s) in {store_path}.")
+
+    if not streamed:
+        spool.write(records)
+
+    def end_run(results):
+        # The journal keeps per-file download state (bytes, validators) for --resume, so it is
+        # only removed once every file is in place.
+        failed = sum(not r for r in results.values())
+        if journal is not None:
+            if failed:
+                journal.close()
+                click.echo(f"Kept the run journal in {journal.directory}; rerun with --resume to retry.", err=True)
+            else:
+                journal.finish()
+        if failed:
+            click.echo(f"{failed} download(s) failed.", err=True)
+            ctx.exit(1)
 
     if df.empty:
+        spool.discard()
+        end_run(dict(pipeline.results) if pipeline is not None else {})
         click.echo("No files matched your filters.", err=True); return
 
     if "file_format" in df.columns and df["file_format"].astype(str).str.lower().eq("fastq").any():
         df = collapse_fastq_pairs(df)
 
-    manifest_tsv = outdir / "manifest.tsv"
-    meta_jsonl = outdir / "metadata.jsonl"
-    df.to_csv(manifest_tsv, sep="\t", index=False)
-    with open(meta_jsonl, "w") as f:
-        for row in records:
-            f.write(json.dumps(row) + "\n")
-    click.echo(f"Wrote manifest: {manifest_tsv}")
+    manifest_file = manifest_path(outdir, manifest_format, compress)
+    write_manifest(df, manifest_file)
+    meta_jsonl = spool.close()
+    if sync:
+        save_sync_state(outdir, sync_plan.state)
+    # Everything below works from the manifest frame.
+    del records
+    click.echo(f"Wrote manifest: {manifest_file}")
     click.echo(f"Wrote metadata: {meta_jsonl}")
 
-    def write_samplesheets():
+    def write_all_samplesheets():
+        assay_slug = (assay_title or "").strip().lower().replace(" ", "_")
+        targets, labels = {}, {}
         if nfcore:
-            samplesheet_name = f"nfcore_{assay_title.strip().lower().replace(' ', '_')}_samplesheet.csv"
-            write_nfcore_sheet(df, assay_title, f"{outdir}/{samplesheet_name}", control_strategy=control_strategy)
-            click.echo(f"nf-core sample sheet: {outdir}/{samplesheet_name}")
-
+            for name in assay_exporters(assay_title, "nfcore"):
+                targets[name], labels[name] = outdir / f"nfcore_{assay_slug}_samplesheet.csv", "nf-core"
         if snakemake:
-            samplesheet_name = f"snakemake_{assay_title.strip().lower().replace(' ','_')}_samplesheet.csv"
-            write_snakemake_sheet(df, assay_title, f"{outdir}/{samplesheet_name}", control_strategy=control_strategy)
-            click.echo(f"Snakemake sample sheet: {outdir}/{samplesheet_name}")
-
-    skip_downloads = metadata_only or dry_run
+            for name in assay_exporters(assay_title, "snakemake"):
+                targets[name], labels[name] = outdir / f"snakemake_{assay_slug}_samplesheet.csv", "Snakemake"
+        for name in samplesheet:
+            name = name.lower()
+            if name not in targets:
+                targets[name] = outdir / f"{name}_samplesheet{EXPORTER_REGISTRY[name].suffix}"
+                labels[name] = name
+        if not targets:
+            return
+        write_samplesheets(df, targets, control_strategy=control_strategy)
+        for name, path in targets.items():
+            click.echo(f"{labels[name]} sample sheet: {path}")
 
     ## Download files by default unless metadata-only mode is requested.
+    results = {}
     if not skip_downloads:
-        files_dir = outdir / "files"
         files_dir.mkdir(parents=True, exist_ok=True)
-
-        def file_ext(file_format):
-            fmt = (file_format or "dat").lower()
-            if fmt == "fastq":
-                fmt = "fastq.gz"
-            return fmt
-
-        def make_dest(is_control, experiment_accession, file_accession, file_format):
-            typ = "control" if is_control else "case"
-            return files_dir / typ / experiment_accession / f"{file_accession}.{file_ext(file_format)}"
-
-        def accession_from_download_url(url):
-            value = str(url or "").strip()
-            if "/files/" in value:
-                return value.split("/files/", 1)[1].strip("/").split("/")[0]
-            name = Path(value).name
-            return name.split(".", 1)[0] if name else ""
-
-        def parse_file_size(value):
-            if value in (None, ""):
-                return None
-            try:
-                size = int(float(value))
-            except (TypeError, ValueError):
-                return None
-            return size if size > 0 else None
-
-        def add_download_item(items, seen, *, url, dest, size, label):
-            if not url or not dest or dest in seen or dest.exists():
-                return
-            seen.add(dest)
-            items.append({
-                "url": url,
-                "dest": dest,
-                "size": size,
-                "label": label,
-            })
-
-        # Build tasks from dataframe (skip if already present)
-        items = []
-        seen_dests = set()
-        for _, row in df.iterrows():
-            dest = make_dest(
-                row["is_control"],
-                row["experiment_accession"],
-                row["file_accession"],
-                row["file_format"],
-            )
-            size = parse_file_size(row.get("file_size", ""))
-            label = f"{row['file_accession']} ({row['experiment_accession']})"
-            add_download_item(items, seen_dests, url=row.get("url", ""), dest=dest, size=size, label=label)
-
-            r2_acc = str(row.get("file_accession_r2", "") or "").strip()
-            r2_url = str(row.get("url_r2", "") or "").strip()
-            if not r2_acc:
-                r2_acc = accession_from_download_url(r2_url)
-            if r2_acc and r2_url:
-                r2_dest = make_dest(
-                    row["is_control"],
-                    row["experiment_accession"],
-                    r2_acc,
-                    row["file_format"],
-                )
-                r2_size = parse_file_size(row.get("file_size_r2", ""))
-                r2_label = f"{r2_acc} ({row['experiment_accession']})"
-                add_download_item(items, seen_dests, url=r2_url, dest=r2_dest, size=r2_size, label=r2_label)
-
+        results = dict(pipeline.results) if pipeline is not None else {}
+        # Files from earlier runs are trusted only if the verification index vouches for them.
+        index = VerificationIndex(outdir)
+        present = [it for it in manifest_files(df, files_dir) if it["dest"].exists() and it["dest"] not in results]
+        for dest, result in verify_files(present, index, policy=verify).items():
+            if result:
+                results[dest] = result
+            else:
+                click.echo(f"{dest}: {result.error}; downloading again.", err=True)
+                dest.unlink()
+        items = download_items(df, files_dir)
         if not items:
             click.echo("All files already present. Skipping downloads.")
         else:
-            # Nice rich progress with filename + bytes + speed + ETA
-            from rich.progress import (
-                Progress, SpinnerColumn, TextColumn, BarColumn,
-                DownloadColumn, TransferSpeedColumn, TimeRemainingColumn
-            )
-            columns = [
-                SpinnerColumn(),
-                TextColumn("[green]{task.description}"),
-                BarColumn(),
-                DownloadColumn(),
-                TransferSpeedColumn(),
-                TimeRemainingColumn(),
-            ]
-
-            with Progress(*columns) as prog, cf.ThreadPoolExecutor(max_workers=threads) as ex:
-                futures = []
-                for it in items:
-                    # One task per file, total = file size if known
-                    task_id = prog.add_task(f"Downloading {it['label']}", total=it["size"])
-                    futures.append(ex.submit(
-                        download_file,
-                        it["url"], it["dest"],
-                        progress=prog, task_id=task_id,
-                        auth=(auth_token, "") if auth_token else None,
-                        chunk=chunk_size, retries=max_retries
-                    ))
-
-                # Wait for all; exceptions will surface here
-                for fut in futures:
-                    fut.result()
-
-        # Update manifest and FASTQ columns with local paths.
-        local_paths = []
-        local_paths_r2 = []
-        for _, row in df.iterrows():
-            path = make_dest(
-                row["is_control"],
-                row["experiment_accession"],
-                row["file_accession"],
-                row["file_format"],
-            )
-            local_paths.append(str(path) if path.exists() else "")
-
-            r2_acc = str(row.get("file_accession_r2", "") or "").strip()
-            if not r2_acc:
-                r2_acc = accession_from_download_url(row.get("url_r2", ""))
-            if r2_acc:
-                path_r2 = make_dest(
-                    row["is_control"],
-                    row["experiment_accession"],
-                    r2_acc,
-                    row["file_format"],
-                )
-                local_paths_r2.append(str(path_r2) if path_r2.exists() else "")
-            else:
-                local_paths_r2.append("")
-
-        df["local_path"] = local_paths
-        if "file_accession_r2" in df.columns:
-            df["local_path_r2"] = local_paths_r2
-        if "fastq_1" in df.columns:
-            df["fastq_1"] = df.apply(lambda r: r["local_path"] or r.get("fastq_1", ""), axis=1)
-        if "fastq_2" in df.columns and "local_path_r2" in df.columns:
-            df["fastq_2"] = df.apply(lambda r: r["local_path_r2"] or r.get("fastq_2", ""), axis=1)
-        df.to_csv(outdir / "manifest.tsv", sep="\t", index=False)
-        click.echo(f"Updated manifest with local paths: {outdir / 'manifest.tsv'}")
-
-    write_samplesheets()
+            results.update(download_all(items, threads=download_threads,
+                                        auth=(auth_token, "") if auth_token else None,
+                                        chunk_size=chunk_size, max_retries=max_retries, transport=transport,
+                                        journal=journal, segments=segments, segment_threshold=segment_threshold,
+                                        verify=verify, schedule=schedule, bandwidth=bandwidth,
+                                        adaptive=adaptive_downloads, min_threads=min_download_threads,
+                                        max_threads=max_download_threads))
+            click.echo(f"HTTP totals: {transport.stats.summary()}")
+        for dest, result in results.items():
+            if result and dest.exists():
+                index.record(dest, result.md5, result.verified)
+        index.save()
+        if results:
+            checks = [r.verified for r in results.values()]
+            click.echo(f"Verification ({verify}): {checks.count('md5')} by md5, {checks.count('size')} by size, "
+                       f"{checks.count('failed')} failed.")
+
+        # Update manifest and FASTQ columns with local paths and verification results.
+        df = add_local_paths(df, files_dir, results)
+        write_manifest(df, manifest_file)
+        click.echo(f"Updated manifest with local paths: {manifest_file}")
+
+    write_all_samplesheets()
+    end_run(results)
+
+
+@main.command(name="verify",
+              help="Check the downloaded files of an output directory against its manifest. Files unchanged "
+                   "since they were last verified (same size, mtime and inode) are not read again.")
+@click.option("--outdir", default="encode_results", show_default=True,
+              help="Output directory of an earlier run.")
+@click.option("--policy", type=click.Choice(["size", "md5"], case_sensitive=False), default="md5",
+              show_default=True, help="'md5' hashes stale files; 'size' compares byte counts only.")
+@click.option("--jobs", default=0, show_default=True, type=int,
+              help="Files hashed in parallel (0 = one per CPU core).")
+@click.option("--io-limit", default=4, show_default=True, type=int,
+              help="Maximum concurrent file reads while hashing.")
+@click.option("--full", is_flag=True, default=False,
+              help="Rehash every file, ignoring the verification index.")
+@click.pass_context
+def verify_command(ctx, outdir, policy, jobs, io_limit, full):
+    outdir = Path(outdir)
+    manifest_file = find_manifest(outdir)
+    if manifest_file is None:
+        raise click.UsageError(f"No manifest found in {outdir}.")
+    files = manifest_files(read_manifest(manifest_file), outdir / "files")
+    present = [it for it in files if it["dest"].exists()]
+    index = VerificationIndex(outdir)
+    results = verify_files(present, index, policy=policy.lower(), full=full, jobs=jobs or None, io_limit=io_limit)
+    index.save()
+
+    failed = sorted((dest, r) for dest, r in results.items() if not r)
+    for dest, result in failed:
+        click.echo(f"FAILED {dest}: {result.error}", err=True)
+    checks = [r.verified for r in results.values()]
+    click.echo(f"Verified {len(present)} file(s) from {manifest_file}: {checks.count('md5')} by md5, "
+               f"{checks.count('size')} by size, {len(failed)} failed; "
+               f"{len(files) - len(present)} not downloaded.")
+    if failed:
+        ctx.exit(1)
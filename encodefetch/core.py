@@ -1,10 +1,22 @@
 from __future__ import annotations
+import asyncio
+import hashlib
 from pathlib import Path
-from typing import Iterable, List, Dict, Optional, Tuple, Set
+from typing import Callable, Iterable, List, Dict, Optional, Sequence, Tuple, Set
 import concurrent.futures as cf
 import pandas as pd
 
-from .encode_client import encode_get, fetch_experiment, build_params, ENCODE_BASE
+from .encode_client import (
+    fetch_experiment, fetch_experiments_batch, batch_accessions, build_params,
+    iter_search, projection_fields, search_json, ENCODE_BASE
+)
+from .cache import ResponseCache
+from .journal import RunJournal
+from .ratelimit import TokenBucket
+from .records import RecordBuilder
+from .singleflight import SingleFlight
+from .transport import Transport, get_transport
+from .verify import DownloadResult, check_file, file_md5
 from .postprocess import collapse_fastq_pairs
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -61,6 +73,11 @@ def expand_possible_controls(exp_json):
             ctrls.append(acc)
     return ctrls
 
+def is_embedded_experiment(exp_json) -> bool:
+    """True when an experiment payload already embeds its file objects (frame=embedded)."""
+    files = exp_json.get("files") if isinstance(exp_json, dict) else None
+    return isinstance(files, list) and all(isinstance(f, dict) for f in files)
+
 def collect_files_from_experiment(exp_json,
                                   file_types: Optional[Set[str]] = None,
                                   assembly: Optional[str] = None,
@@ -77,7 +94,23 @@ def collect_files_from_experiment(exp_json,
         out.append(f)
     return out
 
-def build_file_record(file_json, *, exp_json, is_control, matched_controls: str = ""):
+def resolve_field(obj, path: str) -> str:
+    """Resolve a dotted field path against nested dicts/lists and join the values."""
+    values = [obj]
+    for key in path.split("."):
+        nxt = []
+        for v in values:
+            v = v.get(key) if isinstance(v, dict) else None
+            if isinstance(v, list):
+                nxt.extend(v)
+            elif v is not None:
+                nxt.append(v)
+        values = nxt
+    return _join_list(values)
+
+def build_file_record(file_json, *, exp_json, is_control, matched_controls: str = "",
+                      extra_fields: Sequence[str] = (), into: Optional[RecordBuilder] = None):
+    """Manifest record of one file; also appended to ``into`` when given."""
     def g(obj, key, default=""):
         return obj.get(key, default) if isinstance(obj, dict) else default
 
@@ -108,7 +141,7 @@ def build_file_record(file_json, *, exp_json, is_control, matched_controls: str
     files_url = file_json.get("href") or ""
     absolute_url = ENCODE_BASE + files_url if files_url.startswith("/") else files_url
 
-    return {
+    record = {
         # Experiment-level
         "experiment_accession": g(exp_json, "accession"),
         "is_control": is_control,
@@ -173,6 +206,16 @@ def build_file_record(file_json, *, exp_json, is_control, matched_controls: str
         "url": absolute_url,
     }
 
+    # User-requested extra columns; "files." paths resolve against the file.
+    for field in extra_fields:
+        if field.startswith("files."):
+            record[field] = resolve_field(file_json, field[len("files."):])
+        else:
+            record[field] = resolve_field(exp_json, field)
+    if into is not None:
+        into.append(record)
+    return record
+
 def experiments_to_df(experiments: Iterable[dict],
                       file_types: Optional[Set[str]] = None,
                       assembly: Optional[str] = None,
@@ -180,49 +223,90 @@ def experiments_to_df(experiments: Iterable[dict],
                       auth_token: Optional[str] = None,
                       progress: bool = False,
                       threads: int = 6,
-                      ) -> Tuple[pd.DataFrame, List[dict]]:
-    
+                      transport: Optional[Transport] = None,
+                      cache: Optional[ResponseCache] = None,
+                      fields: Optional[Sequence[str]] = None,
+                      extra_fields: Optional[Sequence[str]] = None,
+                      journal: Optional[RunJournal] = None,
+                      on_experiment: Optional[Callable[[List[dict]], None]] = None,
+                      ) -> Tuple[pd.DataFrame, RecordBuilder]:
+    """Fetch each case experiment and its controls and build the manifest.
+
+    ``on_experiment`` is called from the worker threads with the records of
+    each case (its files followed by its controls' files) as soon as they are
+    built, e.g. to start downloads before the whole search is done.
+    """
     auth = (auth_token, "") if auth_token else None
-    seen, cases = set(), []
-    for exp in experiments:
-        acc = exp.get("accession")
-        if not acc or acc in seen:
-            continue
-        seen.add(acc)
-        cases.append(exp)
+    transport = transport or get_transport(threads)
+    extra_fields = list(extra_fields or [])
+
+    def unique_cases():
+        # Consumed lazily so paginated searches start detail fetches on the first page.
+        seen = set()
+        for exp in experiments:
+            acc = exp.get("accession")
+            if not acc or acc in seen:
+                continue
+            seen.add(acc)
+            yield exp
+
+    records = RecordBuilder()
+    # Controls are often shared by many cases; fetch and build each one once per run.
+    control_memo = SingleFlight()
+
+    def build_control_rows(cacc: str) -> List[dict]:
+        ctrl_exp = fetch_experiment(cacc, auth=auth, embedded=True, transport=transport, cache=cache,
+                                    fields=fields)
+        records.mark_fetched(cacc, is_control=True)
+        return [
+            build_file_record(f, exp_json=ctrl_exp, is_control=True, matched_controls="",
+                              extra_fields=extra_fields)
+            for f in collect_files_from_experiment(ctrl_exp, file_types=file_types, assembly=assembly, status=status)
+        ]
 
-    rows: List[dict] = []
+    def fetch_control_rows(cacc: str) -> List[dict]:
+        try:
+            return control_memo.get(cacc, lambda: build_control_rows(cacc))
+        except Exception as e:
+            console.log(f"Failed to fetch control {cacc}: {e}")
+            return []
 
-    def process_experiment(exp) -> List[dict]:
-        local_rows: List[dict] = []
+    def process_experiment(exp):
         exp_acc = exp.get("accession")
-        exp_full = fetch_experiment(exp_acc, auth=auth, embedded=True)
+        if journal is not None:
+            done = journal.experiment_records(exp_acc)
+            if done is not None:
+                records.extend(done)
+                if on_experiment is not None:
+                    on_experiment(done)
+                return
+        rows = []
+        if is_embedded_experiment(exp):
+            exp_full = exp
+        else:
+            exp_full = fetch_experiment(exp_acc, auth=auth, embedded=True, transport=transport, cache=cache,
+                                        fields=fields)
+        records.mark_fetched(exp_acc)
         ctrl_list = expand_possible_controls(exp_full)
         ctrls_csv = ",".join(ctrl_list)
 
         # case files
         for f in collect_files_from_experiment(exp_full, file_types=file_types, assembly=assembly, status=status):
-            local_rows.append(build_file_record(f, exp_json=exp_full, is_control=False, matched_controls=ctrls_csv))
-
-        def fetch_control_rows(cacc: str) -> List[dict]:
-            control_rows: List[dict] = []
-            try:
-                ctrl_exp = fetch_experiment(cacc, auth=auth, embedded=True)
-                for f in collect_files_from_experiment(ctrl_exp, file_types=file_types, assembly=assembly, status=status):
-                    control_rows.append(build_file_record(f, exp_json=ctrl_exp, is_control=True, matched_controls=""))
-            except Exception as e:
-                console.log(f"Failed to fetch control {cacc}: {e}")
-            return control_rows
+            rows.append(build_file_record(f, exp_json=exp_full, is_control=False, matched_controls=ctrls_csv,
+                                          extra_fields=extra_fields))
 
         if len(ctrl_list) > 1:
             with ThreadPoolExecutor(max_workers=min(threads, len(ctrl_list))) as ctrl_ex:
                 for control_rows in ctrl_ex.map(fetch_control_rows, ctrl_list):
-                    local_rows.extend(control_rows)
+                    rows.extend(control_rows)
         else:
             for cacc in ctrl_list:
-                local_rows.extend(fetch_control_rows(cacc))
-
-        return local_rows
+                rows.extend(fetch_control_rows(cacc))
+        records.extend(rows)
+        if journal is not None:
+            journal.experiment_done(exp_acc, rows)
+        if on_experiment is not None:
+            on_experiment(rows)
 
     if progress:
         columns = [
@@ -238,19 +322,39 @@ def experiments_to_df(experiments: Iterable[dict],
         ]
 
         with Progress(*columns) as prog, ThreadPoolExecutor(max_workers=threads) as ex:
-            task = prog.add_task("Experiments", total=len(cases))
-            futures = [ex.submit(process_experiment, exp) for exp in cases]
+            task = prog.add_task("Experiments", total=None)
+            futures = []
+            for exp in unique_cases():
+                futures.append(ex.submit(process_experiment, exp))
+                futures[-1].add_done_callback(lambda _: prog.update(task, advance=1))
+                prog.update(task, total=len(futures))
             for fut in as_completed(futures):
-                rows.extend(fut.result())
-                prog.update(task, advance=1)
+                fut.result()
     else:
         with ThreadPoolExecutor(max_workers=threads) as ex:
-            for fut in as_completed([ex.submit(process_experiment, exp) for exp in cases]):
-                rows.extend(fut.result())
-
-    if not rows:
-        return pd.DataFrame(), []
-    df = pd.DataFrame(rows).sort_values(
+            for fut in as_completed([ex.submit(process_experiment, exp) for exp in unique_cases()]):
+                fut.result()
+
+    if control_memo.hits or control_memo.misses:
+        console.log(f"Control cache: {control_memo.hits} hit(s), {control_memo.misses} miss(es).")
+    if journal is not None:
+        journal.flush()
+
+    return rows_to_df(records)
+
+def rows_to_df(rows) -> Tuple[pd.DataFrame, RecordBuilder]:
+    """Build the manifest DataFrame from file records in its canonical order.
+
+    ``rows`` is a ``RecordBuilder`` or a list of record dicts; the records are
+    returned as a ``RecordBuilder`` (iterate it for ``metadata.jsonl``).
+    """
+    if not isinstance(rows, RecordBuilder):
+        builder = RecordBuilder()
+        builder.extend(rows)
+        rows = builder
+    if not len(rows):
+        return pd.DataFrame(), rows
+    df = rows.to_frame().sort_values(
         ["is_control", "experiment_accession", "file_accession"]
     )
     return df, rows
@@ -266,8 +370,22 @@ def search_experiments(assay_title: Optional[str] = None,
                        progress: bool = False,
                        perturbed: Optional[str] = None,
                        series: Optional[str] = None,
-                       threads: int = 6,):
+                       threads: int = 6,
+                       transport: Optional[Transport] = None,
+                       cache: Optional[ResponseCache] = None,
+                       projection: bool = False,
+                       extra_fields: Optional[Sequence[str]] = None,
+                       engine: str = "threads",
+                       concurrency: int = 64,
+                       page_size: Optional[int] = None,
+                       journal: Optional[RunJournal] = None,
+                       on_experiment: Optional[Callable[[List[dict]], None]] = None,):
     auth = (auth_token, "") if auth_token else None
+    transport = transport or get_transport(threads)
+    fields = projection_fields(extra_fields) if projection else None
+    if engine == "files":
+        # Only accessions are needed here; files and experiments are resolved later.
+        fields = ["accession"]
     params_list = build_params(
         assay_title=assay_title,
         target_labels=target_labels,
@@ -277,11 +395,47 @@ def search_experiments(assay_title: Optional[str] = None,
         perturbed=perturbed,
         series=series,
     )
-    res = encode_get("/search/", params=params_list, auth=auth, raw_query="control_type!=*")
-    experiments = res.get("@graph", [])
-    console.log(f"Found {len(experiments)} experiment(s) to fetch.")
+    if fields:
+        # Projected search results carry everything build_file_record needs.
+        params_list.extend(("field", f) for f in fields)
+    if engine == "async":
+        from .async_engine import AsyncEncodeClient, search_experiments_async
+
+        async def run():
+            async with AsyncEncodeClient(concurrency, auth_token=auth_token, cache=cache,
+                                         max_rps=transport.rate_limiter.rate, retry=transport.retry) as client:
+                result = await search_experiments_async(
+                    params_list, client, page_size=page_size, file_types=file_types, assembly=assembly,
+                    status=status, progress=progress, fields=fields, extra_fields=extra_fields,
+                )
+            console.log(f"HTTP: {client.stats.summary()}")
+            return result
+        return asyncio.run(run())
+    # The listing never goes through the response cache: a cached page would hide
+    # experiments released or removed since it was stored.
+    if journal is not None and journal.search_results is not None:
+        experiments = [{"accession": acc} for acc in journal.search_results]
+        console.log(f"Reusing {len(experiments)} search result(s) from the run journal.")
+    elif page_size:
+        experiments = iter_search(params_list, page_size=page_size, auth=auth, raw_query="control_type!=*",
+                                  transport=transport)
+        console.log(f"Streaming search results in pages of {page_size}.")
+    else:
+        res = search_json(params_list, auth=auth, raw_query="control_type!=*", transport=transport)
+        experiments = res.get("@graph", [])
+        console.log(f"Found {len(experiments)} experiment(s) to fetch.")
+    if journal is not None and journal.search_results is None:
+        experiments = list(experiments)
+        journal.record_search([e["accession"] for e in experiments if e.get("accession")])
+    if engine == "files":
+        from .file_search import files_to_df
+        return files_to_df([e.get("accession") for e in experiments], file_types=file_types,
+                           assembly=assembly, status=status, auth_token=auth_token, threads=threads,
+                           transport=transport, cache=cache, extra_fields=extra_fields)
     return experiments_to_df(experiments, file_types=file_types, assembly=assembly, status=status,
-                             auth_token=auth_token, progress=progress, threads=threads)
+                             auth_token=auth_token, progress=progress, threads=threads,
+                             transport=transport, cache=cache, fields=fields, extra_fields=extra_fields,
+                             journal=journal, on_experiment=on_experiment)
 
 def search_accessions(accessions: List[str],
                       file_types: Optional[Set[str]] = None,
@@ -289,13 +443,69 @@ def search_accessions(accessions: List[str],
                       status: str = "released",
                       auth_token: Optional[str] = None,
                       progress: bool = False,
-                      threads: int = 6,):
+                      threads: int = 6,
+                      transport: Optional[Transport] = None,
+                      cache: Optional[ResponseCache] = None,
+                      batch_size: int = 0,
+                      projection: bool = False,
+                      extra_fields: Optional[Sequence[str]] = None,
+                      engine: str = "threads",
+                      concurrency: int = 64,
+                      journal: Optional[RunJournal] = None,
+                      on_experiment: Optional[Callable[[List[dict]], None]] = None,):
     auth = (auth_token, "") if auth_token else None
+    transport = transport or get_transport(threads)
+    fields = projection_fields(extra_fields) if projection else None
     clean_accessions = [acc.strip() for acc in accessions if acc.strip()]
+    if engine == "async":
+        from .async_engine import AsyncEncodeClient, search_accessions_async
+
+        async def run():
+            async with AsyncEncodeClient(concurrency, auth_token=auth_token, cache=cache,
+                                         max_rps=transport.rate_limiter.rate, retry=transport.retry) as client:
+                result = await search_accessions_async(
+                    clean_accessions, client, batch_size=batch_size, file_types=file_types,
+                    assembly=assembly, status=status, progress=progress, fields=fields,
+                    extra_fields=extra_fields,
+                )
+            console.log(f"HTTP: {client.stats.summary()}")
+            return result
+        return asyncio.run(run())
+    if engine == "files":
+        from .file_search import files_to_df
+        return files_to_df(clean_accessions, file_types=file_types, assembly=assembly, status=status,
+                           auth_token=auth_token, threads=threads, transport=transport, cache=cache,
+                           batch_size=batch_size, extra_fields=extra_fields)
+
+    def fetch_one(acc):
+        return fetch_experiment(acc, auth=auth, transport=transport, cache=cache, fields=fields)
+
+    def fetch_batch(batch):
+        return fetch_experiments_batch(batch, auth=auth, transport=transport, cache=cache, fields=fields)
+
+    todo = list(dict.fromkeys(clean_accessions))
+    if journal is not None:
+        # Experiments completed before a crash are rebuilt from the journal, not fetched.
+        todo = [acc for acc in todo if not journal.experiment_completed(acc)]
     with ThreadPoolExecutor(max_workers=threads) as ex:
-        experiments = list(ex.map(lambda acc: fetch_experiment(acc, auth=auth), clean_accessions))
+        if batch_size and batch_size > 1:
+            found: Dict[str, dict] = {}
+            batches = list(batch_accessions(todo, batch_size, fields=fields))
+            for res in ex.map(fetch_batch, batches):
+                found.update(res)
+            missing = [acc for acc in todo if acc not in found]
+            if missing:
+                console.log(f"Batched search missed {len(missing)} accession(s); fetching individually.")
+                for acc, exp in zip(missing, ex.map(fetch_one, missing)):
+                    found[acc] = exp
+            console.log(f"Fetched {len(found)} experiment(s) in {len(batches)} batch request(s).")
+        else:
+            found = dict(zip(todo, ex.map(fetch_one, todo)))
+    experiments = [found[acc] if acc in found else {"accession": acc} for acc in clean_accessions]
     return experiments_to_df(experiments, file_types=file_types, assembly=assembly, status=status,
-                             auth_token=auth_token, progress=progress, threads=threads)
+                             auth_token=auth_token, progress=progress, threads=threads,
+                             transport=transport, cache=cache, fields=fields, extra_fields=extra_fields,
+                             journal=journal, on_experiment=on_experiment)
 
 def ensure_dir(p: Path): p.mkdir(parents=True, exist_ok=True)
 
@@ -309,69 +519,119 @@ def download_file(
     chunk: int = 1024 * 1024,
     retries: int = 3,
     sleep: int = 1,
-) -> bool:
-    import requests, time
+    transport: Optional[Transport] = None,
+    journal: Optional[RunJournal] = None,
+    size: Optional[int] = None,
+    md5: Optional[str] = None,
+    verify: str = "md5",
+    bandwidth: Optional[TokenBucket] = None,
+) -> DownloadResult:
+    """Stream ``url`` to ``dest_path`` through a ``.part`` file, resuming and verifying it.
+
+    With ``verify="md5"`` and a known ``md5`` the bytes are hashed as they are
+    written. A download that fails its size or checksum check is discarded
+    and retried within ``retries``. ``bandwidth`` is a byte-rate bucket shared
+    by all downloads.
+    """
+    import time
+    transport = transport or get_transport()
     # ensure dir
     dest_path.parent.mkdir(parents=True, exist_ok=True)
     tmp = dest_path.with_suffix(dest_path.suffix + ".part")
-
-    headers = {}
-    # Resume support
-    pos = tmp.stat().st_size if tmp.exists() else 0
-    if pos:
-        headers["Range"] = f"bytes={pos}-"
-        progress.update(task_id, completed=pos)
+    state = journal.download_state(dest_path) if journal is not None else {}
+    hashing = verify == "md5" and bool(md5)
+    hasher, hashed = None, 0
+    error = ""
 
     for _ in range(retries):
+        headers = {}
+        # Resume support; re-read the offset since a failed attempt may have written more.
+        pos = tmp.stat().st_size if tmp.exists() else 0
+        if pos:
+            headers["Range"] = f"bytes={pos}-"
+            # Only append if the file is unchanged since the partial download started.
+            validator = state.get("etag") or state.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+            progress.update(task_id, completed=pos)
+        if hashing and (hasher is None or hashed != pos):
+            # Hash the bytes already on disk once; later chunks are hashed as they arrive.
+            hasher = file_md5(tmp) if pos else hashlib.md5()
+            hashed = pos
         try:
-            with requests.get(url, headers=headers, stream=True, auth=auth, timeout=60) as r:
+            with transport.get(url, headers=headers, stream=True, auth=auth, timeout=60) as r:
                 if r.status_code in (200, 206):
+                    if r.status_code == 200 and pos:
+                        # Range ignored, or the file changed: start over.
+                        pos = 0
+                        progress.update(task_id, completed=0)
+                        if hashing:
+                            hasher, hashed = hashlib.md5(), 0
+                    if journal is not None:
+                        etag = r.headers.get("ETag", "")
+                        state = {"etag": "" if etag.startswith("W/") else etag,
+                                 "last_modified": r.headers.get("Last-Modified", "")}
+                        journal.record_download(dest_path, url=url, bytes=pos, done=False, **state)
                     mode = "ab" if pos else "wb"
                     with open(tmp, mode) as f:
                         for chunk_data in r.iter_content(chunk_size=chunk):
                             if not chunk_data:
                                 continue
                             f.write(chunk_data)
+                            if hashing:
+                                hasher.update(chunk_data)
+                                hashed += len(chunk_data)
                             progress.update(task_id, advance=len(chunk_data))
+                            if bandwidth is not None:
+                                bandwidth.acquire(len(chunk_data))
+                    verified, error = check_file(tmp.stat().st_size, hasher.hexdigest() if hashing else None,
+                                                 size=size, md5=md5, policy=verify)
+                    if error:
+                        console.log(f"{dest_path.name}: {error}; downloading again.")
+                        tmp.unlink(missing_ok=True)
+                        hasher, hashed = None, 0
+                        progress.update(task_id, completed=0)
+                        time.sleep(sleep)
+                        continue
                     tmp.replace(dest_path)
+                    if journal is not None:
+                        journal.record_download(dest_path, url=url, bytes=dest_path.stat().st_size, done=True)
                     progress.update(task_id, completed=progress.tasks[task_id].total or progress.tasks[task_id].completed)
-                    return True
+                    return DownloadResult(True, verified, hasher.hexdigest() if hashing else "")
                 else:
                     time.sleep(sleep)
         except Exception:
             time.sleep(sleep)
-    return False
+    return DownloadResult(False, "failed" if error else "", error=error)
 
 TF_BINDING_ASSAYS = ("tf chip-seq", "chipseq", "chip-seq", "histone chip-seq")
 TRANSCRIPTOME_ASSAYS = ("rna-seq","total-rna-seq","long rna-seq","polya plus rna-seq", "polya minus rna-seq", "small rna-seq")
 DNA_ACCESSIBILITY_ASSAYS = ("atac-seq", "dnase-seq", "dnas-seq", "snatac-seq","faire-seq","mnase-seq")
 
 
-def write_nfcore_sheet(df: pd.DataFrame, assay_title, outpath: Path, control_strategy: str = "all"):
-    ''' NF-core sheets '''
+def assay_exporters(assay_title: str, flavor: str) -> List[str]:
+    """``EXPORTER_REGISTRY`` names of the ``flavor`` ("nfcore" or "snakemake") exporters for an assay."""
+    assay = (assay_title or "").lower()
+    names = []
     # TF binding assays
-    if assay_title.lower() in TF_BINDING_ASSAYS:
-        NFCoreChipseq().write(df, outpath, control_strategy=control_strategy)
-
+    if assay in TF_BINDING_ASSAYS:
+        names.append(f"{flavor}_chipseq")
     # Transcriptome assays
-    if assay_title.lower() in TRANSCRIPTOME_ASSAYS:
-        NFCoreRNAseq().write(df, outpath, control_strategy=control_strategy)
-    
-    #Chromatin accessibility assays
-    if assay_title.lower() in DNA_ACCESSIBILITY_ASSAYS:
-        NFCoreATACseq().write(df, outpath, control_strategy=control_strategy)
-
-def write_snakemake_sheet(df: pd.DataFrame, assay_title, outpath: Path, control_strategy: str = "all"):
-    ''' Snakemake sheets '''
-
-    # TF binding assays
-    if assay_title.lower() in TF_BINDING_ASSAYS:
-        SnakemakeChipseq().write(df, outpath, control_strategy=control_strategy)
+    if assay in TRANSCRIPTOME_ASSAYS:
+        names.append(f"{flavor}_rnaseq")
+    # Chromatin accessibility assays
+    if assay in DNA_ACCESSIBILITY_ASSAYS:
+        names.append(f"{flavor}_atacseq")
+    return names
+
+def write_nfcore_sheet(df: pd.DataFrame, assay_title, outpath: Path, control_strategy: str = "all",
+                       context: Optional[ExportContext] = None):
+    ''' NF-core sheets '''
+    write_samplesheets(df, {name: outpath for name in assay_exporters(assay_title, "nfcore")},
+                       control_strategy=control_strategy, context=context)
 
-    # Transcriptome assays
-    if assay_title.lower() in TRANSCRIPTOME_ASSAYS:
-        SnakemakeRNAseq().write(df, outpath, control_strategy=control_strategy)
-    
-    #Chromatin accessibility assays
-    if assay_title.lower() in DNA_ACCESSIBILITY_ASSAYS:
-        SnakemakeATACseq().write(df, outpath, control_strategy=control_strategy)
+def write_snakemake_sheet(df: pd.DataFrame, assay_title, outpath: Path, control_strategy: str = "all",
+                          context: Optional[ExportContext] = None):
+    ''' Snakemake sheets '''
+    write_samplesheets(df, {name: outpath for name in assay_exporters(assay_title, "snakemake")},
+                       control_strategy=control_strategy, context=context)
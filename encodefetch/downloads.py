@@ -0,0 +1,679 @@
+"""Download phase: destination layout, task lists, and the pipelined downloader.
+
+Files are stored as ``files/{case,control}/<experiment>/<file>.<ext>``.
+``download_items`` and ``download_all`` run the classic phase after the
+manifest is written. ``DownloadPipeline`` instead starts downloads while
+metadata is still being fetched. The metadata engine hands it each
+experiment's records as soon as the experiment and its controls are resolved.
+
+Files of at least ``segment_threshold`` bytes are fetched by
+``download_segmented``: ``segments`` byte ranges are downloaded concurrently
+into a preallocated ``.part`` file. Each range's progress is kept in a
+``.part.segments`` sidecar so an interrupted download resumes per range.
+
+Downloads are checked against the manifest's ``file_size`` and ``md5sum``
+(see ``encodefetch.verify``). Segments arrive out of order, so a segmented
+file is hashed in one sequential pass once all ranges are written; if that
+check fails, the file is downloaded again as a single stream.
+
+Work is scheduled largest file first, so big files do not start last and
+leave a long tail with only a few busy workers. With workers pulling from one
+shared queue this is the longest-processing-time (LPT) packing rule. A
+``TokenBucket`` shared by all workers caps the aggregate bandwidth.
+``TransferProgress`` adds an overall row whose remaining time and finish
+time are the projection for the whole phase.
+
+With ``adaptive=True`` the number of active downloads is not fixed.
+``AdaptiveConcurrency`` raises or lowers it at runtime from the measured
+aggregate throughput and error rate, within user-given bounds.
+"""
+from __future__ import annotations
+
+import concurrent.futures as cf
+import datetime
+import json
+import os
+import queue
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+from rich import filesize
+from rich.console import Console
+from rich.progress import (
+    Progress, ProgressColumn, SpinnerColumn, TextColumn, BarColumn,
+    DownloadColumn, TransferSpeedColumn, TimeRemainingColumn
+)
+from rich.text import Text
+
+from .core import download_file
+from .journal import RunJournal
+from .ratelimit import AdaptiveLimiter, RequestStats, TokenBucket
+from .transport import Transport, get_transport
+from .verify import DownloadResult, check_file, file_md5
+
+console = Console(stderr=True)
+
+SEGMENTS = 4
+SEGMENT_THRESHOLD = 1024 ** 3
+SCHEDULES = ("largest", "manifest")
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+_RATE = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([kmgt]?)i?b?(?:/s)?\s*$", re.IGNORECASE)
+_RATE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+
+class _FinishColumn(ProgressColumn):
+    """Projected wall-clock finish time, shown on the overall row only."""
+
+    def render(self, task) -> Text:
+        if not task.fields.get("overall") or task.time_remaining is None:
+            return Text("")
+        finish = time.localtime(time.time() + task.time_remaining)
+        return Text(f"done ~{time.strftime('%H:%M', finish)}", style="progress.remaining")
+
+
+def _progress_columns():
+    return [
+        SpinnerColumn(),
+        TextColumn("[green]{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        TimeRemainingColumn(),
+        _FinishColumn(),
+    ]
+
+
+def parse_rate(value) -> float:
+    """Bytes per second from ``"50M"``, ``"1.5G"``, ``"800KiB/s"`` or a plain number; 0 = unlimited."""
+    match = _RATE.match(str(value or "0"))
+    if not match:
+        raise ValueError(f"Invalid bandwidth {value!r}; use a number of bytes per second such as 500K, 50M or 1G.")
+    return float(match.group(1)) * _RATE_UNITS[match.group(2).lower()]
+
+
+def schedule_items(items: List[dict], schedule: str = "largest") -> List[dict]:
+    """``items`` in download order: ``largest`` first (unknown sizes last) or ``manifest`` order."""
+    if schedule == "manifest":
+        return list(items)
+    return sorted(items, key=lambda it: -(it.get("size") or 0))
+
+
+class TransferProgress:
+    """Rich ``Progress`` with an overall row that sums the bytes of every file.
+
+    It is passed wherever the download functions expect a ``Progress``. Each
+    file task's change in ``completed`` is mirrored on the overall row, whose
+    total grows with ``expect``. Files of unknown size add nothing to the
+    total, so the projection can be early. ``transferred`` counts every byte
+    received, including bytes of attempts that were later restarted.
+    """
+
+    def __init__(self, **kwargs):
+        self.progress = Progress(*_progress_columns(), **kwargs)
+        self.overall = self.progress.add_task("[bold]All files", total=0, overall=True)
+        self.transferred = 0
+        self._completed: dict = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.progress, name)
+
+    def __enter__(self):
+        self.progress.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.progress.stop()
+
+    def expect(self, size: Optional[int]):
+        if size:
+            with self._lock:
+                self.progress.update(self.overall, total=self.progress.tasks[self.overall].total + size)
+
+    def update(self, task_id, *, completed=None, advance=None, **kwargs):
+        with self._lock:
+            old = self._completed.get(task_id, 0)
+            new = completed if completed is not None else old + (advance or 0)
+            self._completed[task_id] = new
+            self.transferred += max(0, new - old)
+        self.progress.update(task_id, completed=completed, advance=advance, **kwargs)
+        if new != old:
+            self.progress.update(self.overall, advance=new - old)
+
+
+class AdaptiveConcurrency:
+    """Runtime control of the number of active downloads.
+
+    Workers hold ``limiter`` while they download a file, so at most ``limit``
+    files are in flight out of ``maximum`` worker threads. Every ``interval``
+    seconds a background thread measures the aggregate byte rate and the
+    errors since the last sample: throttled or failed requests in ``stats``
+    plus failed files. Errors halve the limit. Otherwise the limit moves one
+    step at a time. It keeps going while throughput improves by more than
+    ``gain`` over the rate at the last change, turns around when throughput
+    falls by more than ``gain``, and holds in between. It also holds while
+    not every slot is busy. Every sample is kept in ``history`` as
+    ``(seconds, limit, bytes/s)``, and every change is logged.
+    """
+
+    def __init__(self, start: int, minimum: int = 1, maximum: Optional[int] = None, *, interval: float = 5.0,
+                 gain: float = 0.1):
+        self.limiter = AdaptiveLimiter(start, minimum=minimum, maximum=maximum or start)
+        self.interval = interval
+        self.gain = gain
+        self.history: List[Tuple[float, int, float]] = []
+        self.failures = 0
+        self._direction = 1
+        self._base_rate: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = time.monotonic()
+
+    @property
+    def limit(self) -> int:
+        return self.limiter.limit
+
+    def record(self, ok: bool):
+        if not ok:
+            with self._lock:
+                self.failures += 1
+
+    def adjust(self, rate: float, errors: int = 0, saturated: bool = True) -> int:
+        """Apply one control decision for a measured ``rate`` (bytes/s); return the new limit."""
+        old = self.limiter.limit
+        if errors:
+            # Back off, then probe upward again from a fresh measurement.
+            self.limiter.set_limit(old // 2)
+            self._direction, self._base_rate = 1, None
+        elif saturated:
+            base = self._base_rate
+            if base is not None and rate < base * (1 - self.gain):
+                self._direction = -self._direction
+            if base is None or abs(rate - base) > base * self.gain:
+                self.limiter.set_limit(old + self._direction)
+                self._base_rate = rate
+        new = self.limiter.limit
+        if new == self.limiter.minimum:
+            self._direction = 1
+        self.history.append((round(time.monotonic() - self._started, 1), new, rate))
+        if new != old:
+            note = f", {errors} error(s)" if errors else ""
+            console.log(f"Download concurrency {old} -> {new} at {filesize.decimal(int(rate))}/s{note}.")
+        return new
+
+    def start(self, progress: TransferProgress, stats: Optional[RequestStats] = None):
+        def errors() -> int:
+            return self.failures + (stats.throttled + stats.failures if stats is not None else 0)
+
+        def run():
+            last_bytes, last_errors, last_time = progress.transferred, errors(), time.monotonic()
+            while not self._stop.wait(self.interval):
+                now, done, failed = time.monotonic(), progress.transferred, errors()
+                self.adjust((done - last_bytes) / max(now - last_time, 1e-9), failed - last_errors,
+                            saturated=self.limiter.active >= self.limiter.limit)
+                last_bytes, last_errors, last_time = done, failed, now
+
+        console.log(f"Adaptive download concurrency: starting at {self.limit} "
+                    f"(range {self.limiter.minimum}-{self.limiter.maximum}).")
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            console.log(f"Download concurrency ended at {self.limit} after {len(self.history)} sample(s).")
+
+
+def _fetch_gated(control: Optional[AdaptiveConcurrency], item: dict, **kwargs) -> DownloadResult:
+    """``fetch_item``, holding a slot of ``control`` while the file downloads."""
+    if control is None:
+        return fetch_item(item, **kwargs)
+    with control.limiter:
+        result = fetch_item(item, **kwargs)
+    control.record(bool(result))
+    return result
+
+
+def file_ext(file_format) -> str:
+    fmt = (file_format or "dat").lower()
+    if fmt == "fastq":
+        fmt = "fastq.gz"
+    return fmt
+
+
+def make_dest(files_dir: Path, is_control, experiment_accession, file_accession, file_format) -> Path:
+    typ = "control" if is_control else "case"
+    return Path(files_dir) / typ / experiment_accession / f"{file_accession}.{file_ext(file_format)}"
+
+
+def accession_from_download_url(url) -> str:
+    value = str(url or "").strip()
+    if "/files/" in value:
+        return value.split("/files/", 1)[1].strip("/").split("/")[0]
+    name = Path(value).name
+    return name.split(".", 1)[0] if name else ""
+
+
+def parse_file_size(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        size = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return size if size > 0 else None
+
+
+def _text(value) -> str:
+    """Cell value as a stripped string; missing values (None, NaN from a TSV) become ``""``."""
+    return "" if value is None or pd.isna(value) else str(value).strip()
+
+
+def _r2_accession(row) -> str:
+    r2_acc = _text(row.get("file_accession_r2"))
+    return r2_acc or accession_from_download_url(row.get("url_r2", ""))
+
+
+def _add_item(items: List[dict], seen: Set[Path], *, url, dest, size, md5, label):
+    if not url or not dest or dest in seen:
+        return
+    seen.add(dest)
+    items.append({"url": url, "dest": dest, "size": size, "md5": md5, "label": label})
+
+
+def manifest_files(df: pd.DataFrame, files_dir: Path) -> List[dict]:
+    """One task per distinct file of the manifest rows (R1 and R2), present or not."""
+    items: List[dict] = []
+    seen: Set[Path] = set()
+    for _, row in df.iterrows():
+        dest = make_dest(files_dir, row["is_control"], row["experiment_accession"],
+                         row["file_accession"], row["file_format"])
+        size = parse_file_size(row.get("file_size", ""))
+        label = f"{row['file_accession']} ({row['experiment_accession']})"
+        _add_item(items, seen, url=_text(row.get("url")), dest=dest, size=size, md5=_text(row.get("md5sum")),
+                  label=label)
+
+        r2_acc = _text(row.get("file_accession_r2"))
+        r2_url = _text(row.get("url_r2"))
+        if not r2_acc:
+            r2_acc = accession_from_download_url(r2_url)
+        if r2_acc and r2_url:
+            r2_dest = make_dest(files_dir, row["is_control"], row["experiment_accession"], r2_acc,
+                                row["file_format"])
+            r2_size = parse_file_size(row.get("file_size_r2", ""))
+            r2_label = f"{r2_acc} ({row['experiment_accession']})"
+            _add_item(items, seen, url=r2_url, dest=r2_dest, size=r2_size, md5=_text(row.get("md5sum_r2")),
+                      label=r2_label)
+    return items
+
+
+def download_items(df: pd.DataFrame, files_dir: Path) -> List[dict]:
+    """Download tasks for the manifest rows (R1 and R2), skipping files already present."""
+    return [it for it in manifest_files(df, files_dir) if not it["dest"].exists()]
+
+
+def _probe_ranges(url: str, auth, transport: Transport) -> Optional[dict]:
+    """Ask for the first byte; return the size and validators if ranges are honored, else None.
+
+    The validators are kept apart (``etag``, ``last_modified``) as the journal
+    stores them, so each is sent back in ``If-Range`` as what it is.
+    """
+    try:
+        with transport.get(url, headers={"Range": "bytes=0-0"}, stream=True, auth=auth, timeout=60) as r:
+            match = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+            if r.status_code != 206 or not match:
+                return None
+            etag = r.headers.get("ETag", "")
+            return {
+                "size": int(match.group(3)) if match.group(3) != "*" else None,
+                # Weak ETags cannot be used with If-Range.
+                "etag": "" if etag.startswith("W/") else etag,
+                "last_modified": r.headers.get("Last-Modified", ""),
+            }
+    except Exception:
+        return None
+
+
+def _split(size: int, segments: int) -> List[List[int]]:
+    """``[start, end, done]`` byte ranges (``end`` inclusive) covering ``size`` bytes."""
+    step = -(-size // segments)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+
+def _save_segments(path: Path, state: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+
+def _load_segments(path: Path) -> Optional[dict]:
+    try:
+        with open(path) as fh:
+            state = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("segments") else None
+
+
+def download_segmented(url: str, dest_path: Path, size: int, *, progress, task_id: int, segments: int = SEGMENTS,
+                       auth=None, chunk: int = 1024 * 1024, retries: int = 3, sleep: int = 1,
+                       transport: Optional[Transport] = None, journal: Optional[RunJournal] = None,
+                       md5: Optional[str] = None, verify: str = "md5",
+                       bandwidth: Optional[TokenBucket] = None) -> DownloadResult:
+    """Download ``url`` as ``segments`` concurrent byte ranges, resuming each range separately.
+
+    Falls back to ``download_file`` (one stream) when the server does not honor
+    ``Range``, when the file changes between requests, or when a single-stream
+    ``.part`` file from an earlier attempt already exists, and when the
+    assembled file fails verification.
+    """
+    transport = transport or get_transport()
+    expected_size = size
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest_path.with_suffix(dest_path.suffix + ".part")
+    sidecar = tmp.with_name(tmp.name + ".segments")
+
+    def single_stream():
+        return download_file(url, dest_path, progress=progress, task_id=task_id, auth=auth, chunk=chunk,
+                             retries=retries, sleep=sleep, transport=transport, journal=journal,
+                             size=expected_size, md5=md5, verify=verify, bandwidth=bandwidth)
+
+    state = _load_segments(sidecar) if tmp.exists() else None
+    if state is None:
+        if tmp.exists() and not sidecar.exists():
+            return single_stream()
+        probe = _probe_ranges(url, auth, transport)
+        if probe is None:
+            console.log(f"{url} does not support range requests; using a single stream.")
+            return single_stream()
+        size = probe["size"] or size
+        state = {"size": size, "etag": probe["etag"], "last_modified": probe["last_modified"],
+                 "segments": _split(size, max(1, segments))}
+        with open(tmp, "wb") as f:
+            f.truncate(size)
+        _save_segments(sidecar, state)
+        if journal is not None:
+            journal.record_download(dest_path, url=url, bytes=0, done=False, etag=probe["etag"],
+                                    last_modified=probe["last_modified"])
+    size = state["size"]
+    progress.update(task_id, total=size, completed=sum(seg[2] for seg in state["segments"]))
+
+    lock = threading.Lock()
+    restart = threading.Event()
+    validator = state.get("etag") or state.get("last_modified")
+
+    def fetch(seg: List[int]) -> bool:
+        start, end = seg[0], seg[1]
+        for _ in range(retries):
+            offset = start + seg[2]
+            if offset > end or restart.is_set():
+                break
+            headers = {"Range": f"bytes={offset}-{end}"}
+            if validator:
+                headers["If-Range"] = validator
+            try:
+                with transport.get(url, headers=headers, stream=True, auth=auth, timeout=60) as r:
+                    if r.status_code == 200:
+                        # Range ignored, or the file changed since the first segment.
+                        restart.set()
+                        break
+                    if r.status_code != 206:
+                        time.sleep(sleep)
+                        continue
+                    with open(tmp, "r+b") as f:
+                        f.seek(offset)
+                        for data in r.iter_content(chunk_size=chunk):
+                            data = data[:end + 1 - offset]
+                            if not data:
+                                continue
+                            f.write(data)
+                            # Data reaches the OS before the sidecar claims it.
+                            f.flush()
+                            offset += len(data)
+                            with lock:
+                                seg[2] = offset - start
+                                _save_segments(sidecar, state)
+                            progress.update(task_id, advance=len(data))
+                            if bandwidth is not None:
+                                bandwidth.acquire(len(data))
+            except Exception:
+                time.sleep(sleep)
+        return start + seg[2] > end
+
+    with cf.ThreadPoolExecutor(max_workers=len(state["segments"])) as ex:
+        ok = all(list(ex.map(fetch, state["segments"])))
+    if restart.is_set():
+        sidecar.unlink(missing_ok=True)
+        tmp.unlink(missing_ok=True)
+        progress.update(task_id, completed=0)
+        return single_stream()
+    if not ok:
+        return DownloadResult(False)
+    digest = file_md5(tmp).hexdigest() if verify == "md5" and md5 else None
+    verified, error = check_file(tmp.stat().st_size, digest, size=expected_size, md5=md5, policy=verify)
+    sidecar.unlink(missing_ok=True)
+    if error:
+        console.log(f"{dest_path.name}: {error}; downloading again as a single stream.")
+        tmp.unlink(missing_ok=True)
+        progress.update(task_id, completed=0)
+        return single_stream()
+    tmp.replace(dest_path)
+    if journal is not None:
+        journal.record_download(dest_path, url=url, bytes=size, done=True)
+    return DownloadResult(True, verified, digest or "")
+
+
+def fetch_item(item: dict, *, progress, task_id: int, segments: int = SEGMENTS,
+               segment_threshold: int = SEGMENT_THRESHOLD, **kwargs) -> DownloadResult:
+    """Download one task from ``download_items``, segmented when it is large enough."""
+    md5 = item.get("md5") or None
+    if segments > 1 and item["size"] and item["size"] >= segment_threshold:
+        return download_segmented(item["url"], item["dest"], item["size"], progress=progress, task_id=task_id,
+                                  segments=segments, md5=md5, **kwargs)
+    return download_file(item["url"], item["dest"], progress=progress, task_id=task_id, size=item["size"],
+                         md5=md5, **kwargs)
+
+
+def download_all(items: List[dict], *, threads: int = 6, auth=None, chunk_size: int = 1024 * 1024,
+                 max_retries: int = 3, transport: Optional[Transport] = None,
+                 journal: Optional[RunJournal] = None, segments: int = SEGMENTS,
+                 segment_threshold: int = SEGMENT_THRESHOLD, verify: str = "md5", schedule: str = "largest",
+                 bandwidth: Optional[TokenBucket] = None, adaptive: bool = False, min_threads: int = 1,
+                 max_threads: Optional[int] = None) -> Dict[Path, DownloadResult]:
+    """Download ``items`` in ``schedule`` order and return the result per destination.
+
+    Shows one progress bar per file plus the overall projection. With
+    ``adaptive``, ``threads`` is the starting concurrency, which then moves
+    between ``min_threads`` and ``max_threads`` (default ``4 * threads``).
+    """
+    control = AdaptiveConcurrency(threads, min_threads, max_threads or 4 * threads) if adaptive else None
+    workers = control.limiter.maximum if control is not None else threads
+    items = schedule_items(items, schedule)
+    total = sum(it["size"] or 0 for it in items)
+    order = "largest first" if schedule == "largest" else "in manifest order"
+    message = f"Downloading {len(items)} file(s), {filesize.decimal(total)}, {order} on {workers} worker(s)."
+    if bandwidth is not None and bandwidth.rate > 0:
+        eta = datetime.timedelta(seconds=round(total / bandwidth.rate))
+        message += f" At {filesize.decimal(int(bandwidth.rate))}/s this takes at least {eta}."
+    console.log(message)
+    with TransferProgress() as prog, cf.ThreadPoolExecutor(max_workers=workers) as ex:
+        for it in items:
+            prog.expect(it["size"])
+        if control is not None:
+            control.start(prog, getattr(transport or get_transport(), "stats", None))
+        futures = []
+        for it in items:
+            # One task per file, total = file size if known
+            task_id = prog.add_task(f"Downloading {it['label']}", total=it["size"])
+            futures.append(ex.submit(
+                _fetch_gated, control, it,
+                progress=prog, task_id=task_id,
+                auth=auth,
+                chunk=chunk_size, retries=max_retries,
+                transport=transport,
+                journal=journal,
+                segments=segments, segment_threshold=segment_threshold,
+                verify=verify, bandwidth=bandwidth,
+            ))
+
+        # Wait for all; exceptions will surface here
+        try:
+            return {it["dest"]: fut.result() for it, fut in zip(items, futures)}
+        finally:
+            if control is not None:
+                control.stop()
+
+
+def add_local_paths(df: pd.DataFrame, files_dir: Path,
+                    results: Optional[Dict[Path, DownloadResult]] = None) -> pd.DataFrame:
+    """Fill ``local_path``/``local_path_r2`` and point ``fastq_1``/``fastq_2`` at downloaded files.
+
+    With ``results`` from this run's downloads, ``verified``/``verified_r2``
+    record the check each file passed (``md5``, ``size``), or ``failed``.
+    """
+    results = results or {}
+    local_paths, local_paths_r2 = [], []
+    verified, verified_r2 = [], []
+    for _, row in df.iterrows():
+        path = make_dest(files_dir, row["is_control"], row["experiment_accession"],
+                         row["file_accession"], row["file_format"])
+        local_paths.append(str(path) if path.exists() else "")
+        verified.append(results[path].verified if path in results else "")
+
+        r2_acc = _r2_accession(row)
+        if r2_acc:
+            path_r2 = make_dest(files_dir, row["is_control"], row["experiment_accession"], r2_acc,
+                                row["file_format"])
+            local_paths_r2.append(str(path_r2) if path_r2.exists() else "")
+            verified_r2.append(results[path_r2].verified if path_r2 in results else "")
+        else:
+            local_paths_r2.append("")
+            verified_r2.append("")
+
+    df["local_path"] = local_paths
+    df["verified"] = verified
+    if "file_accession_r2" in df.columns:
+        df["local_path_r2"] = local_paths_r2
+        df["verified_r2"] = verified_r2
+    if "fastq_1" in df.columns:
+        df["fastq_1"] = df.apply(lambda r: r["local_path"] or r.get("fastq_1", ""), axis=1)
+    if "fastq_2" in df.columns and "local_path_r2" in df.columns:
+        df["fastq_2"] = df.apply(lambda r: r["local_path_r2"] or r.get("fastq_2", ""), axis=1)
+    return df
+
+
+class DownloadPipeline:
+    """Downloads files while the metadata phase is still running.
+
+    ``submit`` takes the file records of one experiment and enqueues one task per
+    new file on a bounded queue. When the queue is full, the metadata worker
+    calling ``submit`` blocks, so fetched metadata never runs far ahead of the
+    downloads. ``threads`` workers drain the queue. ``close`` waits for them and
+    returns the number of failed downloads; ``results`` maps each destination
+    to its ``DownloadResult``. Records are per file (R1 and R2
+    mates separately), so no FASTQ pairing is needed before downloading.
+    The queue is a priority queue: with ``schedule="largest"`` the biggest
+    queued file is started next. ``adaptive`` works as in ``download_all``.
+    """
+
+    _DONE = object()
+
+    def __init__(self, files_dir: Path, *, threads: int = 6, queue_size: int = 64, auth=None,
+                 chunk_size: int = 1024 * 1024, max_retries: int = 3,
+                 transport: Optional[Transport] = None, journal: Optional[RunJournal] = None,
+                 segments: int = SEGMENTS, segment_threshold: int = SEGMENT_THRESHOLD, verify: str = "md5",
+                 schedule: str = "largest", bandwidth: Optional[TokenBucket] = None, adaptive: bool = False,
+                 min_threads: int = 1, max_threads: Optional[int] = None):
+        self.files_dir = Path(files_dir)
+        self.verify = verify
+        self.schedule = schedule
+        self.bandwidth = bandwidth
+        self.segments = segments
+        self.segment_threshold = segment_threshold
+        self.auth = auth
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.transport = transport
+        self.journal = journal
+        self.queued = 0
+        self.failed = 0
+        self.results: Dict[Path, DownloadResult] = {}
+        self._seen: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=max(1, queue_size))
+        self._progress = TransferProgress()
+        self._progress.start()
+        self.control = AdaptiveConcurrency(threads, min_threads, max_threads or 4 * threads) if adaptive else None
+        if self.control is not None:
+            self.control.start(self._progress, getattr(transport or get_transport(), "stats", None))
+        workers = self.control.limiter.maximum if self.control is not None else threads
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, records: Iterable[dict]):
+        for rec in records:
+            dest = make_dest(self.files_dir, rec.get("is_control"), rec.get("experiment_accession"),
+                             rec.get("file_accession"), rec.get("file_format"))
+            url = rec.get("url")
+            with self._lock:
+                if not url or dest in self._seen or dest.exists():
+                    continue
+                self._seen.add(dest)
+                self.queued += 1
+                self._seq += 1
+                seq = self._seq
+            item = {"url": url, "dest": dest, "size": parse_file_size(rec.get("file_size")),
+                    "md5": _text(rec.get("md5sum")),
+                    "label": f"{rec.get('file_accession')} ({rec.get('experiment_accession')})"}
+            self._progress.expect(item["size"])
+            priority = -(item["size"] or 0) if self.schedule == "largest" else 0
+            self._queue.put((priority, seq, item))
+
+    def _work(self):
+        while True:
+            _, _, item = self._queue.get()
+            if item is self._DONE:
+                return
+            task_id = self._progress.add_task(f"Downloading {item['label']}", total=item["size"])
+            try:
+                ok = _fetch_gated(self.control, item, progress=self._progress, task_id=task_id, auth=self.auth,
+                                  chunk=self.chunk_size, retries=self.max_retries, transport=self.transport,
+                                  journal=self.journal, segments=self.segments,
+                                  segment_threshold=self.segment_threshold, verify=self.verify,
+                                  bandwidth=self.bandwidth)
+            except Exception as e:
+                console.log(f"Download of {item['label']} failed: {e}")
+                ok = DownloadResult(False)
+            with self._lock:
+                self.results[item["dest"]] = ok
+                if not ok:
+                    self.failed += 1
+
+    def close(self) -> int:
+        for _ in self._workers:
+            # Sorts after every file, so queued downloads still run first.
+            with self._lock:
+                self._seq += 1
+                seq = self._seq
+            self._queue.put((float("inf"), seq, self._DONE))
+        for worker in self._workers:
+            worker.join()
+        if self.control is not None:
+            self.control.stop()
+        self._progress.stop()
+        return self.failed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
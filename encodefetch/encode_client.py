@@ -1,16 +1,94 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Optional, Dict, Any
+import re
+from typing import Iterator, List, Tuple, Optional, Dict, Any, Sequence
+from urllib.parse import quote
 import requests
 
+from .cache import ResponseCache
+from .transport import Transport, get_transport
+
 ENCODE_BASE = "https://www.encodeproject.org"
 HEADERS = {"accept": "application/json"}
+# Conservative limit that stays below common proxy/server request-line limits.
+MAX_URL_LENGTH = 8000
 
-def encode_get(path_or_url: str,
-               params: Optional[list | dict] = None,
-               auth=None,
-               timeout: int = 120,
-               raw_query: Optional[str] = None) -> Dict[str, Any] | None:
+# Experiment fields read by build_file_record, expand_possible_controls and
+# collect_files_from_experiment; requested with ``field=`` in projection mode.
+EXPERIMENT_FIELDS = [
+    "accession",
+    "assay_title",
+    "biosample_summary",
+    "bio_replicate_count",
+    "control_type",
+    "date_released",
+    "dbxrefs",
+    "life_stage_age",
+    "perturbed",
+    "replication_type",
+    "status",
+    "tech_replicate_count",
+    "lab.title",
+    "award.rfa",
+    "target.label",
+    "target.title",
+    "possible_controls.accession",
+    "biosample_ontology.term_id",
+    "biosample_ontology.term_name",
+    "biosample_ontology.classification",
+    "biosample_ontology.organ_slims",
+    "biosample_ontology.cell_slims",
+    "biosample_ontology.developmental_slims",
+    "biosample_ontology.system_slims",
+    "biosample_ontology.synonyms",
+    "replicates.library.biosample.donor.accession",
+    "replicates.library.biosample.donor.sex",
+    "replicates.library.biosample.donor.life_stage",
+    "replicates.library.biosample.donor.age",
+    "replicates.library.biosample.donor.age_units",
+    "replicates.library.biosample.donor.ethnicity",
+    "replicates.library.biosample.donor.organism.scientific_name",
+    "files.accession",
+    "files.assembly",
+    "files.biological_replicates",
+    "files.biological_replicates_formatted",
+    "files.controlled_by",
+    "files.file_format",
+    "files.file_size",
+    "files.href",
+    "files.md5sum",
+    "files.output_type",
+    "files.paired_end",
+    "files.paired_with",
+    "files.platform.term_name",
+    "files.run_type",
+    "files.status",
+    "files.technical_replicates",
+]
+
+# Experiment-level subset, used when files are fetched separately as File objects.
+EXPERIMENT_ONLY_FIELDS = [f for f in EXPERIMENT_FIELDS if not f.startswith("files.")]
+
+_PLAIN_FIELD = re.compile(r"^[A-Za-z0-9_@]+(\.[A-Za-z0-9_@]+)*$")
+
+def projection_fields(extra_fields: Optional[Sequence[str]] = None) -> Optional[List[str]]:
+    """Return the ``field=`` list for projected fetches, or None when a full frame is needed.
+
+    Extra fields must be plain dotted paths to be projected; anything else
+    (wildcards, empty segments) falls back to full ``frame=embedded`` payloads.
+    """
+    fields = list(EXPERIMENT_FIELDS)
+    for field in extra_fields or []:
+        if not _PLAIN_FIELD.match(field):
+            return None
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+def build_url(path_or_url: str,
+              params: Optional[list | dict] = None,
+              raw_query: Optional[str] = None) -> str:
+    """Return the full URL ``encode_get`` requests (also the response cache key)."""
     url = path_or_url if path_or_url.startswith("http") else (
         ENCODE_BASE.rstrip("/") + "/" + path_or_url.lstrip("/")
     )
@@ -24,21 +102,142 @@ def encode_get(path_or_url: str,
     if not any(k == "format" for k, _ in params):
         params.append(("format", "json"))
 
-    s = requests.Session()
-    req = requests.Request("GET", url, headers=HEADERS, params=params, auth=auth)
-    prepped = s.prepare_request(req)
+    url = requests.Request("GET", url, params=params).prepare().url
     if raw_query:
-        sep = '&' if '?' in prepped.url else '?'
-        prepped.url = f"{prepped.url}{sep}{raw_query}"
-    r = s.send(prepped, timeout=timeout)
+        sep = '&' if '?' in url else '?'
+        url = f"{url}{sep}{raw_query}"
+    return url
+
+def encode_get(path_or_url: str,
+               params: Optional[list | dict] = None,
+               auth=None,
+               timeout: int = 120,
+               raw_query: Optional[str] = None,
+               transport: Optional[Transport] = None,
+               cache: Optional[ResponseCache] = None) -> Dict[str, Any] | None:
+    transport = transport or get_transport()
+    req = requests.Request("GET", build_url(path_or_url, params, raw_query), headers=HEADERS, auth=auth)
+    prepped = transport.session.prepare_request(req)
+
+    entry = None
+    if cache is not None:
+        key = cache.key(prepped.url, auth)
+        entry = cache.get(key)
+        if entry is not None and cache.is_fresh(entry):
+            cache.record("hits")
+            return entry.payload
+        if entry is not None:
+            prepped.headers.update(entry.validators())
+
+    r = transport.send(prepped, timeout=timeout)
+    if entry is not None and r.status_code == 304:
+        cache.record("revalidated")
+        cache.refresh(key, entry)
+        return entry.payload
     r.raise_for_status()
-    return r.json()
+    data = r.json()
+    if cache is not None:
+        cache.record("misses")
+        cache.put(key, prepped.url, data,
+                  etag=r.headers.get("ETag", ""),
+                  last_modified=r.headers.get("Last-Modified", ""))
+    return data
+
+def is_empty_search(status: Optional[int]) -> bool:
+    """True for the status the portal answers a search without results (or a page past the end) with."""
+    return status == 404
 
-def fetch_experiment(accession: str, auth=None, embedded: bool = True):
+def search_json(params: Optional[list | dict] = None,
+                auth=None,
+                raw_query: Optional[str] = None,
+                transport: Optional[Transport] = None,
+                cache: Optional[ResponseCache] = None) -> Dict[str, Any]:
+    """``encode_get`` for ``/search/`` that returns ``{"@graph": []}`` when nothing matched."""
+    try:
+        return encode_get("/search/", params=params, auth=auth, raw_query=raw_query, transport=transport,
+                          cache=cache)
+    except requests.HTTPError as e:
+        if e.response is not None and is_empty_search(e.response.status_code):
+            return {"@graph": []}
+        raise
+
+def fetch_experiment(accession: str, auth=None, embedded: bool = True,
+                     transport: Optional[Transport] = None,
+                     cache: Optional[ResponseCache] = None,
+                     fields: Optional[Sequence[str]] = None):
+    if fields:
+        found = fetch_experiments_batch([accession], auth=auth, transport=transport,
+                                        cache=cache, fields=fields)
+        if accession in found:
+            return found[accession]
     params = {"format": "json"}
     if embedded:
         params["frame"] = "embedded"
-    return encode_get(f"/experiments/{accession}/", params=params, auth=auth)
+    return encode_get(f"/experiments/{accession}/", params=params, auth=auth,
+                      transport=transport, cache=cache)
+
+def batch_accessions(accessions: List[str],
+                     batch_size: int,
+                     max_url_length: int = MAX_URL_LENGTH,
+                     fields: Optional[Sequence[str]] = None,
+                     key: str = "accession",
+                     reserved: int = 0) -> Iterator[List[str]]:
+    """Split accessions into batches of at most ``batch_size`` that fit in one search URL.
+
+    ``key`` is the query parameter each value is sent as (``accession``, ``dataset``, ...)
+    and ``reserved`` accounts for any other query parameters.
+    """
+    base = len(ENCODE_BASE) + len("/search/?type=Experiment&frame=embedded&limit=all&format=json")
+    base += sum(len("&field=") + len(quote(f)) for f in fields or []) + reserved
+    batch: List[str] = []
+    length = base
+    for acc in accessions:
+        extra = len(f"&{key}=") + len(quote(acc, safe=""))
+        if batch and (len(batch) >= batch_size or length + extra > max_url_length):
+            yield batch
+            batch, length = [], base
+        batch.append(acc)
+        length += extra
+    if batch:
+        yield batch
+
+def fetch_experiments_batch(accessions: List[str], auth=None, embedded: bool = True,
+                            transport: Optional[Transport] = None,
+                            cache: Optional[ResponseCache] = None,
+                            fields: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Fetch several experiments with one /search/ request, keyed by accession.
+
+    With ``fields`` only those (dotted) fields are returned instead of the full
+    embedded frame. Accessions the search does not return are absent from the result.
+    """
+    params: List[Tuple[str, str]] = [("type", "Experiment")]
+    params.extend(("accession", acc) for acc in accessions)
+    if fields:
+        params.extend(("field", f) for f in fields)
+    elif embedded:
+        params.append(("frame", "embedded"))
+    params.append(("limit", "all"))
+    res = search_json(params, auth=auth, transport=transport, cache=cache)
+    return {exp["accession"]: exp for exp in res.get("@graph", []) if exp.get("accession")}
+
+def iter_search(params: list | dict,
+                page_size: int = 500,
+                auth=None,
+                raw_query: Optional[str] = None,
+                transport: Optional[Transport] = None,
+                cache: Optional[ResponseCache] = None) -> Iterator[Dict[str, Any]]:
+    """Yield /search/ results page by page using ``from``/``limit`` instead of ``limit=all``."""
+    params = list(params.items()) if isinstance(params, dict) else list(params)
+    params = [(k, v) for k, v in params if k not in ("limit", "from")]
+    start = 0
+    while True:
+        page = params + [("from", str(start)), ("limit", str(page_size))]
+        res = search_json(page, auth=auth, raw_query=raw_query, transport=transport, cache=cache)
+        graph = res.get("@graph", [])
+        yield from graph
+        start += len(graph)
+        if len(graph) < page_size or start >= res.get("total", start + 1):
+            return
 
 def build_params(
     assay_title: Optional[str] = None,
@@ -1,4 +1,4 @@
-from .base import EXPORTER_REGISTRY, Exporter, register_exporter
+from .base import EXPORTER_REGISTRY, Exporter, ExportContext, register_exporter, write_samplesheets
 from .nfcore_chipseq import NFCoreChipseq
 from .snakemake_chipseq import SnakemakeChipseq
 from .nfcore_atacseq import NFCoreATACseq
@@ -1,6 +1,8 @@
 from __future__ import annotations
+from functools import cached_property
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 EXPORTER_REGISTRY: Dict[str, "Exporter"] = {}
@@ -12,10 +14,12 @@ def register_exporter(name: str):
     return deco
 
 class Exporter(ABC):
+    suffix = ".csv"
+
     @abstractmethod
     def name(self) -> str: ...
     @abstractmethod
-    def write(self, df, out_path, control_strategy: str = "all"): ...
+    def write(self, df, out_path, control_strategy: str = "all", context: Optional["ExportContext"] = None): ...
 
 def split_csv(value) -> List[str]:
     if value is None:
@@ -63,74 +67,104 @@ def resolve_controls_for_row(row, file_to_sample: Dict[str, str]) -> List[str]:
             out.append(control)
     return out
 
-def _same_value(left, right) -> bool:
-    left = first_present(left)
-    right = first_present(right)
-    return bool(left and right and left.lower() == right.lower())
-
-def _candidate_rows(df, control: str):
-    if df is None or not control:
-        return []
-
-    rows = []
-    for _, row in df.iterrows():
-        if "is_control" in row and not row.get("is_control"):
-            continue
-        if str(row.get("experiment_accession", "")) == control:
-            rows.append(row)
-            continue
-        if str(row.get("file_accession", "")) == control:
-            rows.append(row)
-    return rows
-
-def _control_score(case_row, control_row) -> int:
-    score = 0
-    weighted_fields: List[Tuple[str, int]] = [
-        ("biosample_term_id", 50),
-        ("biosample_term_name", 35),
-        ("organism", 25),
-        ("lab", 15),
-        ("award", 10),
-        ("classification", 10),
-        ("biological_replicates", 10),
-        ("run_type", 8),
-        ("technical_replicates", 5),
-        ("donor_sex", 5),
-        ("donor_life_stage", 5),
-        ("paired_end", 5),
-        ("file_format", 5),
-    ]
-    for field, weight in weighted_fields:
-        if _same_value(case_row.get(field), control_row.get(field)):
-            score += weight
-
-    if _same_value(control_row.get("file_status"), "released"):
-        score += 5
-    if first_present(
-        control_row.get("fastq_1"),
-        control_row.get("local_path"),
-        control_row.get("url"),
-    ):
-        score += 3
-    return score
-
-def best_control_for_row(controls: List[str], case_row=None, df=None) -> str:
+WEIGHTED_FIELDS: List[Tuple[str, int]] = [
+    ("biosample_term_id", 50),
+    ("biosample_term_name", 35),
+    ("organism", 25),
+    ("lab", 15),
+    ("award", 10),
+    ("classification", 10),
+    ("biological_replicates", 10),
+    ("run_type", 8),
+    ("technical_replicates", 5),
+    ("donor_sex", 5),
+    ("donor_life_stage", 5),
+    ("paired_end", 5),
+    ("file_format", 5),
+]
+
+def _normalized(values) -> np.ndarray:
+    return np.array([first_present(v).lower() for v in values], dtype=object)
+
+def _column(df, name: str, default=None) -> list:
+    return df[name].tolist() if name in df.columns else [default] * len(df)
+
+class ControlIndex:
+    """Control rows of a manifest, indexed for the ``best`` control strategy.
+
+    Maps control experiment and file accessions to row positions and keeps the
+    weighted fields lower-cased in arrays, so scoring a case row against all
+    rows of a control is a handful of vectorized comparisons. ``ExportContext``
+    builds one and shares it between the exporters it is passed to.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        keep = np.array([bool(f) for f in _column(df, "is_control", True)], dtype=bool)
+        controls = df.loc[keep]
+
+        # A control is named either by experiment or by file accession.
+        positions: Dict[str, List[int]] = {}
+        accessions = zip(_column(controls, "experiment_accession", ""), _column(controls, "file_accession", ""))
+        for pos, (exp_acc, file_acc) in enumerate(accessions):
+            exp_acc, file_acc = str(exp_acc), str(file_acc)
+            positions.setdefault(exp_acc, []).append(pos)
+            if file_acc != exp_acc:
+                positions.setdefault(file_acc, []).append(pos)
+        self._positions = {k: np.array(v, dtype=np.int64) for k, v in positions.items() if k}
+
+        self._fields = {f: _normalized(_column(controls, f)) for f, _ in WEIGHTED_FIELDS if f in controls.columns}
+        released = _normalized(_column(controls, "file_status")) == "released"
+        has_path = np.array([bool(first_present(*vals)) for vals in zip(_column(controls, "fastq_1"),
+                                                                         _column(controls, "local_path"),
+                                                                         _column(controls, "url"))], dtype=bool)
+        self._base = released.astype(np.int64) * 5 + has_path.astype(np.int64) * 3
+
+    def __contains__(self, control: str) -> bool:
+        return control in self._positions
+
+    def _wanted(self, case_row) -> List[Tuple[np.ndarray, str, int]]:
+        wanted = []
+        for field, weight in WEIGHTED_FIELDS:
+            values = self._fields.get(field)
+            value = first_present(case_row.get(field)).lower() if values is not None else ""
+            if value:
+                wanted.append((values, value, weight))
+        return wanted
+
+    def _score(self, wanted, control: str) -> int:
+        idx = self._positions.get(control)
+        if idx is None:
+            return 0
+        scores = self._base[idx].copy()
+        for values, value, weight in wanted:
+            scores += (values[idx] == value) * weight
+        return int(scores.max())
+
+    def score(self, case_row, control: str) -> int:
+        """Best score of ``case_row`` against the rows of ``control`` (0 when unknown)."""
+        return self._score(self._wanted(case_row), control)
+
+    def best(self, controls: List[str], case_row) -> str:
+        """Highest-scoring control; ties keep the earlier one."""
+        wanted = self._wanted(case_row)
+        best_control, best_score = controls[0], None
+        for control in controls:
+            score = self._score(wanted, control)
+            if best_score is None or score > best_score:
+                best_control, best_score = control, score
+        return best_control
+
+def best_control_for_row(controls: List[str], case_row=None, df=None,
+                         index: Optional[ControlIndex] = None) -> str:
     if not controls:
         return ""
-    if case_row is None or df is None:
+    if case_row is None or (df is None and index is None):
         return controls[0]
 
-    best_control = controls[0]
-    best_score: Optional[int] = None
-    for control in controls:
-        rows = _candidate_rows(df, control)
-        score = max((_control_score(case_row, row) for row in rows), default=0)
-        if best_score is None or score > best_score:
-            best_control = control
-            best_score = score
-    return best_control
-
-def controls_for_strategy(controls: List[str], strategy: str, case_row=None, df=None) -> List[str]:
+    return (index or ControlIndex(df)).best(controls, case_row)
+
+def controls_for_strategy(controls: List[str], strategy: str, case_row=None, df=None,
+                          index: Optional[ControlIndex] = None) -> List[str]:
     strategy = (strategy or "all").lower()
     if not controls:
         return [""]
@@ -139,5 +173,58 @@ def controls_for_strategy(controls: List[str], strategy: str, case_row=None, df=
     if strategy == "first":
         return [controls[0]]
     if strategy == "best":
-        return [best_control_for_row(controls, case_row=case_row, df=df)]
+        return [best_control_for_row(controls, case_row=case_row, df=df, index=index)]
     return controls
+
+class ExportContext:
+    """Per-manifest work shared by exporters.
+
+    Holds the FASTQ rows, the control file-to-experiment map, the
+    ``ControlIndex`` and each row's resolved controls, computed once. Pass one context to several
+    ``Exporter.write`` calls (or use ``write_samplesheets``) so that writing
+    several samplesheets for the same DataFrame does not repeat it.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.fastq = df[df["file_format"].astype(str).str.lower().eq("fastq")] if "file_format" in df else df
+        self.rows = [r for _, r in self.fastq.iterrows()]
+        self._selected: Dict[str, List[List[str]]] = {}
+
+    @cached_property
+    def file_to_sample(self) -> Dict[str, str]:
+        return control_file_to_sample_map(self.df)
+
+    @cached_property
+    def control_index(self) -> ControlIndex:
+        return ControlIndex(self.df)
+
+    @cached_property
+    def controls(self) -> List[List[str]]:
+        return [[] if r.get("is_control") else resolve_controls_for_row(r, self.file_to_sample) for r in self.rows]
+
+    def selected_controls(self, strategy: str) -> List[List[str]]:
+        """Controls to write for each FASTQ row under ``strategy`` (``[""]`` when none)."""
+        strategy = (strategy or "all").lower()
+        if strategy not in self._selected:
+            index = self.control_index if strategy == "best" else None
+            self._selected[strategy] = [
+                controls_for_strategy(controls, strategy, case_row=r, df=self.df, index=index)
+                for r, controls in zip(self.rows, self.controls)
+            ]
+        return self._selected[strategy]
+
+def write_samplesheets(df: pd.DataFrame, targets: Dict[str, str], control_strategy: str = "all",
+                       context: Optional[ExportContext] = None) -> Dict[str, str]:
+    """Write several registered samplesheets from one shared ``ExportContext``.
+
+    ``targets`` maps ``EXPORTER_REGISTRY`` names to output paths.
+    """
+    unknown = [name for name in targets if name not in EXPORTER_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown exporter(s): {', '.join(unknown)}. "
+                         f"Available: {', '.join(sorted(EXPORTER_REGISTRY))}")
+    context = context or ExportContext(df)
+    for name, out_path in targets.items():
+        EXPORTER_REGISTRY[name].write(df, out_path, control_strategy=control_strategy, context=context)
+    return targets
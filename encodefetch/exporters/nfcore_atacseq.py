@@ -1,19 +1,19 @@
+from typing import Optional
+
 import pandas as pd
-from .base import Exporter, register_exporter, control_file_to_sample_map, resolve_controls_for_row, controls_for_strategy
+from .base import Exporter, ExportContext, register_exporter
 
 @register_exporter("nfcore_atacseq")
 class NFCoreATACseq(Exporter):
     def name(self) -> str: return "nfcore_atacseq"
 
-    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all"):
-        fq = df[df["file_format"].astype(str).str.lower().eq("fastq")] if "file_format" in df else df
-        file_to_sample = control_file_to_sample_map(df)
+    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all", context: Optional[ExportContext] = None):
+        context = context or ExportContext(df)
         rows = []
-        for _, r in fq.iterrows():
+        for r, controls in zip(context.rows, context.selected_controls(control_strategy)):
             exp = r["experiment_accession"]
             rep = (r.get("biological_replicates") or "1").split(",")[0].strip()
-            controls = [] if r.get("is_control") else resolve_controls_for_row(r, file_to_sample)
-            for control in controls_for_strategy(controls, control_strategy, case_row=r, df=df):
+            for control in controls:
                 rows.append({
                     "sample": exp,
                     "fastq_1": r.get("fastq_1",""),
@@ -1,14 +1,16 @@
+from typing import Optional
+
 import pandas as pd
-from .base import Exporter, register_exporter
+from .base import Exporter, ExportContext, register_exporter
 
 @register_exporter("nfcore_rnaseq")
 class NFCoreRNAseq(Exporter):
     def name(self) -> str: return "nfcore_rnaseq"
 
-    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all"):
-        fq = df[df["file_format"].astype(str).str.lower().eq("fastq")] if "file_format" in df else df
+    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all", context: Optional[ExportContext] = None):
+        context = context or ExportContext(df)
         rows = []
-        for _, r in fq.iterrows():
+        for r in context.rows:
             exp = r["experiment_accession"]
             platform = _seq_platform(r.get("platform", ""))
             rows.append({
@@ -1,29 +1,29 @@
+from typing import Optional
+
 import pandas as pd
 from .base import (
     Exporter,
+    ExportContext,
     register_exporter,
     first_present,
-    control_file_to_sample_map,
-    resolve_controls_for_row,
-    controls_for_strategy,
 )
 
 @register_exporter("snakemake_chipseq")
 class SnakemakeChipseq(Exporter):
+    suffix = ".tsv"
+
     def name(self) -> str: return "snakemake_chipseq"
 
-    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all"):
-        fq = df[df["file_format"].astype(str).str.lower().eq("fastq")] if "file_format" in df else df
-        file_to_sample = control_file_to_sample_map(df)
+    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all", context: Optional[ExportContext] = None):
+        context = context or ExportContext(df)
         rows = []
-        for _, r in fq.iterrows():
+        for r, controls in zip(context.rows, context.selected_controls(control_strategy)):
             exp = r["experiment_accession"]
             rep = (r.get("biological_replicates") or "1").split(",")[0].strip()
             group = "control" if r.get("is_control") else "case"
             fastq_1 = first_present(r.get("fastq_1"), r.get("local_path"), r.get("url"))
             fastq_2 = first_present(r.get("fastq_2"), r.get("local_path_r2"), r.get("url_r2"))
-            controls = [] if r.get("is_control") else resolve_controls_for_row(r, file_to_sample)
-            for control in controls_for_strategy(controls, control_strategy, case_row=r, df=df):
+            for control in controls:
                 rows.append({
                     "sample": exp,
                     "group": group,
@@ -1,15 +1,19 @@
+from typing import Optional
+
 import pandas as pd
-from .base import Exporter, register_exporter, first_present
+from .base import Exporter, ExportContext, register_exporter, first_present
 from .nfcore_rnaseq import _seq_platform
 
 @register_exporter("snakemake_rnaseq")
 class SnakemakeRNAseq(Exporter):
+    suffix = ".tsv"
+
     def name(self) -> str: return "snakemake_rnaseq"
 
-    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all"):
-        fq = df[df["file_format"].astype(str).str.lower().eq("fastq")] if "file_format" in df else df
+    def write(self, df: pd.DataFrame, out_path, control_strategy: str = "all", context: Optional[ExportContext] = None):
+        context = context or ExportContext(df)
         rows = []
-        for _, r in fq.iterrows():
+        for r in context.rows:
             exp = r["experiment_accession"]
             rep = (r.get("biological_replicates") or "1").split(",")[0].strip()
             rows.append({
@@ -0,0 +1,168 @@
+"""File-centric metadata engine.
+
+Instead of downloading every experiment with all of its files and filtering
+``files`` client-side, this engine queries ``type=File`` with the file format,
+assembly and status filters pushed to the server, then resolves the distinct
+parent experiments (cases and their controls) once with batched searches. The
+rows are built with ``build_file_record`` so the manifest matches the
+experiment-centric path.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlencode
+
+import pandas as pd
+
+from .cache import ResponseCache
+from .core import (
+    build_file_record,
+    collect_files_from_experiment,
+    console,
+    expand_possible_controls,
+    extract_accessions_from_paths,
+    rows_to_df,
+)
+from .records import RecordBuilder
+from .encode_client import (
+    EXPERIMENT_ONLY_FIELDS,
+    batch_accessions,
+    fetch_experiments_batch,
+    projection_fields,
+    search_json,
+)
+from .transport import Transport, get_transport
+
+DEFAULT_BATCH_SIZE = 50
+
+# ENCODE file_format values are case-sensitive; the CLI lowercases them.
+_FILE_FORMAT_CASE = {"bigwig": "bigWig", "bigbed": "bigBed"}
+
+
+def file_filter_params(file_types: Optional[Set[str]] = None,
+                       assembly: Optional[str] = None,
+                       status: str = "released") -> List[Tuple[str, str]]:
+    """Server-side File filters equivalent to ``collect_files_from_experiment``."""
+    p: List[Tuple[str, str]] = []
+    if status:
+        p.append(("status", status))
+    for ft in sorted(file_types or []):
+        p.append(("file_format", _FILE_FORMAT_CASE.get(ft, ft)))
+    # FASTQs have no assembly but are kept regardless of it, so only push the
+    # assembly filter when no FASTQs are requested.
+    if assembly and file_types and "fastq" not in file_types:
+        p.append(("assembly", assembly))
+    return p
+
+
+def _split_fields(extra_fields: Optional[Sequence[str]]):
+    fields = projection_fields(extra_fields)
+    if fields is None:
+        return None, None
+    exp_fields = list(EXPERIMENT_ONLY_FIELDS)
+    exp_fields += [f for f in fields if not f.startswith("files.") and f not in exp_fields]
+    file_fields = [f[len("files."):] for f in fields if f.startswith("files.")] + ["dataset"]
+    return exp_fields, file_fields
+
+
+def search_files_by_dataset(accessions: List[str],
+                            file_filters: List[Tuple[str, str]],
+                            *,
+                            auth=None,
+                            fields: Optional[Sequence[str]] = None,
+                            transport: Optional[Transport] = None,
+                            cache: Optional[ResponseCache] = None) -> Dict[str, List[dict]]:
+    """Return File objects of the given experiments, grouped by experiment accession."""
+    params: List[Tuple[str, str]] = [("type", "File")]
+    params.extend(("dataset", f"/experiments/{acc}/") for acc in accessions)
+    params.extend(file_filters)
+    if fields:
+        params.extend(("field", f) for f in fields)
+    else:
+        params.append(("frame", "embedded"))
+    params.append(("limit", "all"))
+    res = search_json(params, auth=auth, transport=transport, cache=cache)
+    out: Dict[str, List[dict]] = {}
+    for f in res.get("@graph", []):
+        ds = extract_accessions_from_paths(f.get("dataset"), prefix="/experiments/")
+        if ds:
+            out.setdefault(ds[0], []).append(f)
+    return out
+
+
+def files_to_df(accessions: List[str],
+                file_types: Optional[Set[str]] = None,
+                assembly: Optional[str] = None,
+                status: str = "released",
+                auth_token: Optional[str] = None,
+                threads: int = 6,
+                transport: Optional[Transport] = None,
+                cache: Optional[ResponseCache] = None,
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                extra_fields: Optional[Sequence[str]] = None,
+                ) -> Tuple[pd.DataFrame, RecordBuilder]:
+    """Build the manifest for case experiment ``accessions`` from File searches."""
+    auth = (auth_token, "") if auth_token else None
+    transport = transport or get_transport(threads)
+    extra_fields = list(extra_fields or [])
+    batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+    exp_fields, file_fields = _split_fields(extra_fields)
+    file_filters = file_filter_params(file_types, assembly, status)
+    cases = list(dict.fromkeys(a for a in accessions if a))
+
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        def resolve(accs: List[str]) -> Dict[str, dict]:
+            found: Dict[str, dict] = {}
+            batches = batch_accessions(accs, batch_size, fields=exp_fields)
+            for res in ex.map(lambda b: fetch_experiments_batch(b, auth=auth, transport=transport,
+                                                                cache=cache, fields=exp_fields), batches):
+                found.update(res)
+            return found
+
+        experiments = resolve(cases)
+        controls_of = {acc: expand_possible_controls(exp) for acc, exp in experiments.items()}
+        control_accs = list(dict.fromkeys(c for ctrls in controls_of.values() for c in ctrls))
+        experiments.update(resolve([c for c in control_accs if c not in experiments]))
+
+        datasets = {f"/experiments/{a}/": a for a in dict.fromkeys(cases + control_accs) if a in experiments}
+        batches = batch_accessions(list(datasets), batch_size, fields=file_fields, key="dataset",
+                                   reserved=len(urlencode(file_filters)) + 1)
+
+        def search(batch: List[str]) -> Dict[str, List[dict]]:
+            return search_files_by_dataset([datasets[d] for d in batch], file_filters, auth=auth,
+                                           fields=file_fields, transport=transport, cache=cache)
+
+        files_by_exp: Dict[str, List[dict]] = {}
+        for res in ex.map(search, batches):
+            for acc, files in res.items():
+                files_by_exp.setdefault(acc, []).extend(files)
+
+    console.log(f"Resolved {len(experiments)} experiment(s) and "
+                f"{sum(len(v) for v in files_by_exp.values())} file(s) via File search.")
+
+    def records(acc: str, *, is_control: bool, matched: str = "", into: Optional[RecordBuilder] = None) -> List[dict]:
+        exp = experiments[acc]
+        files = collect_files_from_experiment({"files": files_by_exp.get(acc, [])},
+                                              file_types=file_types, assembly=assembly, status=status)
+        return [build_file_record(f, exp_json=exp, is_control=is_control, matched_controls=matched,
+                                  extra_fields=extra_fields, into=into) for f in files]
+
+    control_rows: Dict[str, List[dict]] = {}
+    rows = RecordBuilder()
+    for acc in cases:
+        if acc not in experiments:
+            console.log(f"Experiment {acc} not found.")
+            continue
+        ctrls = controls_of[acc]
+        records(acc, is_control=False, matched=",".join(ctrls), into=rows)
+        rows.mark_fetched(acc)
+        for cacc in ctrls:
+            if cacc not in experiments:
+                console.log(f"Failed to fetch control {cacc}: not found")
+                continue
+            rows.mark_fetched(cacc, is_control=True)
+            if cacc not in control_rows:
+                control_rows[cacc] = records(cacc, is_control=True)
+            rows.extend(control_rows[cacc])
+    return rows_to_df(rows)
@@ -0,0 +1,185 @@
+"""Crash-safe run journal for ``--resume``.
+
+The journal lives in ``<outdir>/.journal/``. ``journal.jsonl`` is an
+append-only log, flushed and fsynced after every entry:
+
+- ``run``: the query the journal belongs to; a resume with another query
+  starts over.
+- ``search``: case accessions returned by the search, so a resumed run does
+  not repeat it.
+- ``chunk``: a manifest chunk file (``chunk-000001.jsonl``) holding the records
+  of completed experiments. Chunk files are written atomically before the entry
+  that names them, so an experiment counts as done only once its records are
+  on disk.
+- ``download``: per-file download state (URL, bytes, ``ETag`` and
+  ``Last-Modified`` validators, and whether the file is complete).
+
+A torn last line from a killed process is ignored when the journal is read.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from rich.console import Console
+
+console = Console(stderr=True)
+
+JOURNAL_DIR = ".journal"
+JOURNAL_FILE = "journal.jsonl"
+
+
+def _fsync_write(path: Path, lines: Iterable[str]):
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w") as fh:
+        for line in lines:
+            fh.write(line + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class RunJournal:
+    """Durable record of a run's progress in ``<outdir>/.journal``.
+
+    With ``resume=True`` an existing journal for the same ``query`` is loaded;
+    otherwise any old journal is discarded. Experiment records are buffered and
+    written as one chunk per ``chunk_size`` experiments. Only the completed
+    accessions and their chunk file names stay in memory; records are read
+    back from a chunk when ``experiment_records`` asks for them. Thread-safe.
+    """
+
+    def __init__(self, outdir: Union[str, Path], query: dict, resume: bool = False, chunk_size: int = 50):
+        self.directory = Path(outdir) / JOURNAL_DIR
+        self.path = self.directory / JOURNAL_FILE
+        self.query = query
+        self.chunk_size = max(1, int(chunk_size))
+        self.search_results: Optional[List[str]] = None
+        self._completed: Dict[str, str] = {}
+        self._loaded_chunk: Tuple[Optional[str], Dict[str, List[dict]]] = (None, {})
+        self._downloads: Dict[str, dict] = {}
+        self._pending: Dict[str, List[dict]] = {}
+        self._chunks = 0
+        self._lock = threading.Lock()
+
+        resumed = resume and self._load()
+        if resumed:
+            console.log(f"Resuming from {self.path}: {len(self._completed)} experiment(s) and "
+                        f"{sum(d.get('done', False) for d in self._downloads.values())} download(s) done.")
+        else:
+            if self.directory.exists():
+                shutil.rmtree(self.directory)
+            self.directory.mkdir(parents=True)
+        self._fh = self.path.open("a")
+        if not resumed:
+            self._append({"event": "run", "query": query})
+
+    # -- loading ------------------------------------------------------------
+
+    def _entries(self):
+        good = 0
+        with self.path.open("rb") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                yield entry
+        # Drop a torn write from a killed run so later entries are not hidden behind it.
+        if good < self.path.stat().st_size:
+            os.truncate(self.path, good)
+
+    def _load(self) -> bool:
+        if not self.path.exists():
+            return False
+        entries = list(self._entries())
+        if not entries or entries[0].get("event") != "run" or entries[0].get("query") != self.query:
+            console.log("Journal belongs to a different query; starting over.")
+            return False
+        for entry in entries[1:]:
+            event = entry.get("event")
+            if event == "search":
+                self.search_results = entry["accessions"]
+            elif event == "chunk":
+                self._chunks += 1
+                for acc in entry["experiments"]:
+                    self._completed[acc] = entry["file"]
+            elif event == "download":
+                self._downloads.setdefault(entry["dest"], {}).update(entry)
+        return True
+
+    # -- writing ------------------------------------------------------------
+
+    def _append(self, entry: dict):
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def record_search(self, accessions: List[str]):
+        with self._lock:
+            self.search_results = list(accessions)
+            self._append({"event": "search", "accessions": self.search_results})
+
+    def experiment_completed(self, accession: str) -> bool:
+        with self._lock:
+            return accession in self._completed
+
+    def experiment_records(self, accession: str) -> Optional[List[dict]]:
+        """Records of an experiment completed in this or an earlier run, else None."""
+        with self._lock:
+            name = self._completed.get(accession)
+            if name is None:
+                return None
+            # Keep one chunk parsed: lookups mostly walk the accessions in chunk order.
+            if self._loaded_chunk[0] != name:
+                with (self.directory / name).open() as fh:
+                    items = (json.loads(line) for line in fh)
+                    self._loaded_chunk = (name, {item["accession"]: item["records"] for item in items})
+            return self._loaded_chunk[1].get(accession)
+
+    def experiment_done(self, accession: str, records: List[dict]):
+        with self._lock:
+            self._pending[accession] = list(records)
+            if len(self._pending) >= self.chunk_size:
+                self._write_chunk()
+
+    def _write_chunk(self):
+        if not self._pending:
+            return
+        self._chunks += 1
+        name = f"chunk-{self._chunks:06d}.jsonl"
+        _fsync_write(self.directory / name,
+                     (json.dumps({"accession": acc, "records": recs}) for acc, recs in self._pending.items()))
+        self._append({"event": "chunk", "file": name, "experiments": list(self._pending)})
+        self._completed.update(dict.fromkeys(self._pending, name))
+        self._pending = {}
+
+    def flush(self):
+        with self._lock:
+            self._write_chunk()
+
+    def download_state(self, dest: Union[str, Path]) -> dict:
+        with self._lock:
+            return dict(self._downloads.get(str(dest), {}))
+
+    def record_download(self, dest: Union[str, Path], **state):
+        """Merge ``state`` (``url``, ``bytes``, ``etag``, ``last_modified``, ``done``) into a file's entry."""
+        entry = {"event": "download", "dest": str(dest), **state}
+        with self._lock:
+            self._downloads.setdefault(str(dest), {}).update(entry)
+            self._append(entry)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._fh.close()
+
+    def finish(self):
+        """Remove the journal after the run completed."""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,121 @@
+"""Manifest writers and loader.
+
+``manifest.tsv`` stays the default. Parquet and Feather (Arrow IPC) manifests
+keep typed columns: ``is_control`` as bool, sizes as 64-bit integers and
+low-cardinality fields as categoricals. They are much smaller on disk and load
+far faster than the TSV. Both binary formats require the optional ``pyarrow``
+dependency. A TSV manifest may be gzip- or zstd-compressed (``manifest.tsv.gz``,
+``manifest.tsv.zst``). Every format is written under a temporary name and
+renamed into place, so readers never see a half-written manifest.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+from .records import CATEGORICAL_FIELDS
+from .streaming import atomic_open, atomic_path, compressed_path, compression_of, find_output
+
+MANIFEST_FORMATS = ("tsv", "parquet", "feather")
+MANIFEST_SUFFIXES = {"tsv": ".tsv", "parquet": ".parquet", "feather": ".feather"}
+
+_SUFFIX_FORMATS = {".tsv": "tsv", ".parquet": "parquet", ".feather": "feather", ".arrow": "feather"}
+_INTEGER_FIELDS = ("file_size", "file_size_r2", "bio_replicate_count", "tech_replicate_count")
+_BOOL_FIELDS = ("is_control",)
+
+
+def manifest_path(outdir: Union[str, Path], fmt: str = "tsv", compression: str = "none") -> Path:
+    """Manifest file name; ``compression`` applies to TSV only."""
+    path = Path(outdir) / f"manifest{MANIFEST_SUFFIXES[fmt]}"
+    return compressed_path(path, compression) if fmt == "tsv" else path
+
+
+def find_manifest(outdir: Union[str, Path]) -> Optional[Path]:
+    """Newest manifest in ``outdir`` in any format or compression, else None."""
+    found = [manifest_path(outdir, fmt) for fmt in MANIFEST_FORMATS if fmt != "tsv"]
+    found = [p for p in found if p.exists()]
+    tsv = find_output(manifest_path(outdir, "tsv"))
+    if tsv is not None:
+        found.append(tsv)
+    return max(found, key=lambda p: p.stat().st_mtime) if found else None
+
+
+def _format_of(path: Union[str, Path], fmt: Optional[str]) -> str:
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        path = Path(path)
+        if compression_of(path) != "none":
+            path = path.with_suffix("")
+        fmt = _SUFFIX_FORMATS.get(path.suffix.lower(), "tsv")
+    if fmt not in MANIFEST_FORMATS:
+        raise ValueError(f"Unknown manifest format {fmt!r}; choose from {', '.join(MANIFEST_FORMATS)}.")
+    return fmt
+
+
+def require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet and Feather manifests require pyarrow: pip install 'encodefetch[arrow]'") from None
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of ``df`` with typed columns suitable for Arrow.
+
+    ``is_control`` becomes bool, sizes and replicate counts nullable 64-bit
+    integers (``int64`` when no value is missing), low-cardinality fields
+    categoricals and remaining mixed-type columns strings.
+    """
+    out = df.copy()
+    for col in out.columns:
+        s = out[col]
+        if col in _BOOL_FIELDS:
+            out[col] = s.astype(bool)
+        elif col in _INTEGER_FIELDS:
+            s = pd.to_numeric(s.replace("", None), errors="coerce").astype("Int64")
+            out[col] = s.astype("int64") if not s.isna().any() else s
+        elif col in CATEGORICAL_FIELDS:
+            out[col] = s.astype("category")
+        elif s.dtype == object:
+            out[col] = s.map(lambda v: v if v is None or isinstance(v, str) or pd.isna(v) else str(v))
+    return out
+
+
+def write_manifest(df: pd.DataFrame, path: Union[str, Path], fmt: Optional[str] = None) -> Path:
+    """Write ``df`` as TSV, Parquet or Feather; ``fmt`` defaults to the path suffix.
+
+    TSV paths ending in ``.gz`` or ``.zst`` are compressed. The file is replaced
+    atomically.
+    """
+    path = Path(path)
+    fmt = _format_of(path, fmt)
+    if fmt == "tsv":
+        with atomic_open(path) as fh:
+            df.to_csv(fh, sep="\t", index=False)
+        return path
+    require_pyarrow()
+    compact = compact_dtypes(df).reset_index(drop=True)
+    with atomic_path(path) as tmp:
+        if fmt == "parquet":
+            compact.to_parquet(tmp, index=False)
+        else:
+            compact.to_feather(tmp)
+    return path
+
+
+def read_manifest(path: Union[str, Path], fmt: Optional[str] = None, columns=None) -> pd.DataFrame:
+    """Load a manifest written by ENCODEfetch; ``fmt`` defaults to the path suffix.
+
+    ``columns`` restricts the loaded columns (cheap for Parquet and Feather).
+    Compressed TSV manifests are decompressed based on the suffix.
+    """
+    fmt = _format_of(path, fmt)
+    if fmt == "tsv":
+        return pd.read_csv(path, sep="\t", usecols=columns, low_memory=False)
+    require_pyarrow()
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
@@ -1,9 +1,51 @@
+import numpy as np
 import pandas as pd
 
+_HELPER_COLS = ["_paired", "_pe", "_path", "_mate", "_pos"]
+
+
+def _column(df: pd.DataFrame, name: str, default=""):
+    return df[name].tolist() if name in df.columns else [default] * len(df)
+
+
+def _pe(x) -> str:
+    s = str(x).strip()
+    return "1" if s == "1" else ("2" if s == "2" else "")
+
+
+def _paths(df: pd.DataFrame) -> list:
+    """``local_path`` when set, else ``url``."""
+    out = []
+    for lp, url in zip(_column(df, "local_path"), _column(df, "url")):
+        lp = str(lp or "").strip()
+        out.append(lp if lp else str(url))
+    return out
+
+
+def _replicate_keys(fq: pd.DataFrame) -> list:
+    return ["experiment_accession"] + [c for c in ("biological_replicates", "technical_replicates")
+                                       if c in fq.columns]
+
+
+def _first_match(left: pd.DataFrame, right: pd.DataFrame, on: list) -> np.ndarray:
+    """For each ``left`` row, the smallest ``right._pos`` with equal ``on`` values, or -1.
+
+    Null keys never match, as with ``==`` comparisons.
+    """
+    if left.empty or right.empty:
+        return np.full(len(left), -1, dtype=np.int64)
+    right = right.dropna(subset=on).groupby(on, sort=False, dropna=True)["_pos"].min().rename("_match")
+    matched = left[on].merge(right, how="left", left_on=on, right_index=True)
+    return matched["_match"].fillna(-1).to_numpy(dtype=np.int64)
+
+
 def collapse_fastq_pairs(df: pd.DataFrame) -> pd.DataFrame:
     """Collapse paired-ended FASTQ rows into single rows anchored on R1.
     If R2 exists but is archived, drop R2 and mark single_end="true".
 
+    The mate is looked up by ``paired_accession``; otherwise the first R2 of the
+    same experiment and replicates is used, preferring one that points back at R1.
+
     Adds columns:
       fastq_1, fastq_2, url_r2, md5sum_r2, file_size_r2, file_accession_r2, single_end
     """
@@ -16,63 +58,68 @@ def collapse_fastq_pairs(df: pd.DataFrame) -> pd.DataFrame:
     if fq.empty:
         return df.copy()
 
-    def _path_from_row(r):
-        lp = str(r.get("local_path","") or "").strip()
-        return lp if lp else str(r.get("url",""))
+    fq["_paired"] = ["paired" in str(x).lower() for x in fq["run_type"].tolist()]
+    fq["_pe"] = [_pe(x) for x in fq["paired_end"].tolist()]
+    fq["_path"] = _paths(fq)
+    fq["_mate"] = fq.get("paired_accession", "")
+    fq["_pos"] = np.arange(len(fq))
 
-    def _is_paired(run_type): return "paired" in str(run_type).lower()
-    def _pe(x):
-        s = str(x).strip()
-        return "1" if s == "1" else ("2" if s == "2" else "")
-    by_acc = {acc: row for acc, row in fq.set_index("file_accession").iterrows()}
+    anchors = pd.concat([fq[fq["_paired"] & fq["_pe"].eq("1")], fq[~fq["_paired"]]], ignore_index=True)
+    paired = anchors["_paired"].to_numpy(dtype=bool)
 
-    fq["_paired"] = fq["run_type"].apply(_is_paired)
-    fq["_pe"] = fq["paired_end"].apply(_pe)
-    fq["_path"] = fq.apply(_path_from_row, axis=1)
-    fq["_mate"] = fq.get("paired_accession","")
+    # Mate by accession; a repeated accession resolves to its last row.
+    accessions = fq["file_accession"].to_numpy(dtype=object)
+    by_acc = pd.Series(np.arange(len(fq)), index=accessions)
+    by_acc = by_acc[~by_acc.index.duplicated(keep="last")]
+    mates = anchors["_mate"].to_numpy(dtype=object)
+    has_mate = np.array([isinstance(m, str) and m != "" for m in mates], dtype=bool)
+    mate_pos = by_acc.reindex(mates).fillna(-1).to_numpy(dtype=np.int64, copy=True)
+    mate_pos[~(paired & has_mate)] = -1
+    r2_pos = mate_pos.copy()
 
-    anchors = pd.concat([fq[fq["_paired"] & fq["_pe"].eq("1")], fq[~fq["_paired"]]], ignore_index=True)
+    # Fallback: R2 of the same experiment and replicates, via a grouped index.
+    need = paired & (r2_pos < 0)
+    if need.any():
+        keys = _replicate_keys(fq)
+        cand = fq.loc[fq["_paired"] & fq["_pe"].eq("2"), keys + ["_pos"]]
+        left = anchors.loc[need, keys]
+        first = _first_match(left, cand, keys)
+        if "paired_accession" in fq.columns:
+            back_cand = cand.assign(_back=fq.loc[cand.index, "paired_accession"])
+            back = _first_match(left.assign(_back=anchors.loc[need, "file_accession"].to_numpy()),
+                                back_cand, keys + ["_back"])
+            first = np.where(back >= 0, back, first)
+        r2_pos[need] = first
 
-    out = []
-    for _, r1 in anchors.iterrows():
-        rec = r1.to_dict()
-        rec["fastq_1"] = r1["_path"]
-        r2 = None
-        if r1["_paired"]:
-            macc = r1["_mate"]
-            if macc and macc in by_acc:
-                r2 = by_acc[macc]
-            else:
-                cand = fq[(fq["experiment_accession"] == r1["experiment_accession"]) & (fq["_paired"]) & fq["_pe"].eq("2")]
-                if "biological_replicates" in fq.columns:
-                    cand = cand[cand["biological_replicates"] == r1.get("biological_replicates","")]
-                if "technical_replicates" in fq.columns:
-                    cand = cand[cand["technical_replicates"] == r1.get("technical_replicates","")]
-                if not cand.empty:
-                    backptr = cand.get("paired_accession","") == r1["file_accession"]
-                    r2 = cand[backptr].iloc[0] if backptr.any() else cand.iloc[0]
-
-        if r2 is not None and str(r2.get("file_status", r2.get("status",""))).lower() != "archived":
-            rec["fastq_2"] = _path_from_row(r2)
-            rec["url_r2"] = r2.get("url","")
-            rec["md5sum_r2"] = r2.get("md5sum","")
-            rec["file_size_r2"] = r2.get("file_size","")
-            rec["file_accession_r2"] = r2.get("file_accession","") or getattr(r2, "name", "")
-            rec["single_end"] = "false"
-        else:
-            rec["fastq_2"] = ""
-            rec["url_r2"] = ""
-            rec["md5sum_r2"] = ""
-            rec["file_size_r2"] = ""
-            rec["file_accession_r2"] = ""
-            rec["single_end"] = "true"
-
-        out.append(rec)
-
-    collapsed = pd.DataFrame(out)
-    for c in ["_paired","_pe","_path","_mate"]:
-        if c in collapsed.columns:
-            collapsed.drop(columns=c, inplace=True, errors="ignore")
+    status_col = "file_status" if "file_status" in fq.columns else "status"
+    statuses = np.array([str(s).lower() for s in _column(fq, status_col)], dtype=object)
+    has_r2 = r2_pos >= 0
+    has_r2[has_r2] = statuses[r2_pos[has_r2]] != "archived"
+    take = r2_pos[has_r2]
+
+    def r2_values(values, fill=""):
+        values = np.asarray(values, dtype=object)
+        out = np.full(len(anchors), fill, dtype=object)
+        out[has_r2] = values[take]
+        return out.tolist()
+
+    # Rows found by accession report that accession; fallback rows their own (or index label).
+    r2_acc = np.array([a if a else label for a, label in zip(accessions, fq.index)], dtype=object)
+    by_mate = has_r2 & (mate_pos >= 0)
+    r2_accessions = np.asarray(r2_values(r2_acc), dtype=object)
+    r2_accessions[by_mate] = mates[by_mate]
+
+    collapsed = anchors
+    collapsed["fastq_1"] = anchors["_path"]
+    collapsed["fastq_2"] = r2_values(fq["_path"].tolist())
+    collapsed["url_r2"] = r2_values(_column(fq, "url"))
+    collapsed["md5sum_r2"] = r2_values(_column(fq, "md5sum"))
+    collapsed["file_size_r2"] = r2_values(_column(fq, "file_size"))
+    collapsed["file_accession_r2"] = r2_accessions.tolist()
+    collapsed["single_end"] = np.where(has_r2, "false", "true").tolist()
+    collapsed = collapsed.drop(columns=[c for c in _HELPER_COLS if c in collapsed.columns]).infer_objects()
+    if collapsed.empty:
+        collapsed = pd.DataFrame()
 
     combined = pd.concat([other, collapsed], ignore_index=True, sort=False)
     sort_cols = [c for c in ["is_control","experiment_accession","biological_replicates","technical_replicates"] if c in combined.columns]
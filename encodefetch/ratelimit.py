@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Responses worth retrying; 429/503 additionally mean "slow down".
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens/second, holding at most ``burst``.
+
+    A non-positive rate disables limiting. ``reserve`` takes tokens immediately
+    (the balance may go negative) and returns how long the caller must wait, so
+    the same bucket can be used from threads (``acquire``) and coroutines.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: Optional[float] = None):
+        self.rate = float(rate or 0)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency gate.
+
+    ``on_backoff`` halves the number of concurrent slots (at most once per
+    ``cooldown`` seconds, so a burst of 429s counts once); ``on_success`` adds
+    one slot after ``limit`` consecutive successes, up to ``maximum``.
+    """
+
+    def __init__(self, limit: int, minimum: int = 1, maximum: Optional[int] = None, cooldown: float = 1.0):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum or limit))
+        self.limit = min(self.maximum, max(self.minimum, int(limit)))
+        self.cooldown = cooldown
+        self._active = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def set_limit(self, limit: int):
+        with self._cond:
+            self.limit = min(self.maximum, max(self.minimum, int(limit)))
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify()
+
+    def on_backoff(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+            self._last_decrease = now
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter; ``Retry-After`` takes precedence when present."""
+
+    retries: int = 4
+    backoff: float = 0.5
+    max_backoff: float = 60.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(max(0.0, retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestStats:
+    """Thread-safe per-run HTTP counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.waited = 0.0
+
+    def record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> str:
+        return (f"{self.requests} request(s), {self.retries} retried, {self.throttled} throttled, "
+                f"{self.failures} failed, {self.waited:.1f}s in backoff")
@@ -0,0 +1,155 @@
+"""Columnar accumulator for manifest records.
+
+``build_file_record`` produces one dict per file. Keeping hundreds of thousands
+of those dicts alive until the DataFrame is built doubles peak memory, so the
+metadata engines append records into a ``RecordBuilder`` instead: values go
+into per-column lists, and low-cardinality columns are stored as integer codes
+into a table of distinct values. ``to_frame`` builds the DataFrame straight
+from the columns (those columns become ``category`` dtype), and iterating the
+builder yields the records again for ``metadata.jsonl``.
+"""
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+import pandas as pd
+
+# Columns with few distinct values per manifest; stored as codes + categories.
+CATEGORICAL_FIELDS = (
+    "assay_title",
+    "award",
+    "classification",
+    "control_type",
+    "donor_life_stage",
+    "donor_sex",
+    "file_format",
+    "file_status",
+    "lab",
+    "organism",
+    "output_type",
+    "assembly",
+    "platform",
+    "replication_type",
+    "run_type",
+    "status_exp",
+)
+
+
+class _Codes:
+    """Dictionary-encoded column: ``codes[i]`` indexes ``values``."""
+
+    def __init__(self, fill: int):
+        self.values: list = []
+        self.lookup: Dict[object, int] = {}
+        self.codes = array("i", [-1]) * fill
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return None if code < 0 else self.values[code]
+
+    def to_list(self) -> list:
+        values = self.values
+        return [None if c < 0 else values[c] for c in self.codes]
+
+    def to_series(self, name: str) -> pd.Series:
+        if any(not isinstance(v, str) for v in self.values):
+            # Mixed types (e.g. a missing dict field giving "" next to numbers) keep object dtype.
+            return pd.Series(self.to_list(), name=name)
+        order = sorted(range(len(self.values)), key=self.values.__getitem__)
+        remap = array("i", [0]) * len(self.values)
+        for new, old in enumerate(order):
+            remap[old] = new
+        codes = [-1 if c < 0 else remap[c] for c in self.codes]
+        categories = [self.values[i] for i in order]
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categories), name=name)
+
+
+class RecordBuilder:
+    """Thread-safe, append-only columnar store of file records.
+
+    Columns listed in ``categorical`` are dictionary-encoded. A record missing a
+    column (or introducing a new one) leaves ``None`` in the other rows, as
+    ``pd.DataFrame(list_of_dicts)`` would.
+
+    ``fetched`` holds the ``(experiment_accession, is_control)`` pairs whose
+    files the engines looked at, including experiments none of whose files
+    matched the filters; ``MetadataStore.upsert`` uses it to clear stale rows.
+    """
+
+    def __init__(self, categorical: Sequence[str] = CATEGORICAL_FIELDS):
+        self.categorical = frozenset(categorical)
+        self.fetched: Set[Tuple[str, bool]] = set()
+        self._columns: Dict[str, object] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def _new_column(self, name: str):
+        if name in self.categorical:
+            return _Codes(self._size)
+        return [None] * self._size
+
+    def _append(self, record: dict):
+        columns = self._columns
+        for name, value in record.items():
+            col = columns.get(name)
+            if col is None:
+                col = columns[name] = self._new_column(name)
+            if isinstance(col, _Codes):
+                try:
+                    col.append(value)
+                    continue
+                except TypeError:  # unhashable value; store this column plainly
+                    col = columns[name] = col.to_list()
+            col.append(value)
+        self._size += 1
+        if len(record) < len(columns):
+            for name in columns.keys() - record.keys():
+                col = columns[name]
+                if isinstance(col, _Codes):
+                    col.codes.append(-1)
+                else:
+                    col.append(None)
+
+    def append(self, record: dict):
+        with self._lock:
+            self._append(record)
+
+    def extend(self, records: Iterable[dict]):
+        with self._lock:
+            for record in records:
+                self._append(record)
+
+    def mark_fetched(self, accession: str, is_control: bool = False):
+        with self._lock:
+            self.fetched.add((accession, bool(is_control)))
+
+    def __getitem__(self, i: int) -> dict:
+        return {name: col[i] for name, col in self._columns.items()}
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(self._size):
+            yield self[i]
+
+    def to_frame(self) -> pd.DataFrame:
+        data = {
+            name: col.to_series(name) if isinstance(col, _Codes) else pd.Series(col, name=name)
+            for name, col in self._columns.items()
+        }
+        return pd.DataFrame(data)
+
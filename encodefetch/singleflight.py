@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Thread-safe memo in which concurrent callers for the same key share one call.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight wait for that result instead of starting their own. Results are kept
+    for the lifetime of the object. Exceptions are handed to the waiting callers
+    but not memoized, so a later call retries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done: Dict[Hashable, Any] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, fn: Callable[[], Any]):
+        with self._lock:
+            if key in self._done:
+                self.hits += 1
+                return self._done[key]
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return fut.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._done[key] = value
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._done)
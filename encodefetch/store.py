@@ -0,0 +1,230 @@
+"""SQLite metadata store.
+
+Persists the file records produced by ``build_file_record`` across runs:
+experiments, files and case-control links, indexed on accession,
+``target_label``, ``biosample_term_id`` and ``assembly``. Records are upserted,
+so overlapping queries refresh rows in place; within a run's file filters,
+files an experiment no longer lists are dropped. ``query`` rebuilds the same
+``(df, records)`` pair as the search functions from the local database, so a
+manifest or samplesheet can be regenerated without touching the network.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import pandas as pd
+
+from .core import rows_to_df
+from .exporters.base import split_csv
+from .records import RecordBuilder
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    accession TEXT PRIMARY KEY,
+    assay_title TEXT,
+    target_label TEXT,
+    organism TEXT,
+    biosample_term_id TEXT,
+    biosample_term_name TEXT,
+    lab TEXT,
+    status TEXT,
+    perturbed TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    file_accession TEXT NOT NULL,
+    is_control INTEGER NOT NULL,
+    experiment_accession TEXT NOT NULL,
+    file_format TEXT,
+    output_type TEXT,
+    assembly TEXT,
+    file_status TEXT,
+    md5sum TEXT,
+    file_size INTEGER,
+    url TEXT,
+    record TEXT NOT NULL,
+    updated_at REAL,
+    PRIMARY KEY (file_accession, is_control)
+);
+CREATE TABLE IF NOT EXISTS controls (
+    case_accession TEXT NOT NULL,
+    control_accession TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (case_accession, control_accession)
+);
+CREATE INDEX IF NOT EXISTS experiments_target ON experiments (target_label);
+CREATE INDEX IF NOT EXISTS experiments_biosample ON experiments (biosample_term_id);
+CREATE INDEX IF NOT EXISTS files_experiment ON files (experiment_accession, is_control);
+CREATE INDEX IF NOT EXISTS files_assembly ON files (assembly);
+"""
+
+_EXPERIMENT_COLUMNS = ("accession", "assay_title", "target_label", "organism", "biosample_term_id",
+                       "biosample_term_name", "lab", "status", "perturbed", "updated_at")
+_FILE_COLUMNS = ("file_accession", "is_control", "experiment_accession", "file_format", "output_type",
+                 "assembly", "file_status", "md5sum", "file_size", "url", "record", "updated_at")
+
+
+def _upsert_sql(table: str, columns: Sequence[str], key: Sequence[str]) -> str:
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}")
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _size(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _file_filter(file_types: Optional[Set[str]], assembly: Optional[str],
+                 status: Optional[str]) -> Tuple[str, list]:
+    """SQL conditions (``" AND ..."``) and arguments selecting the files a run's filters keep."""
+    where, args = [], []
+    if file_types:
+        where.append(f"LOWER(file_format) IN ({', '.join('?' for _ in file_types)})")
+        args.extend(ft.lower() for ft in file_types)
+    if assembly:
+        # FASTQs carry no assembly and are kept regardless, as in collect_files_from_experiment.
+        where.append("(assembly = ? OR LOWER(file_format) = 'fastq')")
+        args.append(assembly)
+    if status:
+        where.append("file_status = ?")
+        args.append(status)
+    return "".join(f" AND {w}" for w in where), args
+
+
+class MetadataStore:
+    """SQLite database of manifest records shared by many runs."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def upsert(self, records: Iterable[dict],
+               file_types: Optional[Set[str]] = None,
+               assembly: Optional[str] = None,
+               status: str = "released") -> int:
+        """Insert or refresh file records (and their experiments and control links).
+
+        ``file_types``, ``assembly`` and ``status`` are the filters the records
+        were fetched with. For every experiment (case or control side) the
+        records mention, or that a ``RecordBuilder`` lists in ``fetched``, the
+        stored files matching those filters are replaced, so files dropped from
+        an experiment or revoked since the last run are removed while files
+        stored by runs with other filters are kept.
+        """
+        now = time.time()
+        experiments, files, links = {}, [], {}
+        for rec in records:
+            exp_acc = _text(rec.get("experiment_accession"))
+            experiments[exp_acc] = (
+                exp_acc, _text(rec.get("assay_title")), _text(rec.get("target_label")), _text(rec.get("organism")),
+                _text(rec.get("biosample_term_id")), _text(rec.get("biosample_term_name")), _text(rec.get("lab")),
+                _text(rec.get("status_exp")), _text(rec.get("perturbed")).lower(), now,
+            )
+            is_control = bool(rec.get("is_control"))
+            files.append((
+                _text(rec.get("file_accession")), int(is_control), exp_acc, _text(rec.get("file_format")),
+                _text(rec.get("output_type")), _text(rec.get("assembly")), _text(rec.get("file_status")),
+                _text(rec.get("md5sum")), _size(rec.get("file_size")), _text(rec.get("url")),
+                json.dumps(rec, default=str), now,
+            ))
+            if not is_control:
+                links[exp_acc] = split_csv(rec.get("matched_control_experiments"))
+
+        scope = {(f[2], f[1]) for f in files}
+        scope.update((acc, int(is_control)) for acc, is_control in getattr(records, "fetched", ()))
+        file_filter, file_args = _file_filter(file_types, assembly, status)
+        with self._conn:
+            self._conn.executemany(_upsert_sql("experiments", _EXPERIMENT_COLUMNS, ["accession"]),
+                                   experiments.values())
+            self._conn.executemany(
+                f"DELETE FROM files WHERE experiment_accession = ? AND is_control = ?{file_filter}",
+                ([acc, is_control] + file_args for acc, is_control in scope))
+            self._conn.executemany(_upsert_sql("files", _FILE_COLUMNS, ["file_accession", "is_control"]), files)
+            self._conn.executemany("DELETE FROM controls WHERE case_accession = ?", ((c,) for c in links))
+            self._conn.executemany(
+                "INSERT INTO controls (case_accession, control_accession, position) VALUES (?, ?, ?)",
+                ((case, ctrl, i) for case, ctrls in links.items() for i, ctrl in enumerate(dict.fromkeys(ctrls))),
+            )
+        return len(files)
+
+    def query(self,
+              accessions: Optional[Sequence[str]] = None,
+              assay_title: Optional[str] = None,
+              target_labels: Optional[List[str]] = None,
+              organism: Optional[str] = None,
+              biosample: Optional[str] = None,
+              biosample_term_id: Optional[str] = None,
+              file_types: Optional[Set[str]] = None,
+              assembly: Optional[str] = None,
+              status: str = "released",
+              perturbed: Optional[str] = None,
+              ) -> Tuple[pd.DataFrame, RecordBuilder]:
+        """Rebuild ``(df, records)`` for case experiments matching the filters.
+
+        Filters mirror ``search_experiments`` (or ``search_accessions`` when
+        ``accessions`` is given, where ``status`` applies to files only); text
+        comparisons ignore case. Each case is followed by the files of its
+        linked controls, as in a live run.
+        """
+        where, args = ["EXISTS (SELECT 1 FROM files f WHERE f.experiment_accession = e.accession "
+                       "AND f.is_control = 0)"], []
+        if accessions:
+            accessions = list(dict.fromkeys(accessions))
+            where.append(f"e.accession IN ({', '.join('?' for _ in accessions)})")
+            args.extend(accessions)
+        labels = [v.strip() for lbl in target_labels or [] for v in str(lbl).split(",") if v.strip()]
+        if labels:
+            where.append(f"e.target_label COLLATE NOCASE IN ({', '.join('?' for _ in labels)})")
+            args.extend(labels)
+        for column, value in (("assay_title", assay_title), ("organism", organism),
+                              ("biosample_term_name", biosample), ("biosample_term_id", biosample_term_id),
+                              ("status", None if accessions else status), ("perturbed", perturbed)):
+            if value:
+                where.append(f"e.{column} = ? COLLATE NOCASE")
+                args.append(value)
+        cases = [r[0] for r in self._conn.execute(
+            f"SELECT e.accession FROM experiments e WHERE {' AND '.join(where)} ORDER BY e.accession", args)]
+
+        file_filter, file_args = _file_filter(file_types, assembly, status)
+
+        def files_of(accession: str, is_control: bool) -> List[dict]:
+            rows = self._conn.execute(
+                f"SELECT record FROM files WHERE experiment_accession = ? AND is_control = ?{file_filter} "
+                f"ORDER BY file_accession", [accession, int(is_control)] + file_args)
+            return [json.loads(r[0]) for r in rows]
+
+        records = RecordBuilder()
+        control_rows = {}
+        for case in cases:
+            records.extend(files_of(case, False))
+            for (ctrl,) in self._conn.execute(
+                    "SELECT control_accession FROM controls WHERE case_accession = ? ORDER BY position", [case]):
+                if ctrl not in control_rows:
+                    control_rows[ctrl] = files_of(ctrl, True)
+                records.extend(control_rows[ctrl])
+        return rows_to_df(records)
@@ -0,0 +1,155 @@
+"""Streaming, compressed and atomic output writers.
+
+``RecordSpool`` writes ``metadata.jsonl`` while the metadata phase runs.
+Records are appended to ``metadata.jsonl.partial`` as each experiment
+completes, so partial results can be inspected during long runs. ``close``
+puts them in manifest order with an external merge sort: sorted runs of at
+most ``run_size`` records are spilled to disk and merged with ``heapq.merge``.
+The final file, optionally gzip- or zstd-compressed, is written under a
+temporary name and renamed into place.
+"""
+from __future__ import annotations
+
+import gzip
+import heapq
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_SUFFIX_COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def require_zstandard():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        raise ImportError("zstd compression requires zstandard: pip install 'encodefetch[zstd]'") from None
+
+
+def compression_of(path: Union[str, Path]) -> str:
+    return _SUFFIX_COMPRESSIONS.get(Path(path).suffix.lower(), "none")
+
+
+def compressed_path(path: Union[str, Path], compression: str = "none") -> Path:
+    """``path`` with the suffix of ``compression`` appended (``metadata.jsonl.gz``)."""
+    path = Path(path)
+    return path.with_name(path.name + COMPRESSION_SUFFIXES[compression])
+
+
+def find_output(path: Union[str, Path]) -> Optional[Path]:
+    """Newest existing variant of ``path``, compressed or not, else None."""
+    found = [p for p in (compressed_path(path, c) for c in COMPRESSIONS) if p.exists()]
+    return max(found, key=lambda p: p.stat().st_mtime) if found else None
+
+
+def open_text(path: Union[str, Path], mode: str = "rt", compression: Optional[str] = None) -> IO[str]:
+    """Open a text file, compressed according to ``compression`` or the path suffix."""
+    compression = compression or compression_of(path)
+    if compression == "gzip":
+        return gzip.open(path, mode, encoding="utf-8")
+    if compression == "zstd":
+        require_zstandard()
+        import zstandard
+        return io.TextIOWrapper(zstandard.open(path, mode.replace("t", "") + "b"), encoding="utf-8")
+    return open(path, mode.replace("t", ""), encoding="utf-8")
+
+
+@contextmanager
+def atomic_path(path: Union[str, Path]) -> Iterator[Path]:
+    """Yield a temporary sibling of ``path`` that replaces it when the block succeeds."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+@contextmanager
+def atomic_open(path: Union[str, Path], compression: Optional[str] = None) -> Iterator[IO[str]]:
+    """Write text to ``path`` atomically; readers see the old file or the complete new one."""
+    with atomic_path(path) as tmp:
+        with open_text(tmp, "wt", compression=compression or compression_of(path)) as fh:
+            yield fh
+
+
+def record_sort_key(record: dict) -> str:
+    """Manifest order (cases first, then experiment and file accession) as a string prefix."""
+    return "{}\t{}\t{}".format(int(bool(record.get("is_control"))), record.get("experiment_accession") or "",
+                               record.get("file_accession") or "")
+
+
+class RecordSpool:
+    """Thread-safe streaming writer of ``metadata.jsonl``; see the module docstring."""
+
+    def __init__(self, path: Union[str, Path], compression: str = "none", run_size: int = 100_000):
+        self.path = compressed_path(path, compression)
+        self.compression = compression
+        self.run_size = max(1, int(run_size))
+        self.partial = Path(path).with_name(Path(path).name + ".partial")
+        self.count = 0
+        self._lock = threading.Lock()
+        self._fh = open(self.partial, "w", encoding="utf-8")
+
+    def write(self, records: Iterable[dict]):
+        lines = [json.dumps(rec) + "\n" for rec in records]
+        with self._lock:
+            self._fh.writelines(lines)
+            self._fh.flush()
+            self.count += len(lines)
+
+    def _runs(self, workdir: Path) -> List[Path]:
+        runs: List[Path] = []
+
+        def spill(lines: List[str]):
+            lines.sort()
+            run = workdir / f"run-{len(runs):05d}"
+            with open(run, "w", encoding="utf-8") as fh:
+                fh.writelines(lines)
+            runs.append(run)
+
+        with open(self.partial, encoding="utf-8") as fh:
+            lines: List[str] = []
+            for line in fh:
+                lines.append(f"{record_sort_key(json.loads(line))}\t{line}")
+                if len(lines) >= self.run_size:
+                    spill(lines)
+                    lines = []
+            if lines or not runs:
+                spill(lines)
+        return runs
+
+    def discard(self):
+        """Stop spooling and remove the partial file without writing ``path``."""
+        with self._lock:
+            self._fh.close()
+        self.partial.unlink(missing_ok=True)
+
+    def close(self) -> Path:
+        """Sort the spooled records into ``path`` and remove the partial file."""
+        with self._lock:
+            self._fh.close()
+        workdir = Path(tempfile.mkdtemp(prefix=".spool-", dir=self.partial.parent))
+        try:
+            files = [open(run, encoding="utf-8") for run in self._runs(workdir)]
+            try:
+                with atomic_open(self.path, self.compression) as out:
+                    for line in heapq.merge(*files):
+                        out.write(line.split("\t", 3)[3])
+            finally:
+                for fh in files:
+                    fh.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        self.partial.unlink()
+        return self.path
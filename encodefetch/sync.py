@@ -0,0 +1,246 @@
+"""Incremental sync of an output directory.
+
+A sync run lists the experiments matching the search filters with only their
+``date_modified`` stamps (and those of their possible controls), compares them
+with ``sync_state.json`` from the previous run, and fetches just the new or
+changed experiments. Records of unchanged experiments are taken from the
+existing ``metadata.jsonl``; experiments that no longer match are dropped. The
+merged records are returned in the same shape as a full search, so the
+manifest and samplesheets are rewritten from them as usual.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import pandas as pd
+from rich.console import Console
+
+from .core import expand_possible_controls, rows_to_df, search_accessions
+from .encode_client import build_params, projection_fields, search_json
+from .records import RecordBuilder
+from .streaming import find_output, open_text
+from .transport import Transport, get_transport
+
+console = Console(stderr=True)
+
+SYNC_STATE_FILE = "sync_state.json"
+METADATA_FILE = "metadata.jsonl"
+
+# Fields requested when listing experiments; enough to detect changes.
+LISTING_FIELDS = [
+    "accession",
+    "date_modified",
+    "date_released",
+    "possible_controls.accession",
+    "possible_controls.date_modified",
+]
+
+
+@dataclass
+class SyncPlan:
+    """Experiments to fetch, keep, and drop relative to the previous sync."""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    full: bool = False
+    state: dict = field(default_factory=dict)
+
+    @property
+    def fetch(self) -> List[str]:
+        return self.added + self.changed
+
+    def summary(self) -> str:
+        if self.full:
+            return f"full sync of {len(self.added)} experiment(s)"
+        return (f"{len(self.added)} new, {len(self.changed)} changed, {len(self.removed)} removed, "
+                f"{len(self.unchanged)} unchanged experiment(s)")
+
+
+def load_sync_state(outdir: Union[str, Path]) -> Optional[dict]:
+    path = Path(outdir) / SYNC_STATE_FILE
+    if not path.exists():
+        return None
+    try:
+        with path.open() as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        console.log(f"Ignoring unreadable sync state {path}.")
+        return None
+
+
+def save_sync_state(outdir: Union[str, Path], state: dict) -> Path:
+    path = Path(outdir) / SYNC_STATE_FILE
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w") as fh:
+        json.dump(state, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    return path
+
+
+def sync_query(params_list: Sequence[Tuple[str, str]],
+               file_types: Optional[Set[str]] = None,
+               assembly: Optional[str] = None,
+               status: str = "released",
+               extra_fields: Optional[Sequence[str]] = None,
+               projection: bool = False) -> dict:
+    """Everything that shapes the records; a sync only merges into a run with the same query.
+
+    ``projection`` is stored as the projected field list actually requested
+    (empty for full payloads), since records built from either can differ.
+    """
+    fields = projection_fields(extra_fields) if projection else None
+    return {
+        "search": sorted([k, v] for k, v in params_list if k not in ("limit", "format", "field")),
+        "file_types": sorted(file_types or []),
+        "assembly": assembly or "",
+        "status": status or "",
+        "extra_fields": list(extra_fields or []),
+        "projection": list(fields or []),
+    }
+
+
+def list_experiments(params_list: Sequence[Tuple[str, str]],
+                     auth=None,
+                     transport: Optional[Transport] = None) -> Dict[str, dict]:
+    """Map each matching case accession to its version stamp and possible controls.
+
+    The listing always goes to the portal (never the response cache) and only
+    requests ``LISTING_FIELDS``, so it stays small even for broad queries.
+    """
+    params = [(k, v) for k, v in params_list if k not in ("field", "frame")]
+    params.extend(("field", f) for f in LISTING_FIELDS)
+    res = search_json(params, auth=auth, raw_query="control_type!=*", transport=transport or get_transport())
+    listing = {}
+    for exp in res.get("@graph", []):
+        acc = exp.get("accession")
+        if not acc:
+            continue
+        controls = [c for c in exp.get("possible_controls", []) if isinstance(c, dict)]
+        stamp = [exp.get("date_modified", ""), exp.get("date_released", "")]
+        stamp.extend(f"{c.get('accession', '')}@{c.get('date_modified', '')}" for c in controls)
+        listing[acc] = {"version": "|".join(stamp), "controls": expand_possible_controls(exp)}
+    return listing
+
+
+def plan_sync(state: Optional[dict], query: dict, listing: Dict[str, dict]) -> SyncPlan:
+    """Compare the current listing with the previous sync state."""
+    if not state or state.get("query") != query:
+        return SyncPlan(added=sorted(listing), full=True)
+    previous = state.get("experiments", {})
+    plan = SyncPlan(removed=sorted(set(previous) - set(listing)))
+    for acc in sorted(listing):
+        old = previous.get(acc)
+        if old is None:
+            plan.added.append(acc)
+        elif old.get("version") != listing[acc]["version"]:
+            plan.changed.append(acc)
+        else:
+            plan.unchanged.append(acc)
+    return plan
+
+
+def read_metadata_records(path: Union[str, Path]) -> Iterator[dict]:
+    """Yield the records of a ``metadata.jsonl`` file (compressed or not) written by a previous run."""
+    with open_text(path) as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _group_records(records: Iterable[dict]) -> Dict[Tuple[bool, str], Dict[str, dict]]:
+    """Index records by (is_control, experiment accession), one record per file."""
+    groups: Dict[Tuple[bool, str], Dict[str, dict]] = {}
+    for rec in records:
+        key = (bool(rec.get("is_control")), rec.get("experiment_accession") or "")
+        groups.setdefault(key, {}).setdefault(rec.get("file_accession") or "", rec)
+    return groups
+
+
+def merge_records(previous: Iterable[dict],
+                  fetched: Iterable[dict],
+                  listing: Dict[str, dict],
+                  plan: SyncPlan) -> RecordBuilder:
+    """Rebuild the records of every listed case from fetched and previous records.
+
+    Fetched records replace previous ones per experiment (cases and controls
+    alike); each case is followed by its controls' files, as in a full run.
+    """
+    # Refetching a case also refetched all of its controls.
+    stale = {(False, acc) for acc in plan.fetch}
+    stale.update((True, ctrl) for acc in plan.fetch for ctrl in listing[acc]["controls"])
+    groups = _group_records(
+        rec for rec in previous
+        if (bool(rec.get("is_control")), rec.get("experiment_accession")) not in stale
+    )
+    groups.update(_group_records(fetched))
+    out = RecordBuilder()
+    for acc in sorted(listing):
+        out.extend(groups.get((False, acc), {}).values())
+        for ctrl in listing[acc]["controls"]:
+            out.extend(groups.get((True, ctrl), {}).values())
+    return out
+
+
+def sync_experiments(outdir: Union[str, Path],
+                     assay_title: Optional[str] = None,
+                     target_labels: Optional[List[str]] = None,
+                     organism: Optional[str] = None,
+                     biosample: Optional[str] = None,
+                     file_types: Optional[Set[str]] = None,
+                     assembly: Optional[str] = None,
+                     status: str = "released",
+                     auth_token: Optional[str] = None,
+                     progress: bool = False,
+                     perturbed: Optional[str] = None,
+                     series: Optional[str] = None,
+                     threads: int = 6,
+                     transport: Optional[Transport] = None,
+                     batch_size: int = 0,
+                     projection: bool = False,
+                     extra_fields: Optional[Sequence[str]] = None,
+                     engine: str = "threads",
+                     concurrency: int = 64,
+                     ) -> Tuple[pd.DataFrame, RecordBuilder, SyncPlan]:
+    """Search like ``search_experiments`` but fetch only experiments changed since the last sync.
+
+    The caller writes the manifest and ``metadata.jsonl`` from the returned
+    records, then saves ``plan.state`` with ``save_sync_state``. Changed
+    experiments are fetched without the response cache so stale entries are
+    never merged.
+    """
+    outdir = Path(outdir)
+    auth = (auth_token, "") if auth_token else None
+    transport = transport or get_transport(threads)
+    params_list = build_params(assay_title=assay_title, target_labels=target_labels, organism=organism,
+                               biosample=biosample, status=status, perturbed=perturbed, series=series)
+    query = sync_query(params_list, file_types=file_types, assembly=assembly, status=status,
+                       extra_fields=extra_fields, projection=projection)
+    started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    listing = list_experiments(params_list, auth=auth, transport=transport)
+
+    state = load_sync_state(outdir)
+    metadata = find_output(outdir / METADATA_FILE)
+    if state and metadata is None:
+        console.log(f"{outdir / METADATA_FILE} is missing; running a full sync.")
+        state = None
+    plan = plan_sync(state, query, listing)
+    plan.state = {"query": query, "synced_at": started, "experiments": listing}
+    console.log(f"Sync: {plan.summary()}.")
+
+    fetched = RecordBuilder()
+    if plan.fetch:
+        _, fetched = search_accessions(plan.fetch, file_types=file_types, assembly=assembly, status=status,
+                                       auth_token=auth_token, progress=progress, threads=threads,
+                                       transport=transport, batch_size=batch_size, projection=projection,
+                                       extra_fields=extra_fields, engine=engine, concurrency=concurrency)
+    previous = () if plan.full else read_metadata_records(metadata)
+    records = merge_records(previous, fetched, listing, plan)
+    df, records = rows_to_df(records)
+    records.fetched = fetched.fetched
+    return df, records, plan
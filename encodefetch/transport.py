@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .ratelimit import (
+    RETRY_STATUSES,
+    THROTTLE_STATUSES,
+    AdaptiveLimiter,
+    RequestStats,
+    RetryPolicy,
+    TokenBucket,
+    parse_retry_after,
+)
+
+DEFAULT_POOL_SIZE = 6
+
+
+class Transport:
+    """Pooled, thread-safe HTTP transport shared by metadata and download requests.
+
+    Each worker thread gets its own ``requests.Session`` (sessions are not
+    thread-safe), but all sessions mount the same ``HTTPAdapter`` so they share
+    one keep-alive connection pool. ``pool_size`` caps open connections per host.
+
+    Requests are paced by a token bucket (``max_rps``, 0 = unlimited) and
+    retried on 429/5xx and connection errors with jittered exponential backoff,
+    honoring ``Retry-After``. An AIMD limiter lowers the number of concurrent
+    requests when the server pushes back and raises it again while healthy.
+    Per-run counters are kept in ``stats``.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, max_hosts: int = 10, block: bool = True,
+                 max_rps: float = 0.0, retry: Optional[RetryPolicy] = None):
+        self.pool_size = max(1, int(pool_size))
+        self.max_hosts = max(1, int(max_hosts))
+        self.block = block
+        self._adapter = self._new_adapter()
+        self._local = threading.local()
+        self._sessions: list[requests.Session] = []
+        self._lock = threading.Lock()
+        self.rate_limiter = TokenBucket(max_rps)
+        self.limiter = AdaptiveLimiter(self.pool_size)
+        self.retry = retry or RetryPolicy()
+        self.stats = RequestStats()
+
+    def _new_adapter(self) -> HTTPAdapter:
+        return HTTPAdapter(pool_connections=self.max_hosts, pool_maxsize=self.pool_size, pool_block=self.block)
+
+    def grow(self, pool_size: int):
+        """Raise the connection pool to ``pool_size``, keeping this transport in use.
+
+        A larger adapter is mounted on every session and the old one is closed;
+        its idle connections are dropped and busy ones are discarded when released.
+        """
+        with self._lock:
+            if pool_size <= self.pool_size:
+                return
+            self.pool_size = int(pool_size)
+            old, self._adapter = self._adapter, self._new_adapter()
+            for s in self._sessions:
+                s.mount("https://", self._adapter)
+                s.mount("http://", self._adapter)
+        self.limiter.maximum = self.pool_size
+        self.limiter.set_limit(self.pool_size)
+        old.close()
+
+    @property
+    def session(self) -> requests.Session:
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = requests.Session()
+            with self._lock:
+                s.mount("https://", self._adapter)
+                s.mount("http://", self._adapter)
+                self._sessions.append(s)
+            self._local.session = s
+        return s
+
+    def _call(self, fn: Callable[[], requests.Response]) -> requests.Response:
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            r, error = None, None
+            with self.limiter:
+                try:
+                    r = fn()
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+            self.stats.record(requests=1)
+
+            if r is not None and r.status_code not in RETRY_STATUSES:
+                self.limiter.on_success()
+                return r
+            if attempt >= self.retry.retries:
+                self.stats.record(failures=1)
+                if error is not None:
+                    raise error
+                return r
+
+            retry_after = None
+            if r is not None:
+                if r.status_code in THROTTLE_STATUSES:
+                    self.limiter.on_backoff()
+                    self.stats.record(throttled=1)
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                r.close()
+            delay = self.retry.delay(attempt, retry_after)
+            self.stats.record(retries=1, waited=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def send(self, prepped: requests.PreparedRequest, **kwargs) -> requests.Response:
+        return self._call(lambda: self.session.send(prepped, **kwargs))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self._call(lambda: self.session.request(method, url, **kwargs))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for s in sessions:
+            s.close()
+        self._adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_transport: Optional[Transport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport(pool_size: Optional[int] = None) -> Transport:
+    """Return the process-wide transport, growing its pool to ``pool_size`` if needed.
+
+    The transport is grown in place, so callers that already hold it share the
+    larger pool.
+    """
+    global _default_transport
+    with _default_lock:
+        wanted = max(DEFAULT_POOL_SIZE, int(pool_size or 0))
+        if _default_transport is None:
+            _default_transport = Transport(pool_size=wanted)
+        else:
+            _default_transport.grow(wanted)
+        return _default_transport
+
+
+def set_transport(transport: Optional[Transport]) -> Optional[Transport]:
+    """Replace the process-wide transport and return the previous one."""
+    global _default_transport
+    with _default_lock:
+        previous, _default_transport = _default_transport, transport
+        return previous
@@ -0,0 +1,188 @@
+"""Integrity checks for downloaded files.
+
+Downloads are checked against the manifest's ``file_size`` and ``md5sum``
+according to a policy: ``none`` skips the checks, ``size`` compares byte
+counts, and ``md5`` also compares the MD5 digest. Single-stream downloads
+hash bytes as they are written, so no second pass over the file is needed.
+A resumed ``.part`` file is hashed once up to its current size first.
+
+``VerificationIndex`` remembers each verified file's size, modification time
+and inode in ``<outdir>/verify_index.json``. A file whose ``stat`` still
+matches its entry is trusted without being read again; only new or changed
+files are rehashed by ``verify_files``.
+"""
+from __future__ import annotations
+
+import concurrent.futures as cf
+import hashlib
+import json
+import os
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from rich.console import Console
+
+console = Console(stderr=True)
+
+VERIFY_POLICIES = ("none", "size", "md5")
+VERIFY_INDEX_FILE = "verify_index.json"
+HASH_CHUNK = 8 * 1024 * 1024
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of one download; truthy when the file is in place.
+
+    ``verified`` is ``"md5"`` or ``"size"`` for the strongest check that
+    passed, ``"failed"`` when the last attempt failed a check, and ``""``
+    when nothing was checked.
+    """
+
+    ok: bool
+    verified: str = ""
+    md5: str = ""
+    error: str = ""
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def file_md5(path: Union[str, Path], hasher=None, chunk: int = HASH_CHUNK, io_lock=None):
+    """Feed the contents of ``path`` into ``hasher`` (a new MD5 by default) and return it.
+
+    ``io_lock`` (e.g. a semaphore) is held for each read, not while hashing.
+    """
+    hasher = hasher if hasher is not None else hashlib.md5()
+    io_lock = io_lock or nullcontext()
+    with open(path, "rb") as fh:
+        while True:
+            with io_lock:
+                block = fh.read(chunk)
+            if not block:
+                return hasher
+            hasher.update(block)
+
+
+def check_file(actual_size: int, digest: Optional[str], *, size: Optional[int] = None,
+               md5: Optional[str] = None, policy: str = "md5") -> Tuple[str, str]:
+    """Compare a finished download with the manifest; return ``(verified, error)``."""
+    if policy == "none":
+        return "", ""
+    if size and actual_size != size:
+        return "failed", f"size {actual_size} != expected {size}"
+    if policy == "md5" and md5 and digest is not None:
+        if digest.lower() != str(md5).strip().lower():
+            return "failed", f"md5 {digest} != expected {md5}"
+        return "md5", ""
+    return ("size", "") if size else ("", "")
+
+
+class VerificationIndex:
+    """Verified files of an output directory, keyed by path relative to it.
+
+    Each entry holds the ``size``, ``mtime_ns`` and ``inode`` seen when the file
+    was verified, with the ``md5`` digest and the check that passed
+    (``verified``). ``lookup`` returns an entry only while one ``stat`` of the
+    file still matches it. Thread-safe; call ``save`` to persist.
+    """
+
+    def __init__(self, outdir: Union[str, Path]):
+        self.outdir = Path(outdir)
+        self.path = self.outdir / VERIFY_INDEX_FILE
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                with self.path.open() as fh:
+                    self._entries = json.load(fh)
+            except (OSError, ValueError):
+                console.log(f"Ignoring unreadable verification index {self.path}.")
+
+    def _key(self, path: Union[str, Path]) -> str:
+        path = Path(path)
+        try:
+            return path.resolve().relative_to(self.outdir.resolve()).as_posix()
+        except ValueError:
+            return str(path.resolve())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, path: Union[str, Path]) -> Optional[dict]:
+        """The entry for ``path`` if the file is unchanged since it was verified, else None."""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns, st.st_ino) != (entry["size"], entry["mtime_ns"], entry["inode"]):
+            return None
+        return entry
+
+    def record(self, path: Union[str, Path], md5: str = "", verified: str = ""):
+        st = os.stat(path)
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino, "md5": md5,
+                 "verified": verified}
+        with self._lock:
+            self._entries[self._key(path)] = entry
+
+    def forget(self, path: Union[str, Path]):
+        with self._lock:
+            self._entries.pop(self._key(path), None)
+
+    def save(self) -> Path:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with tmp.open("w") as fh:
+                json.dump(self._entries, fh, sort_keys=True)
+        os.replace(tmp, self.path)
+        return self.path
+
+
+def verify_files(files: Iterable[dict], index: VerificationIndex, *, policy: str = "md5", full: bool = False,
+                 jobs: Optional[int] = None, io_limit: int = 4) -> Dict[Path, DownloadResult]:
+    """Check existing files against the manifest, skipping files the index still vouches for.
+
+    ``files`` are ``download_items``-style dicts with ``dest``, ``size`` and
+    ``md5``. Stale files are hashed by ``jobs`` threads (one per core by
+    default); ``hashlib`` releases the GIL, so hashing runs on all cores while
+    at most ``io_limit`` reads are in flight. ``full`` ignores the index.
+    Results are recorded in ``index``; failed files are dropped from it.
+    """
+    io_lock = threading.BoundedSemaphore(max(1, io_limit))
+    results: Dict[Path, DownloadResult] = {}
+    stale = []
+    for item in files:
+        entry = None if full else index.lookup(item["dest"])
+        md5 = item.get("md5") or None
+        if entry is not None and not (policy == "md5" and md5 and not entry["md5"]):
+            # The recorded digest still has to match the manifest, which may have changed.
+            verified, error = check_file(entry["size"], entry["md5"] or None, size=item.get("size"), md5=md5,
+                                         policy=policy)
+            if not error:
+                results[item["dest"]] = DownloadResult(True, verified, entry["md5"])
+                continue
+        stale.append(item)
+    if results or stale:
+        console.log(f"Verification index: {len(results)} unchanged file(s) skipped, {len(stale)} to check.")
+
+    def check(item: dict) -> DownloadResult:
+        dest, md5 = item["dest"], item.get("md5") or None
+        digest = file_md5(dest, io_lock=io_lock).hexdigest() if policy == "md5" and md5 else None
+        verified, error = check_file(os.stat(dest).st_size, digest, size=item.get("size"), md5=md5, policy=policy)
+        if error:
+            index.forget(dest)
+            return DownloadResult(False, verified, digest or "", error)
+        index.record(dest, digest or "", verified)
+        return DownloadResult(True, verified, digest or "")
+
+    with cf.ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as ex:
+        for item, result in zip(stale, ex.map(check, stale)):
+            results[item["dest"]] = result
+    return results
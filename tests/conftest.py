@@ -0,0 +1,67 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+
+class FakeProgress:
+    """Stand-in for a rich ``Progress`` with a single task ``0``."""
+
+    def __init__(self):
+        self.tasks = {0: type("Task", (), {"total": None, "completed": 0})()}
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers, body):
+        self.status_code, self.headers, self.body = status_code, headers, body
+
+    def iter_content(self, chunk_size):
+        return [self.body[i:i + chunk_size] for i in range(0, len(self.body), chunk_size)]
+
+
+class FakeTransport:
+    """Serves ``bodies`` in turn (the last one repeats) and records each request's headers and URL.
+
+    A body may be a callable of the URL. Replies carry ``status`` and
+    ``headers``. With ``ranges=True`` a ``Range`` request gets a 206 slice with
+    ``Content-Range``, unless its ``If-Range`` differs from the reply's
+    ``ETag`` (or ``Last-Modified``), in which case the whole body is sent.
+    """
+
+    def __init__(self, *bodies, status=200, headers=None, ranges=False):
+        self.bodies = list(bodies) or [lambda url: url.encode()]
+        self.status, self.headers, self.ranges = status, dict(headers or {}), ranges
+        self.requests, self.urls = [], []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def get(self, url, headers=None, **kwargs):
+        headers = dict(headers or {})
+        with self._lock:
+            self.requests.append(headers)
+            self.urls.append(url)
+            body = self.bodies.pop(0) if len(self.bodies) > 1 else self.bodies[0]
+        body = body(url) if callable(body) else body
+        status, reply = self.status, dict(self.headers)
+        validator = reply.get("ETag") or reply.get("Last-Modified")
+        if self.ranges and "Range" in headers and headers.get("If-Range", validator) == validator:
+            size = len(body)
+            start, _, end = headers["Range"][len("bytes="):].partition("-")
+            start, end = int(start), min(int(end or size - 1), size - 1)
+            status, body = 206, body[start:end + 1]
+            reply["Content-Range"] = f"bytes {start}-{end}/{size}"
+        yield FakeResponse(status, reply, body)
+
+
+@pytest.fixture
+def fake_progress():
+    return FakeProgress()
+
+
+@pytest.fixture
+def fake_transport():
+    """The ``FakeTransport`` class, to build one per test."""
+    return FakeTransport
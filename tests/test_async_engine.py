@@ -0,0 +1,51 @@
+import asyncio
+
+from encodefetch import core
+from encodefetch.async_engine import experiments_to_df_async
+
+
+def _experiment(acc, controls=(), n_files=2):
+    return {
+        "accession": acc,
+        "possible_controls": [{"accession": c} for c in controls],
+        "files": [
+            {"accession": f"ENCFF{acc[-4:]}{i}", "file_format": "fastq", "status": "released"}
+            for i in range(n_files)
+        ],
+    }
+
+
+PAYLOADS = {
+    "ENCSR000CAS1": _experiment("ENCSR000CAS1", ["ENCSR000CTL1", "ENCSR000CTL2"]),
+    "ENCSR000CAS2": _experiment("ENCSR000CAS2", ["ENCSR000CTL1"]),
+    "ENCSR000CTL1": _experiment("ENCSR000CTL1"),
+    "ENCSR000CTL2": _experiment("ENCSR000CTL2"),
+}
+
+
+class _FakeClient:
+    def __init__(self):
+        self.fetched = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch_experiment(self, accession, fields=None):
+        self.fetched.append(accession)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return PAYLOADS[accession]
+
+
+def test_async_engine_matches_threaded_engine(monkeypatch):
+    monkeypatch.setattr(core, "fetch_experiment", lambda acc, **kwargs: PAYLOADS[acc])
+    cases = [{"accession": "ENCSR000CAS1"}, {"accession": "ENCSR000CAS2"}]
+    expected, _ = core.experiments_to_df(cases, threads=2)
+
+    client = _FakeClient()
+    actual, _ = asyncio.run(experiments_to_df_async(cases, client))
+
+    assert actual.to_csv(sep="\t", index=False) == expected.to_csv(sep="\t", index=False)
+    assert client.fetched.count("ENCSR000CTL1") == 1
+    assert client.max_in_flight > 1
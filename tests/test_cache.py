@@ -0,0 +1,87 @@
+import os
+
+from encodefetch import encode_client
+from encodefetch.cache import ResponseCache
+from encodefetch.transport import Transport
+
+
+class _Response:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class _ScriptedTransport(Transport):
+    def __init__(self, responses):
+        super().__init__(pool_size=1)
+        self.responses = list(responses)
+        self.sent = []
+
+    def send(self, prepped, **kwargs):
+        self.sent.append(dict(prepped.headers))
+        return self.responses.pop(0)
+
+
+def test_fresh_cache_entry_skips_network(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=3600)
+    transport = _ScriptedTransport([_Response(200, {"accession": "ENCSR1"})])
+
+    first = encode_client.fetch_experiment("ENCSR1", transport=transport, cache=cache)
+    second = encode_client.fetch_experiment("ENCSR1", transport=transport, cache=cache)
+
+    assert first == second == {"accession": "ENCSR1"}
+    assert len(transport.sent) == 1
+    assert cache.stats() == {"hits": 1, "revalidated": 0, "misses": 1}
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=0)
+    transport = _ScriptedTransport([
+        _Response(200, {"accession": "ENCSR1"}, {"ETag": '"abc"'}),
+        _Response(304),
+    ])
+
+    encode_client.fetch_experiment("ENCSR1", transport=transport, cache=cache)
+    again = encode_client.fetch_experiment("ENCSR1", transport=transport, cache=cache)
+
+    assert again == {"accession": "ENCSR1"}
+    assert transport.sent[1]["If-None-Match"] == '"abc"'
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=10 ** 6)
+    cache.put("old", "u1", {"x": "a" * 100})
+    cache.put("new", "u2", {"x": "b" * 100})
+    os.utime(tmp_path / "old.json", (1, 1))
+    os.utime(tmp_path / "new.json", (2, 2))
+    cache.max_bytes = (tmp_path / "new.json").stat().st_size + 10
+
+    cache.put("newest", "u3", {"x": "c"})
+
+    assert cache.get("old") is None
+    assert cache.get("newest").payload == {"x": "c"}
+
+
+def test_search_listing_is_not_served_from_cache(tmp_path, monkeypatch):
+    from encodefetch import core
+
+    cache = ResponseCache(tmp_path, ttl=3600)
+    transport = _ScriptedTransport([
+        _Response(200, {"@graph": [{"accession": "ENCSR1"}]}),
+        _Response(200, {"@graph": [{"accession": "ENCSR1"}, {"accession": "ENCSR2"}]}),
+    ])
+    monkeypatch.setattr(core, "experiments_to_df", lambda experiments, **kwargs: [e["accession"] for e in experiments])
+
+    first = core.search_experiments(assay_title="ChIP-seq", transport=transport, cache=cache)
+    second = core.search_experiments(assay_title="ChIP-seq", transport=transport, cache=cache)
+
+    assert first == ["ENCSR1"] and second == ["ENCSR1", "ENCSR2"]
+    assert cache.stats()["hits"] == 0
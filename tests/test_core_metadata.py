@@ -46,3 +46,141 @@ def test_build_file_record_extracts_controlled_by_files():
     )
 
     assert record["controlled_by_files"] == "ENCFF000CTRL1,ENCFF000CTRL2"
+
+
+def test_experiments_to_df_fetches_shared_control_once(monkeypatch):
+    from encodefetch import core
+
+    def experiment(acc, controls=()):
+        return {
+            "accession": acc,
+            "possible_controls": [{"accession": c} for c in controls],
+            "files": [{"accession": f"ENCFF{acc[-4:]}", "file_format": "fastq", "status": "released"}],
+        }
+
+    payloads = {
+        "ENCSR000CAS1": experiment("ENCSR000CAS1", ["ENCSR000CTRL"]),
+        "ENCSR000CAS2": experiment("ENCSR000CAS2", ["ENCSR000CTRL"]),
+        "ENCSR000CTRL": experiment("ENCSR000CTRL"),
+    }
+    fetched = []
+
+    def fake_fetch(acc, **kwargs):
+        fetched.append(acc)
+        return payloads[acc]
+
+    monkeypatch.setattr(core, "fetch_experiment", fake_fetch)
+
+    df, rows = core.experiments_to_df(
+        [{"accession": "ENCSR000CAS1"}, {"accession": "ENCSR000CAS2"}],
+        threads=2,
+    )
+
+    assert fetched.count("ENCSR000CTRL") == 1
+    assert df["is_control"].sum() == 2
+
+
+def test_experiments_to_df_reuses_embedded_payloads(monkeypatch):
+    from encodefetch import core
+
+    fetched = []
+    monkeypatch.setattr(core, "fetch_experiment", lambda acc, **kwargs: fetched.append(acc))
+
+    df, rows = core.experiments_to_df(
+        [{
+            "accession": "ENCSR000CASE",
+            "possible_controls": [],
+            "files": [{"accession": "ENCFF000AAA", "file_format": "fastq", "status": "released"}],
+        }],
+        threads=1,
+    )
+
+    assert fetched == []
+    assert df["file_accession"].tolist() == ["ENCFF000AAA"]
+
+
+def test_batch_accessions_respects_size_and_url_length():
+    from encodefetch.encode_client import batch_accessions
+
+    accs = [f"ENCSR{i:06d}" for i in range(10)]
+
+    assert [len(b) for b in batch_accessions(accs, 4)] == [4, 4, 2]
+    assert all(len(b) <= 2 for b in batch_accessions(accs, 100, max_url_length=140))
+
+
+def test_search_accessions_batches_and_falls_back_for_misses(monkeypatch):
+    from encodefetch import core
+
+    batch_calls, single_calls = [], []
+
+    def fake_batch(accs, **kwargs):
+        batch_calls.append(list(accs))
+        return {acc: {"accession": acc, "files": []} for acc in accs if acc != "ENCSR000MIS"}
+
+    def fake_fetch(acc, **kwargs):
+        single_calls.append(acc)
+        return {"accession": acc, "files": []}
+
+    monkeypatch.setattr(core, "fetch_experiments_batch", fake_batch)
+    monkeypatch.setattr(core, "fetch_experiment", fake_fetch)
+
+    core.search_accessions(["ENCSR000AAA", "ENCSR000MIS", "ENCSR000BBB"], batch_size=2, threads=1)
+
+    assert batch_calls == [["ENCSR000AAA", "ENCSR000MIS"], ["ENCSR000BBB"]]
+    assert single_calls == ["ENCSR000MIS"]
+
+
+def test_build_file_record_adds_extra_fields():
+    exp_json = {
+        "accession": "ENCSR000CASE",
+        "replicates": [
+            {"library": {"biosample": {"summary": "K562", "donor": {}}}},
+            {"library": {"biosample": {"summary": "HepG2"}}},
+        ],
+    }
+    file_json = {"accession": "ENCFF000AAA", "read_length": 100}
+
+    record = build_file_record(
+        file_json,
+        exp_json=exp_json,
+        is_control=False,
+        extra_fields=["replicates.library.biosample.summary", "files.read_length"],
+    )
+
+    assert record["replicates.library.biosample.summary"] == "K562,HepG2"
+    assert record["files.read_length"] == "100"
+
+
+def test_projection_fields_fall_back_to_full_frame_for_wildcards():
+    from encodefetch.encode_client import EXPERIMENT_FIELDS, projection_fields
+
+    assert projection_fields(["files.read_length"]) == EXPERIMENT_FIELDS + ["files.read_length"]
+    assert projection_fields(["files.*"]) is None
+
+
+def test_experiments_to_df_consumes_experiments_lazily(monkeypatch):
+    import time
+
+    from encodefetch import core
+
+    started = []
+
+    def fake_fetch(acc, **kwargs):
+        started.append(acc)
+        return {"accession": acc, "files": []}
+
+    def pages():
+        yield {"accession": "ENCSR000AAA"}
+        # The first experiment is fetched before the next page is requested.
+        for _ in range(100):
+            if started:
+                break
+            time.sleep(0.01)
+        assert started == ["ENCSR000AAA"]
+        yield {"accession": "ENCSR000BBB"}
+
+    monkeypatch.setattr(core, "fetch_experiment", fake_fetch)
+
+    core.experiments_to_df(pages(), threads=2)
+
+    assert sorted(started) == ["ENCSR000AAA", "ENCSR000BBB"]
@@ -0,0 +1,211 @@
+import json
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from encodefetch import core
+from encodefetch.journal import RunJournal
+from encodefetch.downloads import (
+    AdaptiveConcurrency,
+    DownloadPipeline,
+    TransferProgress,
+    add_local_paths,
+    download_all,
+    download_items,
+    fetch_item,
+    make_dest,
+    parse_rate,
+    schedule_items,
+)
+
+
+def _record(exp, acc, is_control=False):
+    return {"experiment_accession": exp, "file_accession": acc, "file_format": "fastq", "is_control": is_control,
+            "url": f"https://example.org/files/{acc}/@@download/{acc}.fastq.gz", "file_size": None}
+
+
+def test_download_items_and_local_paths(tmp_path):
+    df = pd.DataFrame([
+        {**_record("ENCSR1", "ENCFF1"), "file_accession_r2": "ENCFF2",
+         "url_r2": "https://example.org/files/ENCFF2/@@download/ENCFF2.fastq.gz", "fastq_1": "", "fastq_2": ""},
+    ])
+    make_dest(tmp_path, False, "ENCSR1", "ENCFF2", "fastq").parent.mkdir(parents=True)
+    make_dest(tmp_path, False, "ENCSR1", "ENCFF2", "fastq").write_bytes(b"")
+
+    items = download_items(df, tmp_path)
+    df = add_local_paths(df, tmp_path)
+
+    assert [it["dest"].name for it in items] == ["ENCFF1.fastq.gz"]
+    assert df.loc[0, "local_path"] == ""
+    assert df.loc[0, "fastq_2"].endswith("case/ENCSR1/ENCFF2.fastq.gz")
+
+
+def test_pipeline_downloads_each_file_once(tmp_path, fake_transport):
+    transport = fake_transport()
+    with DownloadPipeline(tmp_path, threads=2, queue_size=1, transport=transport) as pipeline:
+        pipeline.submit([_record("ENCSR1", "ENCFF1"), _record("ENCSR9", "ENCFF9", is_control=True)])
+        pipeline.submit([_record("ENCSR2", "ENCFF2"), _record("ENCSR9", "ENCFF9", is_control=True)])
+
+    assert pipeline.queued == 3 and pipeline.failed == 0
+    assert sorted(u.rsplit("/", 1)[-1] for u in transport.urls) == [
+        "ENCFF1.fastq.gz", "ENCFF2.fastq.gz", "ENCFF9.fastq.gz"]
+    assert make_dest(tmp_path, True, "ENCSR9", "ENCFF9", "fastq").exists()
+
+
+def test_search_feeds_pipeline_per_experiment(tmp_path, monkeypatch):
+    payloads = {
+        acc: {"accession": acc, "files": [{"accession": f"ENCFF{acc[-4:]}", "file_format": "fastq",
+                                           "status": "released", "href": f"/files/ENCFF{acc[-4:]}/x.fastq.gz"}]}
+        for acc in ("ENCSR000CAS1", "ENCSR000CAS2")
+    }
+    monkeypatch.setattr(core, "fetch_experiment", lambda acc, **kwargs: payloads[acc])
+    submitted = []
+
+    df, _ = core.search_accessions(list(payloads), threads=2, on_experiment=submitted.append)
+
+    assert sorted(rows[0]["file_accession"] for rows in submitted) == ["ENCFFCAS1", "ENCFFCAS2"]
+    assert len(df) == 2
+
+
+def _segmented(tmp_path, server, size=None, journal=None):
+    from rich.progress import Progress
+    progress = Progress(disable=True)
+    task_id = progress.add_task("x", total=None)
+    item = {"url": "u", "dest": tmp_path / "ENCFF1.bam", "size": size or len(server.bodies[0]), "label": "x"}
+    ok = fetch_item(item, progress=progress, task_id=task_id, segments=4, segment_threshold=10,
+                    chunk=7, transport=server, journal=journal)
+    return ok, item["dest"]
+
+
+def test_segmented_download_fetches_ranges_concurrently(tmp_path, fake_transport):
+    body = bytes(range(256)) * 4
+    server = fake_transport(body, headers={"ETag": '"v1"'}, ranges=True)
+
+    ok, dest = _segmented(tmp_path, server)
+
+    assert ok and dest.read_bytes() == body
+    ranges = sorted(r["Range"] for r in server.requests[1:])
+    assert ranges == ["bytes=0-255", "bytes=256-511", "bytes=512-767", "bytes=768-1023"]
+    assert all(r["If-Range"] == '"v1"' for r in server.requests[1:])
+    assert not list(tmp_path.glob("*.part*"))
+
+
+def test_segmented_download_sends_last_modified_without_etag(tmp_path, fake_transport):
+    date = "Wed, 01 May 2024 10:00:00 GMT"
+    body = bytes(range(256))
+    server = fake_transport(body, headers={"Last-Modified": date}, ranges=True)
+    journal = RunJournal(tmp_path, {"q": 1})
+
+    ok, dest = _segmented(tmp_path, server, journal=journal)
+
+    assert ok and dest.read_bytes() == body
+    assert all(r["If-Range"] == date for r in server.requests[1:])
+    state = journal.download_state(dest)
+    assert state["etag"] == "" and state["last_modified"] == date
+    journal.close()
+
+
+def test_segmented_download_resumes_each_range(tmp_path, fake_transport):
+    body = bytes(range(100))
+    server = fake_transport(body, headers={"ETag": '"v1"'}, ranges=True)
+    part = tmp_path / "ENCFF1.bam.part"
+    part.write_bytes(body[:30] + bytes(45) + body[75:])
+    (tmp_path / "ENCFF1.bam.part.segments").write_text(json.dumps(
+        {"size": 100, "etag": '"v1"', "segments": [[0, 24, 25], [25, 49, 5], [50, 74, 0], [75, 99, 25]]}))
+
+    ok, dest = _segmented(tmp_path, server)
+
+    assert ok and dest.read_bytes() == body
+    assert sorted(r["Range"] for r in server.requests) == ["bytes=30-49", "bytes=50-74"]
+
+
+def test_segmented_download_falls_back_without_range_support(tmp_path, fake_transport):
+    server = fake_transport(b"x" * 100, headers={"ETag": '"v1"'})
+
+    ok, dest = _segmented(tmp_path, server)
+
+    assert ok and dest.read_bytes() == b"x" * 100
+    assert len(server.requests) == 2  # probe, then one plain stream
+
+
+def test_schedule_and_rate_parsing():
+    items = [{"size": 5}, {"size": None}, {"size": 50}, {"size": 7}]
+
+    assert [it["size"] for it in schedule_items(items)] == [50, 7, 5, None]
+    assert schedule_items(items, "manifest") == items
+    assert parse_rate("200M") == 200 * 1024 ** 2
+    assert parse_rate("1.5GiB/s") == 1.5 * 1024 ** 3
+    assert parse_rate("0") == 0
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_download_all_runs_largest_first_under_shared_bandwidth(tmp_path, fake_transport):
+    class Bucket:
+        rate = 1e9
+        taken = 0
+
+        def acquire(self, tokens):
+            Bucket.taken += tokens
+
+    transport = fake_transport()
+    items = [{"url": f"https://example.org/files/ENCFF{i}/", "dest": tmp_path / f"ENCFF{i}.bam", "size": size,
+              "md5": "", "label": str(i)} for i, size in enumerate([10, 3000, None, 200])]
+
+    results = download_all(items, threads=1, transport=transport, verify="none", bandwidth=Bucket())
+
+    assert [u.rsplit("/", 2)[-2] for u in transport.urls] == ["ENCFF1", "ENCFF3", "ENCFF0", "ENCFF2"]
+    assert all(results.values())
+    assert Bucket.taken == sum(len(u) for u in transport.urls)
+
+
+def test_transfer_progress_sums_file_tasks():
+    progress = TransferProgress(disable=True)
+    progress.expect(100)
+    progress.expect(None)
+    a = progress.add_task("a", total=60)
+    b = progress.add_task("b", total=40)
+
+    progress.update(a, advance=30)
+    progress.update(b, completed=40)
+    progress.update(a, completed=0)  # restarted download
+    progress.update(a, advance=60)
+
+    overall = progress.tasks[progress.overall]
+    assert (overall.total, overall.completed) == (100, 100)
+
+
+def test_adaptive_concurrency_climbs_turns_and_backs_off():
+    control = AdaptiveConcurrency(2, minimum=1, maximum=8)
+
+    steps = [control.adjust(100), control.adjust(150), control.adjust(152), control.adjust(100),
+             control.adjust(100, errors=1), control.adjust(50, saturated=False), control.adjust(50)]
+
+    assert steps == [3, 4, 4, 3, 1, 1, 2]
+    assert [limit for _, limit, _ in control.history] == steps
+
+
+def test_adaptive_download_all_holds_active_downloads_to_the_limit(tmp_path, fake_transport):
+    class SlowTransport(fake_transport):
+        active = peak = 0
+
+        @contextmanager
+        def get(self, url, headers=None, **kwargs):
+            with self._lock:
+                SlowTransport.active += 1
+                SlowTransport.peak = max(SlowTransport.peak, SlowTransport.active)
+            time.sleep(0.02)
+            with self._lock:
+                SlowTransport.active -= 1
+            with super().get(url, headers=headers, **kwargs) as r:
+                yield r
+
+    items = [{"url": f"https://example.org/files/ENCFF{i}/", "dest": tmp_path / f"ENCFF{i}.bam", "size": None,
+              "md5": "", "label": str(i)} for i in range(8)]
+
+    results = download_all(items, threads=2, transport=SlowTransport(), adaptive=True, max_threads=6)
+
+    assert len(results) == 8 and all(results.values())
+    assert SlowTransport.peak == 2
@@ -1,4 +1,5 @@
 import pandas as pd
+import pytest
 
 from encodefetch.exporters.nfcore_chipseq import NFCoreChipseq
 from encodefetch.exporters.nfcore_atacseq import NFCoreATACseq
@@ -7,6 +8,8 @@ from encodefetch.exporters.snakemake_atacseq import SnakemakeATACseq
 from encodefetch.exporters.snakemake_chipseq import SnakemakeChipseq
 from encodefetch.exporters.snakemake_rnaseq import SnakemakeRNAseq
 from encodefetch.core import write_nfcore_sheet
+from encodefetch.exporters import write_samplesheets
+from encodefetch.exporters.base import ExportContext, best_control_for_row
 
 
 def _df():
@@ -240,3 +243,55 @@ def test_nfcore_dispatch_accepts_common_chipseq_and_dnase_spellings(tmp_path):
         "control",
         "control_replicate",
     ]
+
+
+def test_control_index_is_shared_and_matches_file_accessions():
+    df = _df_with_ranked_controls()
+    context = ExportContext(df)
+    index = context.control_index
+    case_row = df.iloc[0]
+
+    assert context.control_index is index
+    assert "ENCFFCTRL2" in index and "ENCSRCASE" not in index
+    assert index.score(case_row, "ENCFFCTRL2") > index.score(case_row, "ENCFFCTRL1")
+    assert best_control_for_row(["ENCFFCTRL1", "ENCFFCTRL2"], case_row=case_row, index=index) == "ENCFFCTRL2"
+    assert index.score(case_row, "ENCSRMISSING") == 0
+
+
+def test_write_samplesheets_shares_one_context(tmp_path, monkeypatch):
+    from encodefetch.exporters import base
+
+    calls = []
+    original = base.control_file_to_sample_map
+    monkeypatch.setattr(base, "control_file_to_sample_map", lambda df: calls.append(1) or original(df))
+    df = _df_with_ranked_controls()
+    targets = {
+        "nfcore_chipseq": tmp_path / "nfcore.csv",
+        "snakemake_chipseq": tmp_path / "snakemake.tsv",
+    }
+
+    write_samplesheets(df, targets, control_strategy="best")
+
+    assert calls == [1]
+    nfcore = pd.read_csv(targets["nfcore_chipseq"]).fillna("")
+    snakemake = pd.read_csv(targets["snakemake_chipseq"], sep="\t").fillna("")
+    assert nfcore[nfcore["sample"].eq("ENCSRCASE")]["control"].tolist() == ["ENCSRCTRL2"]
+    assert snakemake[snakemake["sample"].eq("ENCSRCASE")]["control"].tolist() == ["ENCSRCTRL2"]
+
+
+def test_write_samplesheets_sees_in_place_changes(tmp_path):
+    df = _df_with_ranked_controls()
+    out = {"nfcore_chipseq": tmp_path / "nfcore.csv"}
+    write_samplesheets(df, out, control_strategy="best")
+    df["biosample_term_id"] = ["EFO:0002067", "EFO:0002067", "EFO:0002784"]
+    df["biosample_term_name"] = ["K562", "K562", "GM12878"]
+
+    write_samplesheets(df, out, control_strategy="best")
+
+    sheet = pd.read_csv(out["nfcore_chipseq"]).fillna("")
+    assert sheet[sheet["sample"].eq("ENCSRCASE")]["control"].tolist() == ["ENCSRCTRL1"]
+
+
+def test_write_samplesheets_rejects_unknown_exporter(tmp_path):
+    with pytest.raises(ValueError, match="nfcore_unknown"):
+        write_samplesheets(_df(), {"nfcore_unknown": tmp_path / "x.csv"})
@@ -0,0 +1,58 @@
+from encodefetch import core, file_search
+
+
+def _file(acc, fmt, assembly="", status="released"):
+    return {"accession": acc, "file_format": fmt, "assembly": assembly, "status": status,
+            "dataset": None, "href": f"/files/{acc}/@@download/{acc}.{fmt}"}
+
+
+def _experiments():
+    case = {
+        "accession": "ENCSR000CASE",
+        "assay_title": "TF ChIP-seq",
+        "target": {"label": "CTCF"},
+        "possible_controls": [{"accession": "ENCSR000CTRL"}],
+        "replicates": [{"library": {"biosample": {"donor": {"accession": "ENCDO1"}}}}],
+        "files": [
+            _file("ENCFF000FQ1", "fastq"),
+            _file("ENCFF000BAM", "bam", "GRCh38"),
+            _file("ENCFF000OLD", "bam", "hg19"),
+            _file("ENCFF000REV", "bam", "GRCh38", status="revoked"),
+        ],
+    }
+    ctrl = {
+        "accession": "ENCSR000CTRL",
+        "assay_title": "Control ChIP-seq",
+        "files": [_file("ENCFF000CFQ", "fastq"), _file("ENCFF000CBM", "bam", "GRCh38")],
+    }
+    for exp in (case, ctrl):
+        for f in exp["files"]:
+            f["dataset"] = f"/experiments/{exp['accession']}/"
+    return {e["accession"]: e for e in (case, ctrl)}
+
+
+def test_file_filter_params_only_push_assembly_without_fastq():
+    assert ("assembly", "GRCh38") in file_search.file_filter_params({"bam"}, "GRCh38")
+    assert ("assembly", "GRCh38") not in file_search.file_filter_params({"bam", "fastq"}, "GRCh38")
+    assert ("file_format", "bigWig") in file_search.file_filter_params({"bigwig"})
+
+
+def test_file_engine_matches_experiment_engine(monkeypatch):
+    exps = _experiments()
+
+    def fake_batch(accs, **kwargs):
+        return {a: {k: v for k, v in exps[a].items() if k != "files"} for a in accs if a in exps}
+
+    def fake_files(accs, filters, **kwargs):
+        return {a: [f for f in exps[a]["files"] if f["status"] == "released"] for a in accs}
+
+    monkeypatch.setattr(core, "fetch_experiment", lambda acc, **kwargs: exps[acc])
+    monkeypatch.setattr(file_search, "fetch_experiments_batch", fake_batch)
+    monkeypatch.setattr(file_search, "search_files_by_dataset", fake_files)
+
+    kwargs = dict(file_types={"fastq", "bam"}, assembly="GRCh38", threads=2)
+    expected, _ = core.experiments_to_df([{"accession": "ENCSR000CASE"}], **kwargs)
+    actual, _ = file_search.files_to_df(["ENCSR000CASE"], **kwargs)
+
+    assert actual.to_csv(sep="\t", index=False) == expected.to_csv(sep="\t", index=False)
+    assert "ENCFF000OLD" not in actual["file_accession"].tolist()
@@ -0,0 +1,112 @@
+from encodefetch import core
+from encodefetch.journal import RunJournal
+
+
+def test_journal_resumes_same_query_and_drops_torn_tail(tmp_path):
+    journal = RunJournal(tmp_path, {"q": 1})
+    journal.record_search(["ENCSR1", "ENCSR2"])
+    journal.experiment_done("ENCSR1", [{"file_accession": "ENCFF1"}])
+    journal.record_download(tmp_path / "a.fastq.gz", url="u", bytes=0, etag='"abc"', done=False)
+    journal.close()
+    with journal.path.open("a") as fh:
+        fh.write('{"event": "download", "dest"')
+
+    resumed = RunJournal(tmp_path, {"q": 1}, resume=True)
+
+    assert resumed.search_results == ["ENCSR1", "ENCSR2"]
+    assert resumed.experiment_records("ENCSR1") == [{"file_accession": "ENCFF1"}]
+    assert resumed.experiment_records("ENCSR2") is None
+    assert resumed.download_state(tmp_path / "a.fastq.gz")["etag"] == '"abc"'
+    resumed.experiment_done("ENCSR2", [])
+    resumed.close()
+    assert RunJournal(tmp_path, {"q": 1}, resume=True).experiment_records("ENCSR2") == []
+    assert RunJournal(tmp_path, {"q": 2}, resume=True).search_results is None
+
+
+def test_resumed_run_skips_completed_experiments(tmp_path, monkeypatch):
+    payloads = {
+        acc: {"accession": acc, "files": [{"accession": f"ENCFF{acc[-4:]}", "file_format": "fastq",
+                                           "status": "released"}]}
+        for acc in ("ENCSR000CAS1", "ENCSR000CAS2")
+    }
+    fetched = []
+
+    def fake_fetch(acc, **kwargs):
+        fetched.append(acc)
+        return payloads[acc]
+
+    monkeypatch.setattr(core, "fetch_experiment", fake_fetch)
+    journal = RunJournal(tmp_path, {"q": 1}, chunk_size=1)
+    full, _ = core.search_accessions(["ENCSR000CAS1"], threads=1, journal=journal)
+    journal.close()
+    fetched.clear()
+
+    journal = RunJournal(tmp_path, {"q": 1}, resume=True)
+    df, _ = core.search_accessions(["ENCSR000CAS1", "ENCSR000CAS2"], threads=1, journal=journal)
+
+    assert fetched == ["ENCSR000CAS2"]
+    assert df["file_accession"].tolist() == ["ENCFFCAS1", "ENCFFCAS2"]
+
+
+def test_download_sends_if_range_and_restarts_on_full_response(tmp_path, fake_transport, fake_progress):
+    dest = tmp_path / "ENCFF1.fastq.gz"
+    dest.with_suffix(".gz.part").write_bytes(b"stale")
+    journal = RunJournal(tmp_path, {"q": 1})
+    journal.record_download(dest, url="u", bytes=0, etag='"v1"', done=False)
+    transport = fake_transport(b"new contents", headers={"ETag": '"v2"'})
+
+    assert core.download_file("u", dest, progress=fake_progress, task_id=0, transport=transport, journal=journal)
+
+    assert transport.requests[0] == {"Range": "bytes=5-", "If-Range": '"v1"'}
+    assert dest.read_bytes() == b"new contents"
+    assert journal.download_state(dest)["done"] is True
+
+
+def test_journal_keeps_only_accessions_in_memory(tmp_path):
+    journal = RunJournal(tmp_path, {"q": 1}, chunk_size=2)
+    for i in range(5):
+        journal.experiment_done(f"ENCSR{i}", [{"file_accession": f"ENCFF{i}"}])
+    journal.close()
+
+    resumed = RunJournal(tmp_path, {"q": 1}, resume=True)
+
+    assert all(resumed.experiment_completed(f"ENCSR{i}") for i in range(5))
+    assert resumed._loaded_chunk == (None, {})
+    assert resumed.experiment_records("ENCSR3") == [{"file_accession": "ENCFF3"}]
+    assert resumed._loaded_chunk[0] == "chunk-000002.jsonl" and list(resumed._loaded_chunk[1]) == ["ENCSR2", "ENCSR3"]
+    assert resumed.experiment_records("ENCSR4") == [{"file_accession": "ENCFF4"}]
+
+
+def _cli_run(tmp_path, monkeypatch, ok):
+    from click.testing import CliRunner
+
+    from encodefetch import cli
+    from encodefetch.verify import DownloadResult
+
+    exp = {"accession": "ENCSR1", "status": "released"}
+    record = core.build_file_record({"accession": "ENCFF1", "file_format": "bam", "status": "released",
+                                     "href": "/files/ENCFF1/@@download/ENCFF1.bam"},
+                                    exp_json=exp, is_control=False, matched_controls="")
+
+    def fake_search(**kwargs):
+        kwargs["on_experiment"]([record])
+        return core.rows_to_df([record])
+
+    monkeypatch.setattr(cli, "search_experiments", fake_search)
+    monkeypatch.setattr(cli, "download_all",
+                        lambda items, **kwargs: {it["dest"]: DownloadResult(ok, error="" if ok else "boom")
+                                                 for it in items})
+    return CliRunner().invoke(cli.main, ["--assay-title", "ChIP-seq", "--outdir", str(tmp_path), "--journal",
+                                         "--no-progress"])
+
+
+def test_failed_downloads_keep_the_journal(tmp_path, monkeypatch):
+    failed = _cli_run(tmp_path, monkeypatch, ok=False)
+
+    assert failed.exit_code == 1 and "1 download(s) failed" in failed.output
+    assert (tmp_path / ".journal" / "journal.jsonl").exists()
+
+    done = _cli_run(tmp_path, monkeypatch, ok=True)
+
+    assert done.exit_code == 0, done.output
+    assert not (tmp_path / ".journal").exists()
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from encodefetch.manifest import compact_dtypes, read_manifest, write_manifest
+
+
+def _manifest():
+    return pd.DataFrame(
+        [
+            {"experiment_accession": "ENCSR1", "is_control": False, "file_accession": "ENCFF1",
+             "lab": "Lab A", "file_size": 10, "file_size_r2": 11, "fastq_2": "r2.fastq.gz"},
+            {"experiment_accession": "ENCSR2", "is_control": True, "file_accession": "ENCFF2",
+             "lab": "Lab B", "file_size": "", "file_size_r2": "", "fastq_2": ""},
+        ]
+    )
+
+
+def test_compact_dtypes_types_sizes_flags_and_categories():
+    df = compact_dtypes(_manifest())
+
+    assert df["is_control"].dtype == bool
+    assert str(df["file_size"].dtype) == "Int64"
+    assert df["file_size"].tolist()[0] == 10 and pd.isna(df["file_size"].tolist()[1])
+    assert isinstance(df["lab"].dtype, pd.CategoricalDtype)
+
+
+def test_tsv_manifest_round_trip(tmp_path):
+    path = write_manifest(_manifest(), tmp_path / "manifest.tsv")
+
+    assert read_manifest(path)["file_accession"].tolist() == ["ENCFF1", "ENCFF2"]
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_arrow_manifest_round_trip_keeps_dtypes(tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    path = write_manifest(_manifest(), tmp_path / f"manifest{suffix}")
+
+    df = read_manifest(path)
+
+    assert df["file_accession"].tolist() == ["ENCFF1", "ENCFF2"]
+    assert df["is_control"].tolist() == [False, True]
+    assert str(df["file_size"].dtype) == "Int64"
+    assert isinstance(df["lab"].dtype, pd.CategoricalDtype)
+    assert read_manifest(path, columns=["file_accession"]).columns.tolist() == ["file_accession"]
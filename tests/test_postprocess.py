@@ -43,3 +43,56 @@ def test_collapse_fastq_pairs_keeps_r2_accession_from_indexed_mate():
 
     assert collapsed["file_accession"].tolist() == ["ENCFFR1"]
     assert collapsed["file_accession_r2"].tolist() == ["ENCFFR2"]
+
+
+def _fastq(acc, exp="ENCSRCASE", end="1", mate="", rep="1", status="released"):
+    return {
+        "experiment_accession": exp,
+        "is_control": False,
+        "file_accession": acc,
+        "file_format": "fastq",
+        "run_type": "paired-ended",
+        "paired_end": end,
+        "paired_accession": mate,
+        "file_status": status,
+        "url": f"https://example.org/{acc}.fastq.gz",
+        "md5sum": f"md5-{acc}",
+        "file_size": 1,
+        "biological_replicates": rep,
+        "technical_replicates": f"{rep}_1",
+    }
+
+
+def test_collapse_fastq_pairs_falls_back_to_replicate_keys_preferring_back_pointer():
+    df = pd.DataFrame(
+        [
+            _fastq("ENCFFA1", rep="1"),
+            _fastq("ENCFFOTHER", end="2", rep="1"),
+            _fastq("ENCFFA2", end="2", mate="ENCFFA1", rep="1"),
+            _fastq("ENCFFB1", rep="2"),
+            _fastq("ENCFFB2", end="2", rep="2"),
+            _fastq("ENCFFC1", rep="3"),
+        ]
+    )
+
+    collapsed = collapse_fastq_pairs(df).set_index("file_accession")
+
+    assert collapsed.loc["ENCFFA1", "file_accession_r2"] == "ENCFFA2"
+    assert collapsed.loc["ENCFFB1", "file_accession_r2"] == "ENCFFB2"
+    assert collapsed.loc["ENCFFB1", "fastq_2"] == "https://example.org/ENCFFB2.fastq.gz"
+    assert collapsed.loc["ENCFFC1", "single_end"] == "true"
+    assert collapsed.loc["ENCFFC1", "fastq_2"] == ""
+
+
+def test_collapse_fastq_pairs_drops_archived_mate():
+    df = pd.DataFrame(
+        [
+            _fastq("ENCFFR1", mate="ENCFFR2"),
+            _fastq("ENCFFR2", end="2", mate="ENCFFR1", status="archived"),
+        ]
+    )
+
+    collapsed = collapse_fastq_pairs(df)
+
+    assert collapsed["single_end"].tolist() == ["true"]
+    assert collapsed["file_accession_r2"].tolist() == [""]
@@ -0,0 +1,50 @@
+import time
+
+from encodefetch.ratelimit import AdaptiveLimiter, RetryPolicy, TokenBucket, parse_retry_after
+from encodefetch.transport import Transport
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=10, burst=1)
+
+    assert bucket.reserve() == 0
+    assert 0.05 < bucket.reserve() <= 0.1
+
+
+def test_adaptive_limiter_halves_on_backoff_and_recovers():
+    limiter = AdaptiveLimiter(8, cooldown=0)
+    limiter.on_backoff()
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.limit == 5
+
+
+def test_retry_policy_honors_retry_after():
+    assert RetryPolicy().delay(0, retry_after=2.5) == 2.5
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert 0 <= RetryPolicy(backoff=0.1).delay(3) <= 0.8
+
+
+def test_transport_retries_throttled_requests(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+    transport = Transport(pool_size=4, retry=RetryPolicy(retries=3))
+    responses = [_Response(429, {"Retry-After": "1"}), _Response(503), _Response(200)]
+
+    r = transport._call(lambda: responses.pop(0))
+
+    assert r.status_code == 200
+    assert transport.stats.retries == 2
+    assert transport.stats.throttled == 2
+    assert transport.limiter.limit < 4
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from encodefetch.core import rows_to_df
+from encodefetch.records import RecordBuilder
+
+
+def test_record_builder_round_trips_records_and_matches_dataframe():
+    rows = [
+        {"experiment_accession": "ENCSR2", "is_control": False, "file_accession": "ENCFF2", "lab": "B", "file_size": 2},
+        {"experiment_accession": "ENCSR1", "is_control": False, "file_accession": "ENCFF1", "lab": "A", "file_size": 1},
+        {"experiment_accession": "ENCSR1", "is_control": True, "file_accession": "ENCFF3", "lab": "A", "file_size": 3},
+    ]
+
+    df, records = rows_to_df(rows)
+
+    assert list(records) == rows
+    assert isinstance(df["lab"].dtype, pd.CategoricalDtype)
+    assert list(df["lab"].cat.categories) == ["A", "B"]
+    expected = pd.DataFrame(rows).sort_values(["is_control", "experiment_accession", "file_accession"])
+    assert df.to_csv(sep="\t", index=False) == expected.to_csv(sep="\t", index=False)
+
+
+def test_record_builder_fills_missing_columns_and_unhashable_values():
+    builder = RecordBuilder()
+    builder.append({"file_accession": "ENCFF1", "lab": "A"})
+    builder.extend([{"file_accession": "ENCFF2", "organism": ["list"]}, {"file_accession": "ENCFF3", "lab": "A"}])
+
+    df = builder.to_frame()
+
+    assert len(builder) == 3
+    assert builder[1] == {"file_accession": "ENCFF2", "lab": None, "organism": ["list"]}
+    assert df["lab"].isna().tolist() == [False, True, False]
+    assert df["organism"].tolist()[1] == ["list"]
@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pytest
+
+from encodefetch.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    memo = SingleFlight()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(memo.get("k", load))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert (memo.hits, memo.misses) == (4, 1)
+
+
+def test_failures_are_not_memoized():
+    memo = SingleFlight()
+
+    def boom():
+        raise RuntimeError("nope")
+
+    with pytest.raises(RuntimeError):
+        memo.get("k", boom)
+
+    assert memo.get("k", lambda: 42) == 42
+    assert memo.misses == 2
@@ -0,0 +1,103 @@
+from encodefetch.core import build_file_record, rows_to_df
+from encodefetch.records import RecordBuilder
+from encodefetch.store import MetadataStore
+
+
+def _records():
+    def experiment(acc, target, biosample_id):
+        return {
+            "accession": acc,
+            "assay_title": "TF ChIP-seq",
+            "target": {"label": target},
+            "biosample_ontology": {"term_id": biosample_id, "term_name": biosample_id},
+            "status": "released",
+            "perturbed": False,
+        }
+
+    def fastq(acc):
+        return {"accession": acc, "file_format": "fastq", "status": "released", "file_size": 10}
+
+    ctrl = experiment("ENCSR000CTRL", None, "EFO:1")
+    records = []
+    for acc, target, term in (("ENCSR000CAS1", "BRD4", "EFO:1"), ("ENCSR000CAS2", "SMAD3", "EFO:2")):
+        exp = experiment(acc, target, term)
+        records.append(build_file_record(fastq(f"ENCFF{acc[-4:]}"), exp_json=exp, is_control=False,
+                                         matched_controls="ENCSR000CTRL"))
+        records.append(build_file_record(fastq("ENCFF000CTRL"), exp_json=ctrl, is_control=True,
+                                         matched_controls=""))
+    return records
+
+
+def test_upsert_is_idempotent(tmp_path):
+    with MetadataStore(tmp_path / "meta.sqlite") as store:
+        store.upsert(_records())
+        store.upsert(_records())
+
+        assert len(store) == 3
+
+
+def test_upsert_with_other_file_type_keeps_earlier_files(tmp_path):
+    fastq = _records()[0]
+    bam = dict(fastq, file_accession="ENCFFBAM1", file_format="bam")
+    with MetadataStore(tmp_path / "meta.sqlite") as store:
+        store.upsert([fastq], file_types={"fastq"})
+        store.upsert([bam], file_types={"bam"})
+
+        df, _ = store.query(accessions=["ENCSR000CAS1"])
+
+    assert sorted(df["file_accession"]) == ["ENCFFBAM1", "ENCFFCAS1"]
+
+
+def test_upsert_clears_refetched_experiment_without_matching_files(tmp_path):
+    records = _records()
+    gone = dict(records[0], file_accession="ENCFFGONE")
+    refetched = RecordBuilder()
+    refetched.extend(r for r in records if r["experiment_accession"] == "ENCSR000CAS2")
+    refetched.mark_fetched("ENCSR000CAS1")
+    with MetadataStore(tmp_path / "meta.sqlite") as store:
+        store.upsert(records + [gone])
+        store.upsert(refetched)
+
+        df, _ = store.query(accessions=["ENCSR000CAS1", "ENCSR000CAS2"])
+
+    assert df["file_accession"].tolist() == ["ENCFFCAS2", "ENCFF000CTRL"]
+
+
+def test_query_filters_by_target_and_follows_controls(tmp_path):
+    with MetadataStore(tmp_path / "meta.sqlite") as store:
+        store.upsert(_records())
+
+        df, records = store.query(target_labels=["brd4"], file_types={"fastq"})
+
+    assert df["file_accession"].tolist() == ["ENCFFCAS1", "ENCFF000CTRL"]
+    assert df["is_control"].tolist() == [False, True]
+    assert len(records) == 2
+
+
+def test_query_rebuilds_live_manifest(tmp_path):
+    records = _records()
+    with MetadataStore(tmp_path / "meta.sqlite") as store:
+        store.upsert(records)
+
+        df, _ = store.query(accessions=["ENCSR000CAS1", "ENCSR000CAS2"])
+
+    live, _ = rows_to_df(records)
+    assert df.to_csv(sep="\t", index=False) == live.to_csv(sep="\t", index=False)
+
+
+def test_search_records_list_experiments_without_matching_files(tmp_path, monkeypatch):
+    from encodefetch import core
+
+    payload = {"accession": "ENCSR000CAS1", "files": [{"accession": "ENCFF1", "file_format": "bam",
+                                                      "status": "released"}]}
+    monkeypatch.setattr(core, "fetch_experiment", lambda acc, **kwargs: payload)
+    with MetadataStore(tmp_path / "meta.sqlite") as store:
+        store.upsert(_records(), file_types={"fastq"})
+
+        _, records = core.search_accessions(["ENCSR000CAS1"], file_types={"fastq"}, threads=1)
+        store.upsert(records, file_types={"fastq"})
+
+        df, _ = store.query(accessions=["ENCSR000CAS1", "ENCSR000CAS2"])
+
+    assert len(records) == 0 and records.fetched == {("ENCSR000CAS1", False)}
+    assert df["file_accession"].tolist() == ["ENCFFCAS2", "ENCFF000CTRL"]
@@ -0,0 +1,56 @@
+import json
+import random
+
+import pandas as pd
+import pytest
+
+from encodefetch.manifest import read_manifest, write_manifest
+from encodefetch.streaming import RecordSpool, atomic_open, open_text
+
+
+def _records(n):
+    rng = random.Random(0)
+    return [{"experiment_accession": f"ENCSR{rng.randrange(50):03d}", "file_accession": f"ENCFF{i:05d}",
+             "is_control": rng.random() < 0.3} for i in range(n)]
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_spool_sorts_records_across_runs(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    records = _records(250)
+    spool = RecordSpool(tmp_path / "metadata.jsonl", compression=compression, run_size=16)
+    for i in range(0, len(records), 7):
+        spool.write(records[i:i + 7])
+    assert spool.partial.exists()
+
+    path = spool.close()
+
+    with open_text(path) as fh:
+        written = [json.loads(line) for line in fh]
+    key = lambda r: (r["is_control"], r["experiment_accession"], r["file_accession"])  # noqa: E731
+    assert written == sorted(records, key=key)
+    assert not spool.partial.exists()
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_atomic_open_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / "manifest.tsv"
+    path.write_text("old\n")
+
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as fh:
+            fh.write("partial")
+            raise RuntimeError("killed")
+
+    assert path.read_text() == "old\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.tsv"]
+
+
+def test_compressed_tsv_manifest_round_trip(tmp_path):
+    df = pd.DataFrame({"file_accession": ["ENCFF1", "ENCFF2"], "file_size": [1, 2]})
+
+    path = write_manifest(df, tmp_path / "manifest.tsv.gz")
+
+    assert path.read_bytes()[:2] == b"\x1f\x8b"
+    assert read_manifest(path)["file_accession"].tolist() == ["ENCFF1", "ENCFF2"]
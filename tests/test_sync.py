@@ -0,0 +1,92 @@
+import json
+
+from encodefetch import core, sync
+from encodefetch.sync import SyncPlan, plan_sync, save_sync_state, sync_experiments
+
+
+def _experiment(acc, modified, controls=(), files=1):
+    return {
+        "accession": acc,
+        "date_modified": modified,
+        "possible_controls": [{"accession": c, "date_modified": "2024-01-01"} for c in controls],
+        "files": [{"accession": f"ENCFF{acc[-4:]}{i}", "file_format": "fastq", "status": "released"}
+                  for i in range(files)],
+    }
+
+
+def _portal(monkeypatch, payloads):
+    fetched = []
+
+    def fake_fetch(acc, **kwargs):
+        fetched.append(acc)
+        return payloads[acc]
+
+    def fake_search(params=None, **kwargs):
+        return {"@graph": [exp for acc, exp in payloads.items() if "CTRL" not in acc]}
+
+    monkeypatch.setattr(core, "fetch_experiment", fake_fetch)
+    monkeypatch.setattr(sync, "search_json", fake_search)
+    return fetched
+
+
+def _run(tmp_path, **kwargs):
+    df, records, plan = sync_experiments(tmp_path, assay_title="TF ChIP-seq", threads=2, **kwargs)
+    with open(tmp_path / "metadata.jsonl", "w") as fh:
+        for rec in records:
+            fh.write(json.dumps(rec) + "\n")
+    save_sync_state(tmp_path, plan.state)
+    return df, plan
+
+
+def test_plan_sync_classifies_experiments():
+    query = {"search": []}
+    state = {"query": query, "experiments": {"A": {"version": "1"}, "B": {"version": "1"}, "C": {"version": "1"}}}
+    listing = {"A": {"version": "1"}, "B": {"version": "2"}, "D": {"version": "1"}}
+
+    plan = plan_sync(state, query, listing)
+
+    assert (plan.added, plan.changed, plan.removed, plan.unchanged) == (["D"], ["B"], ["C"], ["A"])
+    assert plan_sync(state, {"search": [["x", "y"]]}, listing).full
+
+
+def test_sync_refetches_only_changed_experiments_and_merges(tmp_path, monkeypatch):
+    payloads = {
+        "ENCSR000CAS1": _experiment("ENCSR000CAS1", "2024-01-01", ["ENCSR000CTRL"]),
+        "ENCSR000CAS2": _experiment("ENCSR000CAS2", "2024-01-01", ["ENCSR000CTRL"]),
+        "ENCSR000CAS3": _experiment("ENCSR000CAS3", "2024-01-01"),
+        "ENCSR000CTRL": _experiment("ENCSR000CTRL", "2024-01-01"),
+    }
+    fetched = _portal(monkeypatch, payloads)
+    _, plan = _run(tmp_path)
+    assert plan.full
+
+    payloads["ENCSR000CAS2"] = _experiment("ENCSR000CAS2", "2024-06-01", ["ENCSR000CTRL"], files=2)
+    payloads["ENCSR000CAS4"] = _experiment("ENCSR000CAS4", "2024-06-01")
+    del payloads["ENCSR000CAS3"]
+    fetched.clear()
+    df, plan = _run(tmp_path)
+
+    assert (plan.added, plan.changed, plan.removed) == (["ENCSR000CAS4"], ["ENCSR000CAS2"], ["ENCSR000CAS3"])
+    assert sorted(fetched) == ["ENCSR000CAS2", "ENCSR000CAS4", "ENCSR000CTRL"]
+    full, _ = core.search_accessions(["ENCSR000CAS1", "ENCSR000CAS2", "ENCSR000CAS4"], threads=2)
+    assert df.to_csv(sep="\t", index=False) == full.to_csv(sep="\t", index=False)
+
+
+def test_sync_plan_summary():
+    plan = SyncPlan(added=["A"], changed=["B"], unchanged=["C", "D"])
+
+    assert plan.fetch == ["A", "B"]
+    assert plan.summary() == "1 new, 1 changed, 0 removed, 2 unchanged experiment(s)"
+
+
+def test_sync_with_other_projection_runs_full(tmp_path, monkeypatch):
+    payloads = {"ENCSR000CAS1": _experiment("ENCSR000CAS1", "2024-01-01")}
+    fetched = _portal(monkeypatch, payloads)
+    _run(tmp_path)
+    fetched.clear()
+
+    _, plan = _run(tmp_path, projection=True)
+
+    assert plan.full and fetched == ["ENCSR000CAS1"]
+    assert plan.state["query"]["projection"]
+    assert not _run(tmp_path, projection=True)[1].full
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+import requests
+
+from encodefetch import encode_client
+from encodefetch.transport import Transport, get_transport, set_transport
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class _RecordingTransport(Transport):
+    def __init__(self):
+        super().__init__(pool_size=2)
+        self.urls = []
+
+    def send(self, prepped, **kwargs):
+        self.urls.append(prepped.url)
+        return _Response({"accession": "ENCSR000AAA"})
+
+
+def test_transport_sessions_are_per_thread_but_share_one_pool():
+    transport = Transport(pool_size=4)
+    sessions = []
+
+    def grab():
+        sessions.append(transport.session)
+
+    threads = [threading.Thread(target=grab) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sessions}) == 3
+    assert {id(s.get_adapter("https://www.encodeproject.org")) for s in sessions} == {id(transport._adapter)}
+    transport.close()
+
+
+def test_get_transport_grows_pool_to_requested_threads():
+    previous = set_transport(None)
+    try:
+        transport = get_transport(2)
+        assert get_transport(2) is transport
+        session, size = transport.session, transport.pool_size
+        old_adapter = session.get_adapter("https://www.encodeproject.org")
+        closed = []
+        old_adapter.close = lambda: closed.append(old_adapter)
+
+        assert get_transport(size + 4) is transport
+
+        assert transport.pool_size == transport.limiter.maximum == size + 4
+        assert closed == [old_adapter]
+        assert session.get_adapter("https://www.encodeproject.org") is transport._adapter is not old_adapter
+        assert transport._adapter._pool_maxsize == size + 4
+    finally:
+        set_transport(previous)
+
+
+def test_encode_get_uses_supplied_transport():
+    transport = _RecordingTransport()
+
+    res = encode_client.fetch_experiment("ENCSR000AAA", transport=transport)
+
+    assert res == {"accession": "ENCSR000AAA"}
+    assert transport.urls == [
+        "https://www.encodeproject.org/experiments/ENCSR000AAA/?format=json&frame=embedded"
+    ]
+
+
+def test_iter_search_pages_with_from_and_limit(monkeypatch):
+    calls = []
+
+    def fake_get(path, params=None, **kwargs):
+        params = dict(params)
+        calls.append((params["from"], params["limit"]))
+        start, size = int(params["from"]), int(params["limit"])
+        graph = [{"accession": f"ENCSR{i:06d}"} for i in range(start, min(start + size, 5))]
+        return {"@graph": graph, "total": 5}
+
+    monkeypatch.setattr(encode_client, "encode_get", fake_get)
+
+    results = list(encode_client.iter_search([("type", "Experiment"), ("limit", "all")], page_size=2))
+
+    assert [r["accession"] for r in results] == [f"ENCSR{i:06d}" for i in range(5)]
+    assert calls == [("0", "2"), ("2", "2"), ("4", "2")]
+
+
+def test_empty_search_404_is_an_empty_graph(monkeypatch):
+    def fake_get(path, params=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 404 if dict(params).get("type") == "Experiment" else 500
+        raise requests.HTTPError(response=response)
+
+    monkeypatch.setattr(encode_client, "encode_get", fake_get)
+
+    assert encode_client.search_json([("type", "Experiment")]) == {"@graph": []}
+    assert list(encode_client.iter_search([("type", "Experiment")], page_size=2)) == []
+    assert encode_client.fetch_experiments_batch(["ENCSR1"]) == {}
+    with pytest.raises(requests.HTTPError):
+        encode_client.search_json([("type", "File")])
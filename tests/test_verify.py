@@ -0,0 +1,112 @@
+import hashlib
+
+import pandas as pd
+from click.testing import CliRunner
+
+from encodefetch import core, verify
+from encodefetch.cli import main
+from encodefetch.downloads import add_local_paths, make_dest, manifest_files
+from encodefetch.manifest import write_manifest
+from encodefetch.verify import DownloadResult, VerificationIndex, check_file, verify_files
+
+BODY = b"ACGT" * 1000
+MD5 = hashlib.md5(BODY).hexdigest()
+
+
+def _download(tmp_path, transport, progress, **kwargs):
+    dest = tmp_path / "ENCFF1.fastq.gz"
+    return dest, core.download_file("u", dest, progress=progress, task_id=0, transport=transport,
+                                    sleep=0, size=len(BODY), md5=MD5, **kwargs)
+
+
+def test_resumed_part_file_is_hashed_with_new_bytes(tmp_path, fake_transport, fake_progress):
+    (tmp_path / "ENCFF1.fastq.gz.part").write_bytes(BODY[:1234])
+    transport = fake_transport(BODY, ranges=True)
+
+    dest, result = _download(tmp_path, transport, fake_progress)
+
+    assert transport.requests == [{"Range": "bytes=1234-"}]
+    assert result == DownloadResult(True, "md5", MD5)
+    assert dest.read_bytes() == BODY
+
+
+def test_checksum_mismatch_is_downloaded_again(tmp_path, fake_transport, fake_progress):
+    transport = fake_transport(BODY[:-1] + b"N", BODY, ranges=True)
+
+    dest, result = _download(tmp_path, transport, fake_progress)
+
+    assert len(transport.requests) == 2 and transport.requests[1] == {}
+    assert result and result.verified == "md5"
+    assert dest.read_bytes() == BODY
+
+
+def test_failed_verification_is_reported_and_recorded(tmp_path, fake_transport, fake_progress):
+    transport = fake_transport(BODY[:-1] + b"N", ranges=True)
+    df = pd.DataFrame([{"experiment_accession": "ENCSR1", "file_accession": "ENCFF1", "file_format": "fastq",
+                        "is_control": False}])
+    dest = make_dest(tmp_path, False, "ENCSR1", "ENCFF1", "fastq")
+    dest.parent.mkdir(parents=True)
+
+    result = core.download_file("u", dest, progress=fake_progress, task_id=0, transport=transport, sleep=0,
+                                retries=2, size=len(BODY), md5=MD5)
+    df = add_local_paths(df, tmp_path, {dest: result})
+
+    assert not result and result.error.startswith("md5 ")
+    assert not dest.exists() and not dest.with_name(dest.name + ".part").exists()
+    assert df.loc[0, "verified"] == "failed" and df.loc[0, "local_path"] == ""
+
+
+def test_check_file_policies():
+    assert check_file(4, "abc", size=4, md5="ABC", policy="md5") == ("md5", "")
+    assert check_file(4, None, size=4, md5="abc", policy="size") == ("size", "")
+    assert check_file(3, None, size=4, policy="size")[0] == "failed"
+    assert check_file(3, "x", size=4, md5="y", policy="none") == ("", "")
+    assert check_file(3, None, policy="md5") == ("", "")
+
+
+def _tree(tmp_path, n=3):
+    rows, files = [], {}
+    for i in range(n):
+        body = BODY + bytes([i])
+        dest = make_dest(tmp_path / "files", False, "ENCSR1", f"ENCFF{i}", "fastq")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(body)
+        files[dest] = body
+        rows.append({"experiment_accession": "ENCSR1", "file_accession": f"ENCFF{i}", "file_format": "fastq",
+                     "is_control": False, "url": f"https://example.org/files/ENCFF{i}/",
+                     "md5sum": hashlib.md5(body).hexdigest(), "file_size": len(body)})
+    return pd.DataFrame(rows), files
+
+
+def test_index_skips_unchanged_files(tmp_path, monkeypatch):
+    df, files = _tree(tmp_path)
+    items = manifest_files(df, tmp_path / "files")
+    index = VerificationIndex(tmp_path)
+    assert all(verify_files(items, index).values())
+    index.save()
+
+    hashed = []
+    real_md5 = verify.file_md5
+    monkeypatch.setattr(verify, "file_md5", lambda path, **kw: hashed.append(path) or real_md5(path, **kw))
+    changed = next(iter(files))
+    changed.write_bytes(b"N" + files[changed][1:])
+
+    results = verify_files(items, VerificationIndex(tmp_path), jobs=2)
+
+    assert hashed == [changed]
+    assert not results[changed] and results[changed].error.startswith("md5 ")
+    assert sum(bool(r) for r in results.values()) == 2
+
+
+def test_verify_command_reports_failures(tmp_path):
+    df, files = _tree(tmp_path)
+    write_manifest(df, tmp_path / "manifest.tsv")
+    runner = CliRunner()
+
+    ok = runner.invoke(main, ["verify", "--outdir", str(tmp_path), "--io-limit", "1"])
+    next(iter(files)).write_bytes(b"truncated")
+    bad = runner.invoke(main, ["verify", "--outdir", str(tmp_path)])
+
+    assert ok.exit_code == 0 and "3 by md5, 0 by size, 0 failed" in ok.output
+    assert (tmp_path / "verify_index.json").exists()
+    assert bad.exit_code == 1 and "FAILED" in bad.output